@@ -0,0 +1,103 @@
+<?php
+/**
+ * 文件: api/catalog_store.php
+ * 描述: 读取带补丁日志的JSON数组目录（如 static/data/list.json）
+ * 维护: 与 wallpaper_catalog.py 的 CatalogStore 对应：修改以JSON Lines追加到 <文件>.patches，
+ *       压缩中的日志为 <文件>.patches.compacting；读取结果 = 基础文件 + 压缩中日志 + 当前日志，
+ *       补丁都是幂等的，压缩过程中任何时刻读取结果都一致
+ */
+
+/**
+ * 读取补丁日志文件
+ * @param string $path 日志路径
+ * @return array 补丁列表，文件不存在时为空
+ */
+function readCatalogPatches($path) {
+    if (!file_exists($path)) {
+        return [];
+    }
+
+    $lines = file($path, FILE_IGNORE_NEW_LINES | FILE_SKIP_EMPTY_LINES);
+    if ($lines === false) {
+        return [];
+    }
+
+    $patches = [];
+    foreach ($lines as $line) {
+        $patch = json_decode(trim($line), true);
+        // 最后一行可能是中断时写了一半的补丁，忽略
+        if (is_array($patch) && isset($patch['id'])) {
+            $patches[] = $patch;
+        }
+    }
+    return $patches;
+}
+
+/**
+ * 按顺序把补丁应用到条目列表
+ * 补丁格式: {"id", "set": {...}} 更新字段 / {"id", "insert": {...}} 新增或替换 / {"id", "delete": true} 删除
+ * @param array $items 条目列表
+ * @param array $patches 补丁列表
+ * @return array 应用后的条目列表
+ */
+function applyCatalogPatches($items, $patches) {
+    if (empty($patches)) {
+        return $items;
+    }
+
+    $positions = [];
+    foreach ($items as $position => $item) {
+        if (isset($item['id'])) {
+            $positions[$item['id']] = $position;
+        }
+    }
+
+    foreach ($patches as $patch) {
+        $itemId = $patch['id'];
+        $position = $positions[$itemId] ?? null;
+        if (isset($patch['insert'])) {
+            if ($position === null) {
+                $items[] = $patch['insert'];
+                end($items);
+                $positions[$itemId] = key($items);
+            } else {
+                $items[$position] = $patch['insert'];
+            }
+        } elseif (!empty($patch['delete'])) {
+            if ($position !== null) {
+                unset($items[$position]);
+                unset($positions[$itemId]);
+            }
+        } elseif ($position !== null && isset($patch['set']) && is_array($patch['set'])) {
+            $items[$position] = array_merge($items[$position], $patch['set']);
+        }
+    }
+    return array_values($items);
+}
+
+/**
+ * 读取合并补丁后的全部条目
+ * @param string $path 基础文件路径（如 static/data/list.json）
+ * @return array|null 条目列表；基础文件不存在或解析失败时返回null
+ */
+function loadCatalogJson($path) {
+    if (!file_exists($path)) {
+        return null;
+    }
+
+    $jsonData = file_get_contents($path);
+    if ($jsonData === false) {
+        return null;
+    }
+
+    $items = json_decode($jsonData, true);
+    if (!is_array($items)) {
+        return null;
+    }
+
+    $patches = array_merge(
+        readCatalogPatches($path . '.patches.compacting'),
+        readCatalogPatches($path . '.patches')
+    );
+    return applyCatalogPatches($items, $patches);
+}
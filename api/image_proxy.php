@@ -93,6 +93,7 @@ function getImageMimeType($filePath) {
         'png' => 'image/png',
         'gif' => 'image/gif',
         'webp' => 'image/webp',
+        'avif' => 'image/avif',
         'bmp' => 'image/bmp',
         'svg' => 'image/svg+xml'
     ];
@@ -239,9 +240,95 @@ function optimizeImage($imagePath, $quality = 85, $maxWidth = null, $maxHeight =
         imagedestroy($newImage);
     }
     
+    if ($success) {
+        recordCacheSource($cacheDir, $cacheKey, $imagePath);
+    }
+    
     return $success ? $cacheFile : $imagePath;
 }
 
+/**
+ * 记录新生成的缓存文件对应的源图片，供 image_cache.py 清理源图片已删除或已流放的缓存
+ * 追加到缓存目录的 .cache_index.log（每行 "缓存键\t相对项目根目录的源路径"），由 image_cache.py 合并进 .cache_index.json
+ * @param string $cacheDir 缓存目录
+ * @param string $cacheKey 缓存键
+ * @param string $imagePath 源图片绝对路径
+ */
+function recordCacheSource($cacheDir, $cacheKey, $imagePath) {
+    $basePath = realpath(__DIR__ . '/../');
+    if (!$basePath) {
+        return;
+    }
+    
+    $basePath = str_replace('\\', '/', $basePath);
+    $normalizedPath = str_replace('\\', '/', $imagePath);
+    if (strpos($normalizedPath, $basePath . '/') !== 0) {
+        return;
+    }
+    
+    $relativePath = substr($normalizedPath, strlen($basePath) + 1);
+    @file_put_contents($cacheDir . '.cache_index.log', $cacheKey . "\t" . $relativePath . "\n", FILE_APPEND | LOCK_EX);
+}
+
+/**
+ * 按客户端Accept头选择预生成的最小格式版本
+ * 格式索引由 compress_wallpapers.py 写入 static/preview/NNN/formats.json
+ * @param string $fullPath 已验证的图片绝对路径
+ * @return string|null 选中版本的绝对路径；图片不在格式索引中时返回null
+ */
+function negotiatePreviewFormat($fullPath) {
+    $previewBase = realpath(__DIR__ . '/../static/preview');
+    if (!$previewBase) {
+        return null;
+    }
+    
+    $previewBase = str_replace('\\', '/', $previewBase);
+    $normalizedPath = str_replace('\\', '/', $fullPath);
+    if (strpos($normalizedPath, $previewBase . '/') !== 0) {
+        return null;
+    }
+    
+    // 相对路径形如 001/xxx.jpeg 或 001/thumbnail/xxx.jpeg
+    $parts = explode('/', substr($normalizedPath, strlen($previewBase) + 1), 2);
+    if (count($parts) !== 2) {
+        return null;
+    }
+    list($period, $key) = $parts;
+    
+    $indexFile = $previewBase . '/' . $period . '/formats.json';
+    if (!is_file($indexFile)) {
+        return null;
+    }
+    
+    $index = json_decode(file_get_contents($indexFile), true);
+    $formats = $index['files'][$key] ?? null;
+    if (!is_array($formats)) {
+        return null;
+    }
+    
+    // 只有客户端声明支持的现代格式才参与比较
+    $accept = $_SERVER['HTTP_ACCEPT'] ?? '';
+    $negotiableMimeTypes = [
+        'avif' => 'image/avif',
+        'webp' => 'image/webp'
+    ];
+    
+    $bestPath = $fullPath;
+    $bestBytes = PHP_INT_MAX;
+    foreach ($formats as $format => $info) {
+        if (isset($negotiableMimeTypes[$format]) && strpos($accept, $negotiableMimeTypes[$format]) === false) {
+            continue;
+        }
+        $candidate = $previewBase . '/' . $period . '/' . $info['path'];
+        if ($info['bytes'] < $bestBytes && is_file($candidate)) {
+            $bestPath = $candidate;
+            $bestBytes = $info['bytes'];
+        }
+    }
+    
+    return $bestPath;
+}
+
 // 引入数据库配置（用于Token验证）
 require_once __DIR__ . '/../config/database.php';
 
@@ -367,8 +454,23 @@ try {
         exit;
     }
     
+    // 格式协商：不缩放且未指定质量（或为默认质量）时优先返回预生成的WebP/AVIF版本
+    // 指定了其他质量的请求需要按该质量重新编码，交给 optimizeImage 处理
+    $negotiatedPath = null;
+    $defaultQuality = !isset($_GET['quality']) || $quality === 85;
+    if (!$maxWidth && !$maxHeight && !$download && $defaultQuality) {
+        $negotiatedPath = negotiatePreviewFormat($fullPath);
+        if ($negotiatedPath !== null) {
+            header('Vary: Accept');
+        }
+    }
+    
     // 图片优化处理
-    $optimizedPath = optimizeImage($fullPath, $quality, $maxWidth, $maxHeight);
+    if ($negotiatedPath !== null && $negotiatedPath !== $fullPath) {
+        $optimizedPath = $negotiatedPath;
+    } else {
+        $optimizedPath = optimizeImage($fullPath, $quality, $maxWidth, $maxHeight);
+    }
     
     if (!$optimizedPath || !file_exists($optimizedPath)) {
         logImageAccess($imagePath, 'error', 'Image optimization failed');
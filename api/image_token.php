@@ -69,13 +69,72 @@ function determinePathType($imagePath) {
     return strpos($imagePath, '/preview/') !== false ? 'preview' : 'original';
 }
 
+/**
+ * 从路径解析索引中查找图片路径
+ * 索引由 compress_wallpapers.py 写入 static/preview/NNN/paths.json
+ * @param PDO $pdo 数据库连接
+ * @param string $wallpaperId 壁纸ID（旧调用方也会传入期数，如 001）
+ * @param string $pathType 路径类型
+ * @return string|null 图片路径；没有索引或索引中没有该壁纸时返回null
+ */
+function resolveIndexedImagePath($pdo, $wallpaperId, $pathType) {
+    $name = null;
+    if (preg_match('/^\d{3}$/', $wallpaperId)) {
+        $period = $wallpaperId;
+    } else {
+        // 按主键取出原图路径，得到期数和文件名
+        try {
+            $stmt = $pdo->prepare("SELECT file_path FROM wallpapers WHERE id = ?");
+            $stmt->execute([$wallpaperId]);
+            $filePath = $stmt->fetchColumn();
+        } catch (PDOException $e) {
+            error_log('查询壁纸路径失败: ' . $e->getMessage());
+            return null;
+        }
+        if (!$filePath || !preg_match('#^/?static/wallpapers/(\d{3})/(.+)$#', str_replace('\\', '/', $filePath), $matches)) {
+            return null;
+        }
+        list(, $period, $name) = $matches;
+    }
+    
+    $indexFile = __DIR__ . "/../static/preview/{$period}/paths.json";
+    if (!is_file($indexFile)) {
+        return null;
+    }
+    $index = json_decode(file_get_contents($indexFile), true);
+    $files = $index['files'] ?? [];
+    if ($name === null) {
+        // 与目录扫描相同，取该期的第一张图片
+        $record = empty($files) ? null : reset($files);
+    } else {
+        $record = $files[$name] ?? null;
+    }
+    if (!is_array($record)) {
+        return null;
+    }
+    
+    if ($pathType === 'preview') {
+        return $record['renditions']['preview']['path'] ?? null;
+    }
+    return $record['original']['path'] ?? null;
+}
+
 /**
  * 自动发现实际图片文件名
+ * 优先使用路径解析索引，索引不存在时才扫描目录
  * @param string $wallpaperId 壁纸ID
  * @param string $pathType 路径类型
+ * @param PDO|null $pdo 数据库连接（用于按壁纸ID查找索引）
  * @return string|null 实际的图片路径，找不到时返回null
  */
-function discoverActualImagePath($wallpaperId, $pathType) {
+function discoverActualImagePath($wallpaperId, $pathType, $pdo = null) {
+    if ($pdo) {
+        $indexedPath = resolveIndexedImagePath($pdo, $wallpaperId, $pathType);
+        if ($indexedPath !== null) {
+            return $indexedPath;
+        }
+    }
+    
     $baseDir = __DIR__ . '/../';
     
     // 构建目录路径
@@ -185,7 +244,8 @@ function getOrCreateToken($pdo, $wallpaperId, $imagePath, $pathType) {
     
     if ($existingToken) {
         // 如果传入的image_path与数据库中的不同，需要更新数据库
-        if ($existingToken['image_path'] !== $imagePath) {
+        // 前端传入的路径可能带开头的 /，与预生成的Token（image_tokens.py）比较时忽略，避免每次请求都写库
+        if (ltrim($existingToken['image_path'], '/') !== ltrim($imagePath, '/')) {
             // 更新数据库中的image_path
             try {
                 $sql = "UPDATE image_tokens SET image_path = ? WHERE wallpaper_id = ? AND path_type = ?";
@@ -250,7 +310,7 @@ try {
             
             // 如果没有提供image_path，自动发现实际路径
             if (empty($imagePath)) {
-                $imagePath = discoverActualImagePath($wallpaperId, $pathType);
+                $imagePath = discoverActualImagePath($wallpaperId, $pathType, $pdo);
                 if (empty($imagePath)) {
                     throw new Exception("无法找到壁纸文件: wallpaper_id={$wallpaperId}, path_type={$pathType}");
                 }
@@ -293,7 +353,7 @@ try {
                 
                 // 自动发现实际路径
                 if (empty($imagePath)) {
-                    $imagePath = discoverActualImagePath($wallpaperId, $pathType);
+                    $imagePath = discoverActualImagePath($wallpaperId, $pathType, $pdo);
                 }
                 
                 $tokenInfo = getOrCreateToken($pdo, $wallpaperId, $imagePath, $pathType);
@@ -328,7 +388,7 @@ try {
             
             // 自动发现实际路径
             if (empty($imagePath)) {
-                $imagePath = discoverActualImagePath($wallpaperId, $pathType);
+                $imagePath = discoverActualImagePath($wallpaperId, $pathType, $pdo);
             }
             
             // 生成新Token
@@ -9,6 +9,8 @@ header('Content-Type: application/json');
 
 // 引入数据库配置
 require_once __DIR__ . '/../config/database.php';
+// list.json 的修改先追加到补丁日志，读取时需要合并
+require_once __DIR__ . '/catalog_store.php';
 
 // 引入统一的日志函数
 // 2024-07-16 调试：直接定义临时日志函数，避免utils.php依赖问题
@@ -30,18 +32,14 @@ try {
     }
     tempFileLog('sync_wallpapers_to_db.php: 数据库连接成功。');
 
-    // 读取 JSON 文件
+    // 读取 JSON 文件（合并 list.json.patches 中尚未压缩的补丁）
     $jsonFilePath = __DIR__ . '/../static/data/list.json';
     if (!file_exists($jsonFilePath)) {
         throw new Exception('找不到 list.json 文件。');
     }
-    $jsonData = file_get_contents($jsonFilePath);
-    if ($jsonData === false) {
-        throw new Exception('读取 list.json 文件失败。');
-    }
-    $wallpapers = json_decode($jsonData, true);
-    if (json_last_error() !== JSON_ERROR_NONE) {
-        throw new Exception('解析 list.json 文件失败: ' . json_last_error_msg());
+    $wallpapers = loadCatalogJson($jsonFilePath);
+    if ($wallpapers === null) {
+        throw new Exception('读取或解析 list.json 文件失败。');
     }
     tempFileLog('sync_wallpapers_to_db.php: 成功读取并解析 list.json。');
 
@@ -93,6 +93,54 @@ function generateSafeFileName($originalName) {
     return $timestamp . '_' . $randomString . '.' . $extension;
 }
 
+/**
+ * 预留一个壁纸ID（格式 YYYYMMDD+当天序号）
+ * 与 wallpaper_ids.py 共用 wallpaper_id_sequence 表，避免与入库脚本并发时产生重复ID
+ */
+function reserveWallpaperId($conn) {
+    $dateKey = date('Ymd');
+    $conn->query("CREATE TABLE IF NOT EXISTS wallpaper_id_sequence (
+        date_key CHAR(8) NOT NULL PRIMARY KEY,
+        next_seq BIGINT UNSIGNED NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4");
+
+    $stmt = $conn->prepare("INSERT IGNORE INTO wallpaper_id_sequence (date_key, next_seq) VALUES (?, 1)");
+    $stmt->bind_param('s', $dateKey);
+    $stmt->execute();
+    $stmt->close();
+
+    $conn->begin_transaction();
+    try {
+        $stmt = $conn->prepare("SELECT next_seq FROM wallpaper_id_sequence WHERE date_key = ? FOR UPDATE");
+        $stmt->bind_param('s', $dateKey);
+        $stmt->execute();
+        $nextSeq = (int)$stmt->get_result()->fetch_row()[0];
+        $stmt->close();
+
+        // 兼容未经过序号表写入的ID：按主键区间查找当天已用的最大序号（序号1~6位）
+        $ranges = [];
+        for ($digits = 1; $digits <= 6; $digits++) {
+            $ranges[] = 'id BETWEEN ' . $dateKey . pow(10, $digits - 1) . ' AND ' . $dateKey . (pow(10, $digits) - 1);
+        }
+        $maxId = $conn->query("SELECT MAX(id) FROM wallpapers WHERE " . implode(' OR ', $ranges))->fetch_row()[0];
+        if ($maxId !== null) {
+            $nextSeq = max($nextSeq, (int)substr((string)$maxId, 8) + 1);
+        }
+
+        $newNext = $nextSeq + 1;
+        $stmt = $conn->prepare("UPDATE wallpaper_id_sequence SET next_seq = ? WHERE date_key = ?");
+        $stmt->bind_param('is', $newNext, $dateKey);
+        $stmt->execute();
+        $stmt->close();
+        $conn->commit();
+    } catch (Exception $e) {
+        $conn->rollback();
+        throw $e;
+    }
+
+    return (int)($dateKey . $nextSeq);
+}
+
 /**
  * 处理壁纸上传
  */
@@ -166,16 +214,18 @@ function handleWallpaperUpload() {
         $tagsArray = array_filter(array_map('trim', explode(',', $tags)));
         $tagsString = implode(',', $tagsArray);
         
-        // 保存到数据库
+        // 保存到数据库（ID通过序号表预留，不依赖自增值）
+        $wallpaperId = reserveWallpaperId($conn);
         $stmt = $conn->prepare("
             INSERT INTO wallpapers 
-            (user_id, title, description, file_path, file_size, width, height, category, tags, created_at) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NOW())
+            (id, user_id, title, description, file_path, file_size, width, height, category, tags, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NOW())
         ");
         
         $relativePath = 'static/wallpapers/' . $fileName;
         $stmt->bind_param(
-            'issiisiss',
+            'iissiisiss',
+            $wallpaperId,
             $userId,
             $title,
             $description,
@@ -188,7 +238,6 @@ function handleWallpaperUpload() {
         );
         
         if ($stmt->execute()) {
-            $wallpaperId = $conn->insert_id;
             logMessage("壁纸保存成功: ID {$wallpaperId}");
             
             sendResponse(200, '壁纸上传成功', [
@@ -109,6 +109,59 @@ function logApiAccess($action, $params = [], $result = 'success') {
     @file_put_contents($logFile, json_encode($logData, JSON_UNESCAPED_UNICODE) . "\n", FILE_APPEND | LOCK_EX);
 }
 
+/**
+ * 从预计算的随机排列（scripts/build_feed_shuffle.py 生成的 feed_shuffle 表）中取一页壁纸ID
+ * 从随机序号开始按主键区间读取，到末尾后从0继续，代价与页大小成正比，与壁纸总数无关
+ * @param mysqli $conn 数据库连接
+ * @param string $feedKey 组合键，格式 "流放状态:分类"
+ * @param int $count 需要的数量
+ * @param array $excludeIds 需要跳过的ID（分批模式中已加载的）
+ * @return array|null 壁纸ID列表（按随机顺序）；排列不存在或已无可用ID时返回null，由调用方回退到 ORDER BY RAND()
+ */
+function fetchShuffledWallpaperIds($conn, $feedKey, $count, $excludeIds = []) {
+    try {
+        $stmt = $conn->prepare("SELECT size FROM feed_shuffle_meta WHERE feed_key = ?");
+        if (!$stmt) {
+            return null;
+        }
+        $stmt->bind_param('s', $feedKey);
+        $stmt->execute();
+        $row = $stmt->get_result()->fetch_row();
+        $stmt->close();
+        if (!$row || (int)$row[0] <= 0) {
+            return null;
+        }
+        $size = (int)$row[0];
+        $start = random_int(0, $size - 1);
+        $exclude = array_flip($excludeIds);
+        // 多读取与排除数量相同的行，保证跳过已加载的ID后仍能凑满一页
+        $window = $count + count($excludeIds);
+        
+        $ids = [];
+        $stmt = $conn->prepare("SELECT wallpaper_id FROM feed_shuffle WHERE feed_key = ? AND ordinal >= ? AND ordinal < ? ORDER BY ordinal LIMIT ?");
+        foreach ([[$start, $size], [0, $start]] as $range) {
+            list($from, $to) = $range;
+            if ($from >= $to || count($ids) >= $count) {
+                continue;
+            }
+            $stmt->bind_param('siii', $feedKey, $from, $to, $window);
+            $stmt->execute();
+            $result = $stmt->get_result();
+            while (($row = $result->fetch_row()) && count($ids) < $count) {
+                $id = (int)$row[0];
+                if (!isset($exclude[$id])) {
+                    $ids[] = $id;
+                }
+            }
+        }
+        $stmt->close();
+        return empty($ids) ? null : $ids;
+    } catch (Exception $e) {
+        // 表不存在等情况回退到随机排序查询
+        return null;
+    }
+}
+
 try {
     // 建立数据库连接（优化版本 - 减少重试延迟）
     $conn = getDBConnection();
@@ -197,6 +250,26 @@ try {
                 $whereClause = 'WHERE ' . implode(' AND ', $whereConditions);
             }
             
+            // 2025-01-31 分批模式使用不同的限制，随机排序不需要OFFSET
+            $actualLimit = $batchMode ? $batchSize : $limit;
+            
+            // 无搜索条件时从预计算的随机排列中取一页ID，避免对全表 ORDER BY RAND()
+            // 排列由定时任务更新，仍保留上面的筛选条件，排除排列更新前已变化的壁纸
+            $shuffledIds = null;
+            if (empty($search)) {
+                $feedExile = in_array($exile_status, ['normal', 'exiled'], true) ? $exile_status : 'all';
+                $feedCategory = ($category !== 'all' && !empty($category)) ? $category : 'all';
+                $shuffledIds = fetchShuffledWallpaperIds($conn, $feedExile . ':' . $feedCategory, $actualLimit, $batchMode ? $excludeIds : []);
+            }
+            if ($shuffledIds !== null) {
+                $idList = implode(',', $shuffledIds);
+                $dataWhereClause = ($whereClause ? $whereClause . ' AND ' : 'WHERE ') . "w.id IN ({$idList})";
+                $orderClause = "ORDER BY FIELD(w.id, {$idList})";
+            } else {
+                $dataWhereClause = $whereClause;
+                $orderClause = 'ORDER BY RAND()';
+            }
+            
             // 查询总数
             $countSql = "SELECT COUNT(*) as total 
                         FROM wallpapers w 
@@ -234,8 +307,8 @@ try {
                             FROM wallpapers w
                             LEFT JOIN wallpaper_exile_status wes ON w.id = wes.wallpaper_id
                             LEFT JOIN users u ON wes.last_operator_user_id = u.id
-                            {$whereClause}
-                            ORDER BY RAND() 
+                            {$dataWhereClause}
+                            {$orderClause} 
                             LIMIT ?";
             } else {
                 // 简化查询：只获取核心字段，避免复杂JOIN
@@ -253,15 +326,13 @@ try {
                                 COALESCE(wes.status, 0) as exile_status
                             FROM wallpapers w
                             LEFT JOIN wallpaper_exile_status wes ON w.id = wes.wallpaper_id
-                            {$whereClause}
-                            ORDER BY RAND() 
+                            {$dataWhereClause}
+                            {$orderClause} 
                             LIMIT ?";
             }
             
             $dataStmt = $conn->prepare($dataSql);
             $dataParams = $params;
-            // 2025-01-31 分批模式使用不同的限制，随机排序不需要OFFSET
-            $actualLimit = $batchMode ? $batchSize : $limit;
             $dataParams[] = $actualLimit;
             // 移除OFFSET参数，因为随机排序不需要分页偏移
             $dataTypes = $types . 'i';
@@ -9,11 +9,28 @@
 '''
 
 import os
+import io
 import sys
+import json
 import time
+import hashlib
 from PIL import Image
 import argparse
 import re
+import signal
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import wallpaper_dedup
+import wallpaper_scanner
+
+# 可选依赖：watchdog提供inotify等文件系统事件，不可用时监听模式退化为轮询
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 
 # 压缩配置 - 参考自image-compressor.js
 CONFIG = {
@@ -22,21 +39,25 @@ CONFIG = {
         'max_width': 600,
         'max_height': 450,
         'quality': 92,  # PIL中的质量范围是1-95
-        'format': 'JPEG'
+        'format': 'JPEG',
+        'subdir': 'thumbnail',  # 保存到预览目录下的子目录，避免与预览图同名覆盖
+        'extra_formats': {'WEBP': 85, 'AVIF': 60}  # 同名附加输出的格式及质量
     },
     # 预览图配置
     'preview': {
         'max_width': 1200,
         'max_height': 900,
         'quality': 95,
-        'format': 'JPEG'
+        'format': 'JPEG',
+        'extra_formats': {'WEBP': 88, 'AVIF': 65}
     },
     # 原图配置
     'original': {
         'max_width': 1920,
         'max_height': 1080,
         'quality': 95,
-        'format': 'JPEG'
+        'format': 'JPEG',
+        'subdir': 'original'
     }
 }
 
@@ -51,6 +72,28 @@ TARGET_DIR = r'f:\XAMPP\htdocs\static\wallpapers\preview'
 # 支持的图片格式
 SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
 
+# 增量构建清单文件名（保存在每期预览目录中）
+MANIFEST_FILENAME = '.compress_manifest.json'
+MANIFEST_VERSION = 1
+
+# 各格式可用版本的索引文件名（供 api/image_proxy.php 按 Accept 头协商格式）
+FORMAT_INDEX_FILENAME = 'formats.json'
+
+# 路径解析索引文件名（保存在每期预览目录中，供 api/image_token.php 按壁纸直接查找路径，不再扫描目录）
+PATH_INDEX_FILENAME = 'paths.json'
+
+# update_list.py 在每期壁纸目录中记录的入库索引（文件名 -> [大小, 修改时间, 壁纸ID]）
+INGEST_INDEX_FILENAME = '.ingest_index.json'
+
+# 旧版壁纸列表（已发布的壁纸也可能只记录在这里）
+LIST_JSON_PATH = r'f:\XAMPP\htdocs\static\data\list.json'
+
+# 附加输出格式对应的扩展名
+EXTRA_FORMAT_EXTENSIONS = {
+    'WEBP': '.webp',
+    'AVIF': '.avif'
+}
+
 # 统计信息
 stats = {
     'total': 0,
@@ -80,10 +123,6 @@ def get_compressed_path(original_path, compress_type, period=None):
     directory, filename = os.path.split(original_path)
     name, ext = os.path.splitext(filename)
     
-    # 检查是否包含中文
-    if has_chinese(name):
-        print(f"[警告] 检测到中文文件名: {name}，将进行处理")
-    
     # 构建压缩文件名
     config = CONFIG[compress_type]
     # 根据文档要求，文件名与原图同名，且格式为JPEG，所以不再添加后缀
@@ -98,8 +137,83 @@ def get_compressed_path(original_path, compress_type, period=None):
         # 向后兼容，使用原来的目录
         target_dir = TARGET_DIR
     
+    # 预览图直接位于目标目录，其余类型放在各自的子目录
+    if config.get('subdir'):
+        target_dir = os.path.join(target_dir, config['subdir'])
+    
     return os.path.join(target_dir, compressed_filename)
 
+def is_format_supported(image_format):
+    """检查当前Pillow是否支持保存指定格式（AVIF需要Pillow 11.2+或pillow-avif-plugin）"""
+    if image_format == 'AVIF':
+        try:
+            import pillow_avif  # noqa: F401  旧版Pillow通过插件注册AVIF
+        except ImportError:
+            pass
+    Image.init()
+    return image_format in Image.SAVE
+
+def get_variant_paths(compressed_path, compress_type):
+    """获取压缩图片的附加格式路径
+    
+    Args:
+        compressed_path: 主格式压缩图片路径
+        compress_type: 压缩类型 (thumbnail|preview|original)
+        
+    Returns:
+        dict: {格式: 路径}，只包含当前环境支持的格式
+    """
+    base = os.path.splitext(compressed_path)[0]
+    return {
+        image_format: base + EXTRA_FORMAT_EXTENSIONS[image_format]
+        for image_format in CONFIG[compress_type].get('extra_formats', {})
+        if is_format_supported(image_format)
+    }
+
+def outputs_exist(compressed_path, compress_type):
+    """检查主格式及所有附加格式的压缩图片是否都已存在"""
+    paths = [compressed_path] + list(get_variant_paths(compressed_path, compress_type).values())
+    return all(os.path.exists(path) for path in paths)
+
+def outputs_match(record, compressed_path, compress_type):
+    """检查主格式及所有附加格式的文件大小是否与清单记录一致（被截断或手动修改的输出需要重建）"""
+    try:
+        if os.path.getsize(compressed_path) != record.get('output_size'):
+            return False
+        variants = record.get('variants', {})
+        for image_format, variant_path in get_variant_paths(compressed_path, compress_type).items():
+            variant = variants.get(image_format.lower())
+            if variant is None or os.path.getsize(variant_path) != variant.get('output_size'):
+                return False
+    except OSError:
+        return False
+    return True
+
+def save_image(img, path, image_format, quality):
+    """按指定格式保存图片
+    
+    Args:
+        img: PIL图像
+        path: 保存路径
+        image_format: JPEG|WEBP|AVIF
+        quality: 压缩质量
+    """
+    if image_format == 'JPEG':
+        # 如果原图是RGBA模式（有透明通道），转换为RGB
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+        img.save(path, 'JPEG', quality=quality, optimize=True)
+        return
+    
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    if image_format == 'WEBP':
+        img.save(path, 'WEBP', quality=quality, method=6)
+    elif image_format == 'AVIF':
+        img.save(path, 'AVIF', quality=quality, speed=6)
+    else:
+        img.save(path, image_format, quality=quality)
+
 def calculate_compressed_size(original_width, original_height, max_width, max_height):
     """计算压缩后的尺寸
     
@@ -140,59 +254,113 @@ def compress_image(image_path, compress_type='thumbnail', force=False, period=No
     Returns:
         bool: 是否成功
     """
-    try:
-        # 获取压缩配置
-        config = CONFIG.get(compress_type, CONFIG['thumbnail'])
-        
-        # 构建压缩图片路径
-        compressed_path = get_compressed_path(image_path, compress_type, period)
+    if compress_type not in CONFIG:
+        compress_type = 'thumbnail'
+    return compress_renditions(image_path, [compress_type], force, period)
+
+def compress_renditions(image_path, compress_types, force=False, period=None, rendered=None, paths=None):
+    """一次解码原图，按从大到小的顺序生成所有压缩类型
+    
+    Args:
+        image_path: 图片路径
+        compress_types: 压缩类型列表 (thumbnail|preview|original)
+        force: 是否强制重新压缩已存在的图片
+        period: 期数，如'001'、'002'等
+        rendered: 可选列表，成功生成的 (compress_type, compressed_path) 会追加到其中
+        paths: 可选，plan_renditions 已计算的 {压缩类型: 压缩图片路径}
         
-        # 如果压缩图片已存在且不强制重新压缩，则跳过
-        if os.path.exists(compressed_path) and not force:
+    Returns:
+        bool: 是否全部成功
+    """
+    # 检查是否包含中文
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    if has_chinese(name):
+        print(f"[警告] 检测到中文文件名: {name}，将进行处理")
+    
+    # 确定需要生成的目标；若多个类型映射到同一路径，按传入顺序第一个类型生效
+    targets = []
+    claimed_paths = set()
+    for compress_type in compress_types:
+        compressed_path = (paths or {}).get(compress_type) or get_compressed_path(image_path, compress_type, period)
+        if compressed_path in claimed_paths or (outputs_exist(compressed_path, compress_type) and not force):
             print(f"[跳过] {compressed_path} 已存在")
             stats['skipped'] += 1
-            return True
-        
-        # 打开原图
+            continue
+        claimed_paths.add(compressed_path)
+        targets.append((compress_type, compressed_path))
+    
+    if not targets:
+        return True
+    
+    # 按目标面积从大到小排列，较小的版本从上一个版本缩放而来
+    targets.sort(key=lambda t: CONFIG[t[0]]['max_width'] * CONFIG[t[0]]['max_height'], reverse=True)
+    
+    try:
+        # 打开原图（只解码一次）
         with Image.open(image_path) as img:
-            # 记录原始文件大小
             original_size = os.path.getsize(image_path)
-            stats['total_size_before'] += original_size
-            
-            # 计算压缩后的尺寸
-            width, height = calculate_compressed_size(
-                img.width, img.height,
-                config['max_width'], config['max_height']
-            )
-            
-            # 调整图片大小
-            if img.width != width or img.height != height:
-                img = img.resize((width, height), Image.LANCZOS)
-            
-            # 确保目标目录存在
-            os.makedirs(os.path.dirname(compressed_path), exist_ok=True)
-            
-            # 保存压缩图片
-            if config['format'] == 'WEBP':
-                img.save(compressed_path, 'WEBP', quality=config['quality'], method=6)
-            else:  # JPEG
-                # 如果原图是RGBA模式（有透明通道），转换为RGB
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                img.save(compressed_path, 'JPEG', quality=config['quality'], optimize=True)
+            source_width, source_height = img.width, img.height
             
-            # 记录压缩后文件大小
-            compressed_size = os.path.getsize(compressed_path)
-            stats['total_size_after'] += compressed_size
+            # JPEG可在DCT阶段按1/2、1/4、1/8直接缩小解码，
+            # 选取不小于最大目标尺寸的最大缩放比例，再由LANCZOS完成最终缩放
+            if img.format == 'JPEG':
+                largest = CONFIG[targets[0][0]]
+                draft_size = calculate_compressed_size(
+                    source_width, source_height,
+                    largest['max_width'], largest['max_height']
+                )
+                img.draft(img.mode, draft_size)
             
-            # 计算压缩比例
-            ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
+            img.load()
+            current = img
             
-            print(f"[成功] {image_path} -> {compressed_path}")
-            print(f"       尺寸: {img.width}x{img.height} -> {width}x{height}")
-            print(f"       大小: {original_size/1024:.1f}KB -> {compressed_size/1024:.1f}KB (节省 {ratio:.1f}%)")
+            for compress_type, compressed_path in targets:
+                config = CONFIG[compress_type]
+                
+                # 计算压缩后的尺寸（始终以原图尺寸为基准）
+                width, height = calculate_compressed_size(
+                    source_width, source_height,
+                    config['max_width'], config['max_height']
+                )
+                
+                # 上一个版本不足以覆盖目标尺寸时，回退到原图
+                if current.width < width or current.height < height:
+                    current = img
+                
+                # 调整图片大小
+                if current.width != width or current.height != height:
+                    current = current.resize((width, height), Image.LANCZOS)
+                
+                # 确保目标目录存在
+                os.makedirs(os.path.dirname(compressed_path), exist_ok=True)
+                
+                # 保存压缩图片
+                save_image(current, compressed_path, config['format'], config['quality'])
+                
+                # 保存附加格式（WebP/AVIF）
+                variant_sizes = []
+                for image_format, variant_path in get_variant_paths(compressed_path, compress_type).items():
+                    save_image(current, variant_path, image_format, config['extra_formats'][image_format])
+                    variant_sizes.append(f"{image_format} {os.path.getsize(variant_path)/1024:.1f}KB")
+                
+                # 记录压缩前后文件大小
+                compressed_size = os.path.getsize(compressed_path)
+                stats['total_size_before'] += original_size
+                stats['total_size_after'] += compressed_size
+                
+                # 计算压缩比例
+                ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
+                
+                print(f"[成功] {image_path} -> {compressed_path}")
+                print(f"       尺寸: {source_width}x{source_height} -> {width}x{height}")
+                print(f"       大小: {original_size/1024:.1f}KB -> {compressed_size/1024:.1f}KB (节省 {ratio:.1f}%)")
+                if variant_sizes:
+                    print(f"       附加格式: {', '.join(variant_sizes)}")
+                
+                stats['success'] += 1
+                if rendered is not None:
+                    rendered.append((compress_type, compressed_path))
             
-            stats['success'] += 1
             return True
             
     except Exception as e:
@@ -210,109 +378,618 @@ def find_latest_period():
         print(f"[错误] 壁纸基础目录不存在: {BASE_WALLPAPERS_DIR}")
         return None
     
-    # 扫描所有期数目录
-    period_dirs = []
-    for item in os.listdir(BASE_WALLPAPERS_DIR):
-        item_path = os.path.join(BASE_WALLPAPERS_DIR, item)
-        if os.path.isdir(item_path) and item.isdigit() and len(item) == 3:
-            period_dirs.append(item)
-    
-    if not period_dirs:
+    if not wallpaper_scanner.list_period_dirs(BASE_WALLPAPERS_DIR):
         print("[信息] 未找到期数目录")
         return None
     
-    # 倒序排列期数
-    period_dirs.sort(reverse=True)
-    
     # 从最新期数开始检查，找到第一个非空目录
-    for period in period_dirs:
-        period_path = os.path.join(BASE_WALLPAPERS_DIR, period)
-        image_files = [
-            f for f in os.listdir(period_path)
-            if os.path.isfile(os.path.join(period_path, f))
-            and f.lower().endswith(SUPPORTED_FORMATS)
-        ]
-        if image_files:
-            print(f"[发现] 最新期数: {period} (包含 {len(image_files)} 个图片文件)")
-            return period
+    period, count = wallpaper_scanner.find_latest_period(BASE_WALLPAPERS_DIR, SUPPORTED_FORMATS)
+    if period:
+        print(f"[发现] 最新期数: {period} (包含 {count} 个图片文件)")
+        return period
     
     print("[信息] 所有期数目录都为空")
     return None
 
-def get_existing_preview_files(period):
-    """获取指定期数预览目录中已存在的文件列表
+def get_manifest_dir(period=None):
+    """获取增量构建清单所在目录（即压缩图片的目标目录）"""
+    return os.path.join(BASE_PREVIEW_DIR, period) if period else TARGET_DIR
+
+def load_manifest(period=None):
+    """读取增量构建清单
+    
+    清单结构:
+        {'version': 1, 'files': {源文件相对路径: {
+            'size', 'mtime', 'sha256', 'width', 'height',
+            'renditions': {压缩类型: {'config', 'output', 'output_size', 'output_sha256'}},
+            'pending': [尚未成功重建的压缩类型]（可选）
+        }}}
+    
+    Args:
+        period: 期数，如'001'、'002'等
+        
+    Returns:
+        dict: 清单内容，不存在或损坏时返回空清单
+    """
+    manifest_path = os.path.join(get_manifest_dir(period), MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION and isinstance(manifest.get('files'), dict):
+            return manifest
+        print(f"[警告] 清单版本不匹配，将重新建立: {manifest_path}")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"[警告] 读取清单失败，将重新建立: {e}")
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+def save_manifest(manifest, period=None):
+    """原子写入增量构建清单（先写临时文件再替换）"""
+    manifest_dir = get_manifest_dir(period)
+    os.makedirs(manifest_dir, exist_ok=True)
+    manifest_path = os.path.join(manifest_dir, MANIFEST_FILENAME)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, manifest_path)
+
+def file_sha256(path):
+    """分块计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def describe_file(path, period=None):
+    """生成清单中单个输出文件的记录"""
+    return {
+        'output': os.path.relpath(path, get_manifest_dir(period)).replace(os.sep, '/'),
+        'output_size': os.path.getsize(path),
+        'output_sha256': file_sha256(path)
+    }
+
+def describe_output(compress_type, compressed_path, period=None):
+    """生成清单中单个压缩版本的记录（含附加格式）"""
+    record = {'config': CONFIG[compress_type]}
+    record.update(describe_file(compressed_path, period))
+    variants = {}
+    for image_format, variant_path in get_variant_paths(compressed_path, compress_type).items():
+        if os.path.exists(variant_path):
+            variants[image_format.lower()] = describe_file(variant_path, period)
+    if variants:
+        record['variants'] = variants
+    return record
+
+def save_format_index(manifest, period=None):
+    """根据清单生成格式索引，供 api/image_proxy.php 选择客户端可接受的最小格式
+    
+    索引结构: {'version': 1, 'files': {主格式相对路径: {格式: {'path', 'bytes'}}}}
+    """
+    files = {}
+    for entry in manifest['files'].values():
+        for compress_type, record in entry.get('renditions', {}).items():
+            primary_format = record['config']['format'].lower()
+            formats = {primary_format: {'path': record['output'], 'bytes': record['output_size']}}
+            for variant_format, variant in record.get('variants', {}).items():
+                formats[variant_format] = {'path': variant['output'], 'bytes': variant['output_size']}
+            files[record['output']] = formats
+    
+    index_dir = get_manifest_dir(period)
+    index_path = os.path.join(index_dir, FORMAT_INDEX_FILENAME)
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'files': files}, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, index_path)
+
+def load_ingest_ids(period):
+    """读取 update_list.py 的入库索引，返回 {文件名: 壁纸ID}（尚未入库或疑似重复的文件不在其中）"""
+    ingest_path = os.path.join(BASE_WALLPAPERS_DIR, period, INGEST_INDEX_FILENAME)
+    try:
+        with open(ingest_path, 'r', encoding='utf-8') as f:
+            files = json.load(f).get('files', {})
+        return {name: record[2] for name, record in files.items() if len(record) > 2 and record[2]}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"[警告] 读取入库索引失败: {e}")
+        return {}
+
+def filter_unpublished(infos):
+    """从清单中没有记录的文件里去掉已发布的壁纸，只有真正的新图片才做重复检测
+    
+    清单为空（首次运行或清单丢失）时，已入库的图片不能被判定为重复而移出清单和路径索引。
+    已发布 = 入库索引中有壁纸ID，或数据库 wallpapers 表、list.json 中已有该路径；
+    数据库无法访问时无法确认，全部视为已发布，本次不做重复检测。
     
     Args:
+        infos: ImageFileInfo 列表（来自期数目录）
+        
+    Returns:
+        list: 尚未发布的 ImageFileInfo
+    """
+    if not infos:
+        return []
+    
+    published = set()
+    for period in {info.period for info in infos}:
+        published.update(f'static/wallpapers/{period}/{name}' for name in load_ingest_ids(period))
+    
+    def paths_of(info):
+        path = f'static/wallpapers/{info.period}/{info.name}'
+        # 迁移前的 static/wallpapers/xxx.jpg 属于 001 期
+        return (path, f'static/wallpapers/{info.name}') if info.period == '001' else (path,)
+    
+    candidates = [info for info in infos if paths_of(info)[0] not in published]
+    if candidates:
+        try:
+            import wallpaper_db
+            lookup = sorted({path for info in candidates for path in paths_of(info)})
+            for start in range(0, len(lookup), 1000):
+                chunk = lookup[start:start + 1000]
+                _, rows = wallpaper_db.fetch_all(
+                    f"SELECT file_path FROM wallpapers WHERE file_path IN ({', '.join(['%s'] * len(chunk))})", chunk)
+                published.update(file_path.replace('\\', '/').lstrip('/') for (file_path,) in rows)
+        except Exception as e:
+            print(f"[警告] 无法查询数据库中已发布的壁纸，本次跳过重复检测: {e}")
+            return []
+    
+    if candidates and os.path.exists(LIST_JSON_PATH):
+        try:
+            import wallpaper_catalog
+            published.update((item.get('path') or '').replace('\\', '/').lstrip('/')
+                             for item in wallpaper_catalog.CatalogStore(LIST_JSON_PATH).load())
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"[警告] 读取 list.json 失败，本次跳过重复检测: {e}")
+            return []
+    
+    return [info for info in candidates if not any(path in published for path in paths_of(info))]
+
+def save_path_index(manifest, period=None):
+    """根据清单生成路径解析索引，api/image_token.php 据此直接得到原图、预览图和缩略图路径
+    
+    索引结构:
+        {'version': 1, 'files': {源文件相对路径: {
+            'id', 'width', 'height',
+            'original': {'path', 'bytes'},
+            'renditions': {压缩类型: {'path', 'bytes'}}
+        }}, 'ids': {壁纸ID: 源文件相对路径}}
+    路径均相对于网站根目录；只在按期数处理时生成。
+    
+    Args:
+        manifest: 增量构建清单
+        period: 期数，如'001'、'002'等
+    """
+    if not period:
+        return
+    ids = load_ingest_ids(period)
+    files = {}
+    for key, entry in manifest['files'].items():
+        record = {
+            'id': ids.get(key),
+            'width': entry.get('width', 0),
+            'height': entry.get('height', 0),
+            'original': {'path': f'static/wallpapers/{period}/{key}', 'bytes': entry['size']},
+            'renditions': {
+                compress_type: {'path': f'static/preview/{period}/{rendition["output"]}', 'bytes': rendition['output_size']}
+                for compress_type, rendition in entry.get('renditions', {}).items()
+            }
+        }
+        files[key] = record
+    
+    index_path = os.path.join(get_manifest_dir(period), PATH_INDEX_FILENAME)
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': 1,
+            'files': files,
+            'ids': {str(record['id']): key for key, record in files.items() if record['id']}
+        }, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, index_path)
+
+def plan_renditions(file_path, compress_types, entry, force=False, period=None):
+    """根据清单判断源文件需要重建的压缩类型
+    
+    源文件大小和修改时间均未变化时直接信任清单中的哈希，否则重新计算内容哈希；
+    源内容、CONFIG配置或输出文件（缺失或大小与清单不符）任一变化时重建对应类型。
+    需要重建的类型记录在清单的 pending 字段中，全部成功后才移除（见 finish_renditions），
+    中断或失败后再次运行时仍会重建，不会把旧源文件生成的输出当作最新结果。
+    源文件未变化、清单中没有记录但输出已存在的旧文件会被直接纳入清单。
+    
+    Args:
+        file_path: 源图片路径
+        compress_types: 要生成的压缩类型列表
+        entry: 清单中该源文件的记录，没有则为None
+        force: 是否强制重建所有类型
         period: 期数，如'001'、'002'等
         
     Returns:
-        set: 已存在的文件名集合（不含扩展名）
+        (dict, dict): 需要重建的压缩类型 {压缩类型: 压缩图片路径}（路径只计算一次，随任务传给压缩进程），
+        以及更新后的清单记录
     """
-    preview_dir = os.path.join(BASE_PREVIEW_DIR, period)
-    if not os.path.exists(preview_dir):
-        return set()
+    st = os.stat(file_path)
+    if entry and entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime_ns:
+        source_hash = entry['sha256']
+    else:
+        source_hash = file_sha256(file_path)
+    source_changed = bool(entry) and entry.get('sha256') != source_hash
+    
+    renditions = {} if source_changed or not entry else dict(entry.get('renditions', {}))
+    # 上次计划重建但尚未成功的类型；源文件变化时全部重建，无需沿用
+    pending = set() if source_changed or not entry else set(entry.get('pending', []))
+    # 源图尺寸写入路径解析索引，内容未变化时沿用清单中的记录，不重复读取文件头
+    if entry and not source_changed and entry.get('width'):
+        width, height = entry['width'], entry['height']
+    else:
+        width, height, _ = wallpaper_scanner.read_image_header(file_path)
+    new_entry = {
+        'size': st.st_size,
+        'mtime': st.st_mtime_ns,
+        'sha256': source_hash,
+        'width': width,
+        'height': height,
+        'renditions': renditions
+    }
+    
+    todo = {}
+    for compress_type in compress_types:
+        compressed_path = get_compressed_path(file_path, compress_type, period)
+        record = renditions.get(compress_type)
+        if force or compress_type in pending or not outputs_exist(compressed_path, compress_type):
+            todo[compress_type] = compressed_path
+        elif record is None:
+            if entry is None or not source_changed:
+                # 旧版本生成的输出，纳入清单
+                renditions[compress_type] = describe_output(compress_type, compressed_path, period)
+            else:
+                todo[compress_type] = compressed_path
+        elif record.get('config') != CONFIG[compress_type] or not outputs_match(record, compressed_path, compress_type):
+            todo[compress_type] = compressed_path
     
-    existing_files = set()
-    for file in os.listdir(preview_dir):
-        if file.lower().endswith(('.jpg', '.jpeg')):
-            name_without_ext = os.path.splitext(file)[0]
-            existing_files.add(name_without_ext)
+    for compress_type in todo:
+        renditions.pop(compress_type, None)
+    if todo:
+        new_entry['pending'] = list(todo)
     
-    return existing_files
+    return todo, new_entry
 
-def process_directory(directory=SOURCE_DIR, compress_types=None, force=False, period=None):
+def finish_renditions(entry, outputs):
+    """记录成功生成的压缩版本，并从 pending 中移除；失败的类型保留在 pending 中，下次运行重建"""
+    entry['renditions'].update(outputs)
+    pending = [compress_type for compress_type in entry.get('pending', []) if compress_type not in outputs]
+    if pending:
+        entry['pending'] = pending
+    else:
+        entry.pop('pending', None)
+
+def process_directory(directory=SOURCE_DIR, compress_types=None, force=False, period=None, workers=1,
+                      check_duplicates=True):
     """处理目录中的所有图片
     
+    通过每期预览目录中的增量构建清单，只重建源文件内容或配置发生变化的压缩类型。
+    
     Args:
         directory: 要处理的目录
         compress_types: 要生成的压缩类型列表 ['thumbnail', 'preview', 'original']
         force: 是否强制重新压缩已存在的图片
         period: 期数，如'001'、'002'等
+        workers: 并行进程数，1表示串行处理
+        check_duplicates: 是否跳过与已有壁纸感知哈希相近的新图片（仅按期数处理时生效）
     """
     if compress_types is None:
         compress_types = ['thumbnail', 'preview']
     
     # 确定目标目录
-    if period:
-        target_dir = os.path.join(BASE_PREVIEW_DIR, period)
-        # 获取已存在的预览文件，用于去重
-        existing_files = get_existing_preview_files(period) if not force else set()
-        print(f"[信息] 期数 {period} 预览目录中已有 {len(existing_files)} 个文件")
-    else:
-        target_dir = TARGET_DIR
-        existing_files = set()
+    target_dir = get_manifest_dir(period)
     
     # 确保目标目录存在
     os.makedirs(target_dir, exist_ok=True)
     
-    # 遍历目录中的所有文件
-    for root, _, files in os.walk(directory):
-        # 跳过目标目录，避免重复处理或死循环
-        if (os.path.normpath(root) == os.path.normpath(TARGET_DIR) or 
-            os.path.normpath(root).startswith(os.path.normpath(BASE_PREVIEW_DIR))):
+    manifest = load_manifest(period)
+    entries = manifest['files']
+    seen_keys = set()
+    
+    # 遍历目录，收集待处理的文件
+    tasks = []
+    new_files = []  # 清单中没有记录的期数目录文件，压缩前做重复检测
+    # 与监听模式、update_list.py 共用 wallpaper_scanner 列目录（只处理目录本身，不进入子目录，预览目录不会被误扫）
+    for info in wallpaper_scanner.scan_period_files(directory, period, SUPPORTED_FORMATS):
+        file_path = info.path
+        key = info.name
+        seen_keys.add(key)
+        
+        # 增量检查：源文件和配置都未变化的压缩类型直接跳过
+        is_new = key not in entries
+        try:
+            todo, entries[key] = plan_renditions(file_path, compress_types, entries.get(key), force, period)
+        except OSError as e:
+            print(f"[错误] 读取 {file_path} 失败: {str(e)}")
+            stats['error'] += 1
             continue
-            
-        for file in files:
-            # 检查文件扩展名
-            if not file.lower().endswith(SUPPORTED_FORMATS):
+        
+        if not todo:
+            print(f"[跳过] {key} 未变化")
+            stats['skipped'] += 1
+            continue
+        
+        # 统计总数
+        stats['total'] += 1
+        # 清单已判定需要重建，覆盖已存在的输出
+        tasks.append((key, file_path, todo, True, period))
+        if is_new:
+            new_files.append(info)
+    
+    # 移除源文件已删除的记录
+    for key in list(entries):
+        if key not in seen_keys:
+            del entries[key]
+    
+    # 重复检测：与已有壁纸感知哈希相近的新图片不压缩，也不写入清单（已发布的壁纸不参与）
+    if check_duplicates and period:
+        new_files = filter_unpublished(new_files)
+    if check_duplicates and period and new_files:
+        duplicates = wallpaper_dedup.flag_duplicates(os.path.dirname(os.path.normpath(directory)), new_files)
+        skipped = set()
+        for info in new_files:
+            match = duplicates.get(wallpaper_dedup.PerceptualIndex.key_for(info))
+            if match is None:
                 continue
-            
-            # 去重检查：如果文件已存在于预览目录且不强制重新压缩，则跳过
-            name_without_ext = os.path.splitext(file)[0]
-            if period and name_without_ext in existing_files and not force:
-                print(f"[跳过] {file} 预览图已存在")
-                stats['skipped'] += 1
+            source_key, distance = match
+            print(f"[跳过] {info.name} 与 {source_key} 疑似重复（感知哈希距离 {distance}）")
+            del entries[info.name]
+            skipped.add(info.name)
+            stats['total'] -= 1
+            stats['skipped'] += 1
+        tasks = [task for task in tasks if task[0] not in skipped]
+    
+    try:
+        if workers > 1 and len(tasks) > 1:
+            results = run_tasks_parallel(tasks, workers)
+        else:
+            results = (compress_task(task, capture_output=False) for task in tasks)
+        
+        for key, outputs in results:
+            finish_renditions(entries[key], outputs)
+    finally:
+        # 中断时也保存已完成的部分
+        save_manifest(manifest, period)
+        save_format_index(manifest, period)
+        save_path_index(manifest, period)
+
+def compress_task(task, capture_output=True):
+    """处理单个文件的全部压缩类型（也作为进程池的任务函数）
+    
+    Args:
+        task: (key, file_path, targets, force, period) 元组，targets 为 plan_renditions 得到的 {压缩类型: 压缩图片路径}
+        capture_output: 是否捕获控制台输出和统计增量（子进程中使用）
+        
+    Returns:
+        capture_output为True时返回 (key, dict, dict, str)：清单键、输出记录、统计增量、控制台输出；
+        否则返回 (key, dict)
+    """
+    key, file_path, targets, force, period = task
+    rendered = []
+    
+    if not capture_output:
+        compress_renditions(file_path, list(targets), force, period, rendered, targets)
+        return key, describe_outputs(rendered, period)
+    
+    # 子进程有独立的stats副本，清零后即为本任务的增量
+    for stat_key in stats:
+        stats[stat_key] = 0
+    
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        compress_renditions(file_path, list(targets), force, period, rendered, targets)
+    
+    return key, describe_outputs(rendered, period), dict(stats), buffer.getvalue()
+
+def describe_outputs(rendered, period=None):
+    """将生成结果转换为清单记录 {compress_type: record}"""
+    return {
+        compress_type: describe_output(compress_type, compressed_path, period)
+        for compress_type, compressed_path in rendered
+    }
+
+def run_tasks_parallel(tasks, workers):
+    """使用进程池并行压缩，按提交顺序输出日志并合并统计
+    
+    Args:
+        tasks: compress_task 的参数列表
+        workers: 进程数
+        
+    Yields:
+        (key, dict): 清单键和该文件的输出记录
+    """
+    print(f"[信息] 使用 {workers} 个进程并行处理 {len(tasks)} 个文件")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map 按提交顺序返回结果，保证输出顺序与串行模式一致
+        for key, outputs, task_stats, output in executor.map(compress_task, tasks):
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            for stat_key, value in task_stats.items():
+                if stat_key != 'total':
+                    stats[stat_key] += value
+            yield key, outputs
+
+class WakeupHandler(FileSystemEventHandler):
+    """文件系统事件到达时唤醒监听循环"""
+    
+    def __init__(self, wake_event):
+        super().__init__()
+        self.wake_event = wake_event
+    
+    def on_any_event(self, event):
+        self.wake_event.set()
+
+def ignore_interrupt():
+    """进程池初始化函数：子进程忽略Ctrl+C，由主进程负责收尾"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def register_period(period):
+    """调用 update_list.py 将期数中的新图片写入数据库"""
+    try:
+        import update_list
+        update_list.update_wallpaper_list(period=period, auto_upload=True)
+    except Exception as e:
+        print(f"[错误] 期数 {period} 入库失败: {str(e)}")
+
+def watch_wallpapers(compress_types, workers=1, interval=2.0, settle=3.0, register=False, max_pending=32,
+                     check_duplicates=True):
+    """监听模式：持续检测新增或变化的壁纸并压缩
+    
+    文件在 settle 秒内大小和修改时间都不再变化才视为写入完成；
+    进行中的任务数达到 max_pending 时暂停提交，避免批量上传时堆积。
+    
+    Args:
+        compress_types: 要生成的压缩类型列表
+        workers: 压缩进程数
+        interval: 轮询间隔（秒）
+        settle: 写入完成判定时间（秒）
+        register: 一期的任务全部完成后是否调用 update_list.py 入库
+        max_pending: 最大进行中任务数
+        check_duplicates: 是否跳过与已有壁纸感知哈希相近的新图片
+    """
+    manifests = {}  # period -> manifest
+    candidates = {}  # file_path -> (signature, 首次观察到该签名的时间)
+    planned = {}  # file_path -> 已处理的签名
+    pending = {}  # future -> (period, key)
+    dirty_periods = set()
+    
+    wake = threading.Event()
+    observer = None
+    if Observer is not None:
+        observer = Observer()
+        observer.schedule(WakeupHandler(wake), BASE_WALLPAPERS_DIR, recursive=True)
+        observer.start()
+        print(f"[监听] 使用文件系统事件监听: {BASE_WALLPAPERS_DIR}")
+    else:
+        print(f"[监听] 未安装watchdog，每 {interval} 秒轮询: {BASE_WALLPAPERS_DIR}")
+    
+    def collect(futures):
+        for future in futures:
+            period, key = pending.pop(future)
+            try:
+                _, outputs, task_stats, output = future.result()
+            except Exception as e:
+                print(f"[错误] 处理 {key} 失败: {str(e)}")
+                stats['error'] += 1
                 continue
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            for stat_key, value in task_stats.items():
+                if stat_key != 'total':
+                    stats[stat_key] += value
+            entry = manifests[period]['files'].get(key)
+            if entry is not None:  # 处理期间源文件被删除时记录已移除
+                finish_renditions(entry, outputs)
+            dirty_periods.add(period)
+    
+    def flush_idle_periods():
+        busy = {period for period, _ in pending.values()}
+        for period in sorted(dirty_periods - busy):
+            save_manifest(manifests[period], period)
+            save_format_index(manifests[period], period)
+            dirty_periods.discard(period)
+            if register:
+                register_period(period)
+            # 入库后重新生成，写入新分配的壁纸ID
+            save_path_index(manifests[period], period)
+    
+    executor = ProcessPoolExecutor(max_workers=max(1, workers), initializer=ignore_interrupt)
+    try:
+        while True:
+            now = time.time()
+            settled = []
+            infos = wallpaper_scanner.scan_wallpapers(BASE_WALLPAPERS_DIR, SUPPORTED_FORMATS, with_headers=False)
+            
+            # 与 process_directory 相同，移除源文件已删除的清单记录
+            present = {info.path for info in infos}
+            seen_keys = {(info.period, info.name) for info in infos}
+            for period, manifest in manifests.items():
+                removed = [key for key in manifest['files'] if (period, key) not in seen_keys]
+                for key in removed:
+                    del manifest['files'][key]
+                if removed:
+                    dirty_periods.add(period)
+            for tracked in (candidates, planned):
+                for file_path in [file_path for file_path in tracked if file_path not in present]:
+                    del tracked[file_path]
+            
+            for info in infos:
+                file_path, signature = info.path, (info.size, info.mtime_ns)
+                if planned.get(file_path) == signature:
+                    continue
+                previous = candidates.get(file_path)
+                if previous is None or previous[0] != signature:
+                    candidates[file_path] = (signature, now)
+                    continue
+                if now - previous[1] < settle:
+                    continue
                 
-            # 构建完整路径
-            file_path = os.path.join(root, file)
+                # 写入已完成
+                del candidates[file_path]
+                planned[file_path] = signature
+                if info.period not in manifests:
+                    manifests[info.period] = load_manifest(info.period)
+                settled.append(info)
             
-            # 统计总数
-            stats['total'] += 1
+            # 本轮写入完成的新文件合并为一次重复检测，批量上传一期时只刷新一次全库哈希缓存
+            duplicates = {}
+            if check_duplicates:
+                new_infos = filter_unpublished(
+                    [info for info in settled if info.name not in manifests[info.period]['files']])
+                if new_infos:
+                    duplicates = wallpaper_dedup.flag_duplicates(BASE_WALLPAPERS_DIR, new_infos)
             
-            # 对每种压缩类型进行处理
-            for compress_type in compress_types:
-                compress_image(file_path, compress_type, force, period)
+            for info in settled:
+                period, file_path, key = info.period, info.path, info.name
+                entries = manifests[period]['files']
+                # 本轮合并了各期数的新文件，按 "期数/文件名" 查询，不同期数中的同名文件互不影响
+                match = duplicates.get(wallpaper_dedup.PerceptualIndex.key_for(info))
+                if match is not None and key not in entries:
+                    source_key, distance = match
+                    print(f"[跳过] {file_path} 与 {source_key} 疑似重复（感知哈希距离 {distance}）")
+                    stats['skipped'] += 1
+                    continue
+                # 按清单判断需要重建的类型
+                try:
+                    todo, entries[key] = plan_renditions(file_path, compress_types, entries.get(key), False, period)
+                except OSError as e:
+                    print(f"[错误] 读取 {file_path} 失败: {str(e)}")
+                    stats['error'] += 1
+                    continue
+                dirty_periods.add(period)
+                if not todo:
+                    continue
+                
+                # 有界队列：进行中的任务过多时先等待部分完成
+                while len(pending) >= max_pending:
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    collect(done)
+                
+                stats['total'] += 1
+                print(f"[监听] 检测到新文件: {file_path}")
+                future = executor.submit(compress_task, (key, file_path, todo, True, period))
+                pending[future] = (period, key)
+            
+            collect([future for future in list(pending) if future.done()])
+            flush_idle_periods()
+            
+            # 有未稳定的文件或进行中的任务时按间隔轮询，否则等待文件系统事件
+            busy = bool(candidates or pending)
+            wake.wait(interval if busy or observer is None else max(interval, 60))
+            wake.clear()
+    except KeyboardInterrupt:
+        print("\n[监听] 收到中断信号，等待进行中的任务完成...")
+        collect(wait(list(pending)).done)
+        flush_idle_periods()
+    finally:
+        executor.shutdown()
+        if observer is not None:
+            observer.stop()
+            observer.join()
 
 def print_stats():
     """打印统计信息"""
@@ -335,13 +1012,31 @@ def main():
     parser = argparse.ArgumentParser(description='壁纸图片批量压缩工具')
     parser.add_argument('-t', '--types', nargs='+', choices=['thumbnail', 'preview', 'original'],
                         default=['preview'], help='要生成的压缩类型')
-    parser.add_argument('-f', '--force', action='store_true', help='强制重新压缩已存在的图片')
+    parser.add_argument('-f', '--force', action='store_true', help='强制重新压缩（忽略增量构建清单）')
     parser.add_argument('-d', '--directory', help='要处理的目录（如果不指定，将自动检测最新期数）')
     parser.add_argument('-p', '--period', help='指定期数，如001、002等')
     parser.add_argument('--auto', action='store_true', help='自动检测最新期数并处理')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='并行进程数（默认1，0表示使用全部CPU核心）')
+    parser.add_argument('--watch', action='store_true', help='监听模式：持续压缩新上传的壁纸')
+    parser.add_argument('--interval', type=float, default=2.0, help='监听模式的轮询间隔（秒）')
+    parser.add_argument('--settle', type=float, default=3.0, help='监听模式下文件多久无变化视为写入完成（秒）')
+    parser.add_argument('--register', action='store_true', help='监听模式下压缩完成后调用update_list.py入库')
+    parser.add_argument('--allow-duplicates', action='store_true', help='不做感知哈希重复检测，重复图片也压缩')
     
     args = parser.parse_args()
     
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    
+    if args.watch:
+        print(f"压缩类型: {', '.join(args.types)}")
+        print(f"并行进程数: {workers}")
+        print(f"自动入库: {'是' if args.register else '否'}")
+        watch_wallpapers(args.types, workers, args.interval, args.settle, args.register,
+                         check_duplicates=not args.allow_duplicates)
+        print_stats()
+        return
+    
     # 确定处理的目录和期数
     period = None
     directory = args.directory
@@ -378,10 +1073,12 @@ def main():
         print(f"预览目录: {os.path.join(BASE_PREVIEW_DIR, period)}")
     print(f"压缩类型: {', '.join(args.types)}")
     print(f"强制重新压缩: {'是' if args.force else '否'}")
+    print(f"并行进程数: {workers}")
     print("\n开始处理...\n")
     
     start_time = time.time()
-    process_directory(directory, args.types, args.force, period)
+    process_directory(directory, args.types, args.force, period, workers,
+                      check_duplicates=not args.allow_duplicates)
     end_time = time.time()
     
     print_stats()
@@ -393,6 +1090,8 @@ def main():
         print(f"   自动检测最新期数: python compress_wallpapers.py --auto")
         print(f"   指定期数: python compress_wallpapers.py --period={period}")
         print(f"   强制重新压缩: python compress_wallpapers.py --period={period} --force")
+        print(f"   多进程压缩: python compress_wallpapers.py --period={period} --workers=8")
+        print(f"   监听新上传: python compress_wallpapers.py --watch --register")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,625 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: image_cache.py
+描述: api/image_proxy.php 图片优化缓存（static/cache/images）的预热与淘汰工具
+依赖: Pillow库 (pip install Pillow)；清理流放壁纸时需要 PyMySQL
+维护: 缓存键与 optimizeImage 完全一致：md5(图片绝对路径 . 质量 . 新宽度 . 新高度)，
+      新尺寸按PHP的计算方式得出并按PHP的数字转字符串规则拼接；
+      新期数压缩完成或部署后运行，预先生成常用 (质量, 宽, 高) 组合的缓存，避免请求路径上的GD缩放和冷启动雪崩。
+      预热时记录 缓存键 -> 源文件 的索引，PHP按需生成的缓存由 image_proxy.php 追加到 .cache_index.log，
+      预热和淘汰时合并进索引；淘汰时据此删除源图片已删除或已流放的条目，
+      其余条目按最近访问时间（atime与mtime中较新者）从旧到新删除，直到总大小不超过预算
+'''
+
+import os
+import sys
+import time
+import json
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import wallpaper_scanner
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 与 optimizeImage 中的 $cacheDir 一致
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'static', 'cache', 'images')
+CACHE_EXTENSION = '.jpg'
+
+# 预热的图片来源：前端通过Token访问预览图和缩略图，原图只在yulan.php中访问
+SOURCE_DIRS = {
+    'preview': ('static/preview', ('', 'thumbnail')),
+    'wallpapers': ('static/wallpapers', ('',))
+}
+DEFAULT_SOURCES = ('preview',)
+
+# 预热的扩展名（预览目录中的WebP/AVIF版本通过格式协商直接返回，不经过优化缓存）
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# optimizeImage 能处理的源格式，其余格式直接返回原文件
+PROXY_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# image_proxy.php 的默认质量；不缩放且为默认质量的请求会先做格式协商
+PROXY_DEFAULT_QUALITY = 85
+
+# 常用组合 (质量, 最大宽度, 最大高度)：不缩放、默认质量
+# 预览目录 formats.json 中已有更小WebP/AVIF版本的文件由格式协商直接返回，不经过优化缓存，预热时跳过
+DEFAULT_VARIANTS = ((PROXY_DEFAULT_QUALITY, None, None),)
+
+# 与 image_proxy.php 中 negotiatePreviewFormat 参与比较的格式一致
+NEGOTIABLE_FORMATS = ('avif', 'webp')
+FORMAT_INDEX_FILENAME = 'formats.json'
+
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+# 缓存键 -> 源文件相对路径 的索引（保存在缓存目录中，PHP只读取 .jpg 文件，不受影响）
+CACHE_INDEX_FILENAME = '.cache_index.json'
+CACHE_INDEX_VERSION = 1
+
+# image_proxy.php 生成缓存时追加的记录（每行 "缓存键\t源文件相对路径"），合并前改名为 .cache_index.log.<时间戳>
+CACHE_LOG_FILENAME = '.cache_index.log'
+
+# 超过该时间仍未替换的临时文件视为中断残留
+STALE_TEMP_SECONDS = 3600
+
+# 守护模式默认检查间隔（秒）
+DEFAULT_EVICT_INTERVAL = 600
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# 一个缓存条目：源文件、PHP看到的源路径、请求参数和计算出的缓存键
+CacheEntry = namedtuple('CacheEntry', [
+    'source', 'php_path', 'quality', 'width', 'height', 'new_width', 'new_height', 'key'
+])
+
+def php_number(value):
+    """按PHP字符串拼接的规则把数字转为字符串（浮点数为14位有效数字，整数值不带小数点）
+
+    只用于图片尺寸，不会出现需要科学计数法的数值。
+    """
+    if isinstance(value, float):
+        return format(value, '.14G')
+    return str(value)
+
+def normalize_variant(quality=85, max_width=None, max_height=None):
+    """按 image_proxy.php 对 quality/w/h 参数的限制规范化组合"""
+    quality = min(100, max(10, int(quality)))
+    max_width = max(50, min(2000, int(max_width))) if max_width else None
+    max_height = max(50, min(2000, int(max_height))) if max_height else None
+    return quality, max_width, max_height
+
+def parse_variant(text):
+    """解析 "质量[x宽[x高]]" 形式的组合，宽或高为0表示不限制，如 85、80x400、80x0x300"""
+    parts = [int(part) if part else 0 for part in text.lower().split('x')]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"无效的组合: {text}")
+    parts += [0] * (3 - len(parts))
+    return normalize_variant(*parts)
+
+def proxy_dimensions(width, height, max_width=None, max_height=None):
+    """
+    与 optimizeImage 相同的新尺寸计算（保留PHP运算结果的整数/浮点类型）
+
+    Returns:
+        (new_width, new_height)
+    """
+    new_width, new_height = width, height
+    if max_width or max_height:
+        # PHP中整数相除能整除时结果仍为整数
+        ratio = width // height if width % height == 0 else width / height
+        if max_width and max_height:
+            if width > max_width or height > max_height:
+                if ratio > max_width / max_height:
+                    new_width = max_width
+                    new_height = php_divide(max_width, ratio)
+                else:
+                    new_height = max_height
+                    new_width = max_height * ratio
+        elif max_width and width > max_width:
+            new_width = max_width
+            new_height = php_divide(max_width, ratio)
+        elif max_height and height > max_height:
+            new_height = max_height
+            new_width = max_height * ratio
+    return new_width, new_height
+
+def php_divide(a, b):
+    """PHP的 / 运算：两个整数能整除时返回整数，否则返回浮点数"""
+    if isinstance(a, int) and isinstance(b, int) and a % b == 0:
+        return a // b
+    return a / b
+
+def php_source_path(source, php_root=None):
+    """
+    PHP中 realpath 得到的源文件绝对路径（参与缓存键计算）
+
+    Args:
+        source: 源文件路径
+        php_root: PHP看到的项目根目录（与本机路径不同时指定，如容器内），None表示与本机相同
+    """
+    if php_root is None:
+        return os.path.realpath(source)
+    relative = os.path.relpath(os.path.realpath(source), os.path.realpath(PROJECT_ROOT))
+    separator = '\\' if '\\' in php_root and '/' not in php_root else '/'
+    return php_root.rstrip('/\\') + separator + relative.replace(os.sep, separator)
+
+def cache_key(php_path, quality, new_width, new_height):
+    """optimizeImage 的缓存键"""
+    raw = f'{php_path}{quality}{php_number(new_width)}{php_number(new_height)}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+def cache_path(key, cache_dir=CACHE_DIR):
+    """缓存键对应的缓存文件"""
+    return os.path.join(cache_dir, key + CACHE_EXTENSION)
+
+def source_relpath(path):
+    """源文件相对项目根目录的路径（统一使用 /）"""
+    return os.path.relpath(os.path.realpath(path), os.path.realpath(PROJECT_ROOT)).replace(os.sep, '/')
+
+def wallpaper_key(relpath):
+    """
+    源文件对应的壁纸标识 (期数, 文件名去扩展名)，原图、预览图和缩略图得到相同的标识
+
+    迁移前的 static/wallpapers/xxx.jpg 视为 001 期（与 update_list.normalize_wallpaper_path 一致）
+    """
+    parts = relpath.replace('\\', '/').lstrip('/').split('/')
+    stem = os.path.splitext(parts[-1])[0]
+    period = parts[2] if len(parts) > 3 and wallpaper_scanner.is_period_name(parts[2]) else '001'
+    return period, stem
+
+def load_cache_index(cache_dir=CACHE_DIR):
+    """读取缓存索引，返回 {缓存键: 源文件相对路径}"""
+    try:
+        with open(os.path.join(cache_dir, CACHE_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == CACHE_INDEX_VERSION:
+            return data.get('entries', {})
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"[警告] 缓存索引读取失败，将重新建立: {e}")
+    return {}
+
+def save_cache_index(entries, cache_dir=CACHE_DIR):
+    """原子写入缓存索引"""
+    path = os.path.join(cache_dir, CACHE_INDEX_FILENAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_INDEX_VERSION, 'entries': entries}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+def claim_cache_logs(cache_dir=CACHE_DIR, dry_run=False):
+    """
+    取出 image_proxy.php 追加的缓存记录文件
+
+    当前记录文件先改名再读取，PHP之后的追加写入新文件，不会丢失；
+    上次合并中断时留下的已改名文件一并返回。
+
+    Args:
+        dry_run: 不改名，只返回现有的记录文件
+
+    Returns:
+        list: 记录文件路径，合并进索引并保存后由调用方删除
+    """
+    log_path = os.path.join(cache_dir, CACHE_LOG_FILENAME)
+    if not dry_run and os.path.exists(log_path):
+        try:
+            os.replace(log_path, f'{log_path}.{time.time_ns()}')
+        except OSError as e:
+            print(f"[警告] 缓存记录改名失败，下次再合并: {e}")
+    try:
+        with os.scandir(cache_dir) as it:
+            return sorted(entry.path for entry in it
+                          if entry.name == CACHE_LOG_FILENAME or entry.name.startswith(CACHE_LOG_FILENAME + '.'))
+    except FileNotFoundError:
+        return []
+
+def read_cache_logs(paths):
+    """读取缓存记录文件，返回 {缓存键: 源文件相对路径}（后写入的记录优先）"""
+    entries = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    key, _, relpath = line.rstrip('\r\n').partition('\t')
+                    if len(key) == 32 and relpath:
+                        entries[key] = relpath
+        except OSError as e:
+            print(f"[警告] 缓存记录读取失败 {path}: {e}")
+    return entries
+
+def remove_cache_logs(paths):
+    """删除已合并的缓存记录文件（当前正在追加的记录文件不删除）"""
+    for path in paths:
+        if os.path.basename(path) != CACHE_LOG_FILENAME:
+            remove_file(path)
+
+def scan_sources(sources=DEFAULT_SOURCES, periods=None):
+    """
+    列出需要预热的源图片
+
+    Args:
+        sources: SOURCE_DIRS 中的来源名
+        periods: 要扫描的期数列表，None表示全部期数
+
+    Returns:
+        list: ImageFileInfo 列表（已读取文件头）
+    """
+    infos = []
+    for source in sources:
+        base, subdirs = SOURCE_DIRS[source]
+        base_dir = os.path.join(PROJECT_ROOT, *base.split('/'))
+        for period, period_dir in wallpaper_scanner.list_period_dirs(base_dir):
+            if periods is not None and period not in periods:
+                continue
+            for subdir in subdirs:
+                directory = os.path.join(period_dir, subdir) if subdir else period_dir
+                if os.path.isdir(directory):
+                    infos.extend(wallpaper_scanner.scan_period_files(directory, period, SOURCE_EXTENSIONS))
+    return wallpaper_scanner.read_headers(infos)
+
+def load_negotiated_paths(periods=None):
+    """
+    读取各期预览目录的 formats.json，找出格式协商时会被更小的WebP/AVIF版本替代的文件
+
+    Returns:
+        set: 这些文件的绝对路径（realpath）
+    """
+    base, _ = SOURCE_DIRS['preview']
+    base_dir = os.path.join(PROJECT_ROOT, *base.split('/'))
+    negotiated = set()
+    for period, period_dir in wallpaper_scanner.list_period_dirs(base_dir):
+        if periods is not None and period not in periods:
+            continue
+        try:
+            with open(os.path.join(period_dir, FORMAT_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+                files = json.load(f).get('files', {})
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError) as e:
+            print(f"[警告] 格式索引读取失败 {period_dir}: {e}")
+            continue
+        for key, formats in files.items():
+            primary_bytes = min((info['bytes'] for fmt, info in formats.items() if fmt not in NEGOTIABLE_FORMATS),
+                                default=None)
+            if primary_bytes is None:
+                continue
+            if any(fmt in formats and formats[fmt]['bytes'] < primary_bytes for fmt in NEGOTIABLE_FORMATS):
+                negotiated.add(os.path.realpath(os.path.join(period_dir, *key.split('/'))))
+    return negotiated
+
+def iter_entries(infos, variants=DEFAULT_VARIANTS, php_root=None, negotiated=frozenset()):
+    """
+    生成源图片 × 组合的全部缓存条目（跳过 optimizeImage 不会缓存或不会被调用的情况）
+
+    Args:
+        infos: 源图片 ImageFileInfo 列表
+        variants: (质量, 最大宽度, 最大高度) 列表
+        php_root: PHP看到的项目根目录
+        negotiated: 格式协商会返回更小版本的源文件路径（见 load_negotiated_paths）
+    """
+    for info in infos:
+        if info.format not in PROXY_FORMATS or not info.width or not info.height:
+            continue
+        php_path = php_source_path(info.path, php_root)
+        for quality, max_width, max_height in variants:
+            # 不缩放且质量不低于95时直接返回原文件
+            if not max_width and not max_height and quality >= 95:
+                continue
+            # 不缩放的默认质量请求由格式协商返回WebP/AVIF，不读取缓存
+            if (not max_width and not max_height and quality == PROXY_DEFAULT_QUALITY
+                    and os.path.realpath(info.path) in negotiated):
+                continue
+            new_width, new_height = proxy_dimensions(info.width, info.height, max_width, max_height)
+            if int(new_width) < 1 or int(new_height) < 1:
+                continue
+            yield CacheEntry(info, php_path, quality, max_width, max_height, new_width, new_height,
+                             cache_key(php_path, quality, new_width, new_height))
+
+def is_fresh(entry, cache_dir=CACHE_DIR):
+    """与PHP相同的有效性判断：缓存文件的修改时间（秒）晚于源文件"""
+    try:
+        return int(os.stat(cache_path(entry.key, cache_dir)).st_mtime) > entry.source.mtime_ns // 1_000_000_000
+    except OSError:
+        return False
+
+def render(entry, cache_dir=CACHE_DIR):
+    """
+    生成一个缓存文件（先写临时文件再原子替换）
+
+    Returns:
+        int: 缓存文件字节数，失败时返回0
+    """
+    target = cache_path(entry.key, cache_dir)
+    temp_path = f'{target}.{os.getpid()}.tmp'
+    # imagecreatetruecolor 把浮点尺寸截断为整数
+    size = (int(entry.new_width), int(entry.new_height))
+    try:
+        with Image.open(entry.source.path) as img:
+            img.draft('RGB', size)
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # GD输出JPEG时透明区域为白色
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            if img.size != size:
+                img = img.resize(size, Image.LANCZOS)
+            img.save(temp_path, 'JPEG', quality=entry.quality)
+        os.replace(temp_path, target)
+        # 保证修改时间（秒）晚于源文件，否则PHP会认为缓存过期并重新生成
+        source_mtime = entry.source.mtime_ns // 1_000_000_000
+        st = os.stat(target)
+        if int(st.st_mtime) <= source_mtime:
+            os.utime(target, (st.st_atime, source_mtime + 1))
+        return st.st_size
+    except Exception as e:
+        print(f"[错误] 生成缓存失败 {entry.source.path}: {e}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return 0
+
+def warm_cache(sources=DEFAULT_SOURCES, variants=DEFAULT_VARIANTS, periods=None, php_root=None,
+               cache_dir=CACHE_DIR, workers=DEFAULT_WORKERS):
+    """
+    预热缓存：并行生成缺失或过期的缓存文件
+
+    Args:
+        sources: 来源名列表（preview / wallpapers）
+        variants: (质量, 最大宽度, 最大高度) 列表
+        periods: 要处理的期数列表，None表示全部期数
+        php_root: PHP看到的项目根目录，None表示与本机相同
+        cache_dir: 缓存目录
+        workers: 线程数
+
+    Returns:
+        (total, built, failed, bytes_written)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    negotiated = load_negotiated_paths(periods) if 'preview' in sources else frozenset()
+    entries = list(iter_entries(scan_sources(sources, periods), variants, php_root, negotiated))
+    # 同一源图片的多个组合可能得到相同的缓存键（如原图本身小于限制）
+    unique = {}
+    for entry in entries:
+        unique.setdefault(entry.key, entry)
+    index = load_cache_index(cache_dir)
+    logs = claim_cache_logs(cache_dir)
+    index.update(read_cache_logs(logs))
+    index.update((key, source_relpath(entry.source.path)) for key, entry in unique.items())
+    save_cache_index(index, cache_dir)
+    remove_cache_logs(logs)
+
+    pending = [entry for entry in unique.values() if not is_fresh(entry, cache_dir)]
+    if not pending:
+        return len(unique), 0, 0, 0
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+        sizes = list(executor.map(lambda entry: render(entry, cache_dir), pending))
+    built = sum(1 for size in sizes if size)
+    return len(unique), built, len(pending) - built, sum(sizes)
+
+def parse_size(text):
+    """解析 "500M"、"2G" 形式的字节数"""
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+def load_exiled_wallpapers(conn=None):
+    """
+    从数据库读取已流放壁纸的标识
+
+    Returns:
+        set: {(期数, 文件名去扩展名)}
+    """
+    import wallpaper_db
+    rows = wallpaper_db.stream(
+        """SELECT w.file_path FROM wallpapers w
+           JOIN wallpaper_exile_status wes ON w.id = wes.wallpaper_id
+           WHERE wes.status = 1""",
+        conn=conn
+    )
+    return {wallpaper_key(file_path) for (file_path,) in rows if file_path}
+
+def scan_cache(cache_dir=CACHE_DIR):
+    """
+    用 os.scandir 列出缓存文件，顺带删除中断残留的临时文件
+
+    Returns:
+        list: [(缓存键, 路径, 字节数, 最近访问时间)]
+    """
+    files = []
+    now = time.time()
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if now - st.st_mtime > STALE_TEMP_SECONDS:
+                        remove_file(entry.path)
+                    continue
+                if not entry.name.endswith(CACHE_EXTENSION):
+                    continue
+                # noatime 挂载时atime不更新，relatime下一天最多更新一次，以两者中较新的为准
+                files.append((entry.name[:-len(CACHE_EXTENSION)], entry.path, st.st_size,
+                              max(st.st_atime, st.st_mtime)))
+    except FileNotFoundError:
+        pass
+    return files
+
+def remove_file(path):
+    """删除文件，已被其他进程删除时忽略"""
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+def evict_cache(budget_bytes, cache_dir=CACHE_DIR, purge_exiled=True, dry_run=False):
+    """
+    清理缓存目录：先删除源图片已删除或已流放的条目，再按LRU删除到预算以内
+
+    Args:
+        budget_bytes: 缓存总大小上限（字节）
+        cache_dir: 缓存目录
+        purge_exiled: 是否查询数据库删除流放壁纸的缓存
+        dry_run: 只统计，不删除
+
+    Returns:
+        dict: {'files', 'bytes', 'orphaned', 'evicted', 'freed', 'remaining'}
+    """
+    files = scan_cache(cache_dir)
+    total_bytes = sum(size for _, _, size, _ in files)
+    index = load_cache_index(cache_dir)
+    # 合并PHP按需生成的缓存记录，这些条目同样可以按源文件清理
+    logs = claim_cache_logs(cache_dir, dry_run)
+    index.update(read_cache_logs(logs))
+
+    exiled = set()
+    if purge_exiled:
+        try:
+            exiled = load_exiled_wallpapers()
+        except Exception as e:
+            print(f"[警告] 无法读取流放状态，跳过流放壁纸清理: {e}")
+
+    # 索引中源文件已不存在或已流放的缓存键
+    source_exists = {}
+    orphan_keys = set()
+    for key, relpath in index.items():
+        if relpath not in source_exists:
+            source_exists[relpath] = os.path.isfile(os.path.join(PROJECT_ROOT, *relpath.split('/')))
+        if not source_exists[relpath] or wallpaper_key(relpath) in exiled:
+            orphan_keys.add(key)
+
+    stats = {'files': len(files), 'bytes': total_bytes, 'orphaned': 0, 'evicted': 0, 'freed': 0}
+    remaining = []
+    for key, path, size, last_access in files:
+        if key in orphan_keys:
+            if dry_run or remove_file(path):
+                stats['orphaned'] += 1
+                stats['freed'] += size
+                total_bytes -= size
+        else:
+            remaining.append((last_access, key, path, size))
+
+    # 最久未访问的条目先删除
+    remaining.sort()
+    evicted_keys = set()
+    for _, key, path, size in remaining:
+        if total_bytes <= budget_bytes:
+            break
+        if dry_run or remove_file(path):
+            evicted_keys.add(key)
+            stats['evicted'] += 1
+            stats['freed'] += size
+            total_bytes -= size
+
+    if not dry_run:
+        # 只保留仍有缓存文件的条目，索引大小随缓存目录而不是历史请求增长；
+        # 被LRU删除的条目由PHP重新生成时再次记录（或预热时重新写入）
+        kept = {key for _, key, _, _ in remaining if key not in evicted_keys}
+        pruned = {key: relpath for key, relpath in index.items() if key in kept}
+        if pruned != index or logs:
+            save_cache_index(pruned, cache_dir)
+        remove_cache_logs(logs)
+    stats['remaining'] = total_bytes
+    return stats
+
+def print_evict_stats(stats, dry_run=False):
+    """输出一次清理的统计"""
+    action = "需要删除" if dry_run else "已删除"
+    print(f"[成功] 缓存 {stats['files']} 个文件（{stats['bytes']/1024/1024:.2f}MB），"
+          f"{action}失效条目 {stats['orphaned']} 个、LRU淘汰 {stats['evicted']} 个，"
+          f"释放 {stats['freed']/1024/1024:.2f}MB，剩余 {stats['remaining']/1024/1024:.2f}MB")
+
+def run_evict_daemon(budget_bytes, interval=DEFAULT_EVICT_INTERVAL, cache_dir=CACHE_DIR, purge_exiled=True):
+    """守护模式：每隔 interval 秒清理一次，Ctrl+C 退出"""
+    print(f"缓存清理守护进程已启动，预算 {budget_bytes/1024/1024:.0f}MB，间隔 {interval}秒")
+    try:
+        while True:
+            try:
+                print_evict_stats(evict_cache(budget_bytes, cache_dir, purge_exiled))
+            except Exception as e:
+                print(f"[错误] 缓存清理失败: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("缓存清理守护进程已退出")
+
+if __name__ == '__main__':
+    # 用法: python image_cache.py [--source=preview,wallpapers] [--period=001,002] [--variant=85 --variant=80x400x300]
+    #                             [--php-root=/var/www/html] [--workers=N]
+    #       python image_cache.py --evict=2G [--keep-exiled] [--dry-run] [--daemon [--interval=600]]
+    budget = None
+    purge_exiled = True
+    dry_run = False
+    daemon = False
+    interval = DEFAULT_EVICT_INTERVAL
+    sources = DEFAULT_SOURCES
+    periods = None
+    variants = []
+    php_root = None
+    workers = DEFAULT_WORKERS
+    for arg in sys.argv[1:]:
+        if arg.startswith('--source='):
+            sources = tuple(source for source in arg.split('=', 1)[1].split(',') if source)
+            unknown = [source for source in sources if source not in SOURCE_DIRS]
+            if unknown:
+                print(f"[错误] 未知来源: {', '.join(unknown)}（可选: {', '.join(SOURCE_DIRS)}）")
+                sys.exit(1)
+        elif arg.startswith('--period='):
+            periods = [period.zfill(3) for period in arg.split('=', 1)[1].split(',') if period]
+        elif arg.startswith('--variant='):
+            try:
+                variants.append(parse_variant(arg.split('=', 1)[1]))
+            except ValueError as e:
+                print(f"[错误] {e}")
+                sys.exit(1)
+        elif arg.startswith('--php-root='):
+            php_root = arg.split('=', 1)[1]
+        elif arg.startswith('--workers='):
+            workers = max(1, int(arg.split('=', 1)[1]))
+        elif arg.startswith('--evict='):
+            budget = parse_size(arg.split('=', 1)[1])
+        elif arg == '--keep-exiled':
+            purge_exiled = False
+        elif arg == '--dry-run':
+            dry_run = True
+        elif arg == '--daemon':
+            daemon = True
+        elif arg.startswith('--interval='):
+            interval = max(1, int(arg.split('=', 1)[1]))
+        else:
+            print("用法: python image_cache.py [--source=preview,wallpapers] [--period=001,002] "
+                  "[--variant=质量[x宽[x高]] ...] [--php-root=目录] [--workers=N]\n"
+                  "      python image_cache.py --evict=2G [--keep-exiled] [--dry-run] [--daemon [--interval=秒]]")
+            sys.exit(0 if arg in ('--help', '-h') else 1)
+
+    start_time = time.time()
+    if budget is not None:
+        if daemon:
+            run_evict_daemon(budget, interval, purge_exiled=purge_exiled)
+        else:
+            print_evict_stats(evict_cache(budget, purge_exiled=purge_exiled, dry_run=dry_run), dry_run)
+            print(f"耗时: {time.time() - start_time:.2f}秒")
+        sys.exit(0)
+
+    total, built, failed, bytes_written = warm_cache(sources, tuple(variants) or DEFAULT_VARIANTS, periods,
+                                                     php_root, workers=workers)
+    print(f"[成功] 共 {total} 个缓存条目，新生成 {built} 个（{bytes_written/1024/1024:.2f}MB），"
+          f"已是最新 {total - built - failed} 个")
+    if failed:
+        print(f"[错误] {failed} 个条目生成失败")
+    print(f"耗时: {time.time() - start_time:.2f}秒")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: image_tokens.py
+描述: 批量预生成图片访问Token（image_tokens 表）
+依赖: PyMySQL (pip install pymysql)
+维护: Token算法与 api/image_token.php 的 generateImageToken 一致：
+      sha256(壁纸ID|图片路径|路径类型|时间戳|32位随机十六进制 . 盐)；
+      为每张壁纸的 original 和 preview 两种路径类型写入Token，已有Token保留不变（只同步路径），
+      入库后运行即可让 getOrCreateToken 在请求时只做查询
+'''
+
+import os
+import sys
+import time
+import hashlib
+import secrets
+import wallpaper_db
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 与 generateImageToken 中的 $salt 一致
+TOKEN_SALT = 'jelisgo_image_token_2025'
+
+PATH_TYPES = ('original', 'preview')
+
+# 预览图由 compress_wallpapers.py 生成，与原图同名、扩展名为 .jpeg
+PREVIEW_EXTENSION = '.jpeg'
+
+DEFAULT_BATCH_SIZE = 2000
+
+def generate_token(wallpaper_id, image_path, path_type):
+    """与 generateImageToken 相同的Token生成方式"""
+    data = f'{wallpaper_id}|{image_path}|{path_type}|{int(time.time())}|{secrets.token_hex(16)}'
+    return hashlib.sha256((data + TOKEN_SALT).encode('utf-8')).hexdigest()
+
+def image_path_for(file_path, path_type):
+    """
+    壁纸在指定路径类型下的图片路径
+
+    original 为数据库中的 file_path（与 sync/auto_generate 操作一致），
+    preview 为 static/preview/期数/同名.jpeg
+
+    Returns:
+        str: 相对项目根目录的路径，无法确定时返回None
+    """
+    path = file_path.replace('\\', '/').lstrip('/')
+    if path_type == 'original':
+        return path
+    parts = path.split('/')
+    if len(parts) < 3 or parts[0] != 'static' or parts[1] != 'wallpapers':
+        return None
+    # 迁移前的 static/wallpapers/xxx.jpg 属于 001 期
+    period = parts[2] if len(parts) > 3 else '001'
+    return f'static/preview/{period}/{os.path.splitext(parts[-1])[0]}{PREVIEW_EXTENSION}'
+
+def load_existing_tokens(conn, ids=None):
+    """
+    读取已有Token的路径
+
+    Returns:
+        dict: {(壁纸ID字符串, 路径类型): 图片路径}
+    """
+    sql = "SELECT wallpaper_id, path_type, image_path FROM image_tokens"
+    params = None
+    if ids is not None:
+        sql += f" WHERE wallpaper_id IN ({', '.join(['%s'] * len(ids))})"
+        params = [str(wallpaper_id) for wallpaper_id in ids]
+    return {(str(wallpaper_id), path_type): image_path
+            for wallpaper_id, path_type, image_path in wallpaper_db.stream(sql, params, conn=conn)}
+
+def iter_wallpapers(conn, ids=None):
+    """流式读取壁纸ID和路径"""
+    sql = "SELECT id, file_path FROM wallpapers"
+    params = None
+    if ids is not None:
+        sql += f" WHERE id IN ({', '.join(['%s'] * len(ids))})"
+        params = list(ids)
+    return wallpaper_db.stream(sql + " ORDER BY id", params, conn=conn)
+
+def plan_tokens(wallpapers, existing, base_dir=PROJECT_ROOT):
+    """
+    对比壁纸与已有Token，得到需要新建的Token和需要同步的路径
+
+    文件不存在的路径不生成Token（与 sync 操作一致），预览图压缩完成后再次运行即可补齐。
+
+    Returns:
+        (inserts, updates, missing): [(壁纸ID, token, 路径, 类型)]、[(路径, 壁纸ID, 类型)]、缺失文件数
+    """
+    inserts = []
+    updates = []
+    missing = 0
+    exists = {}
+    for wallpaper_id, file_path in wallpapers:
+        if not file_path:
+            continue
+        wallpaper_id = str(wallpaper_id)
+        for path_type in PATH_TYPES:
+            image_path = image_path_for(file_path, path_type)
+            if image_path is None:
+                continue
+            current = existing.get((wallpaper_id, path_type))
+            if current == image_path:
+                continue
+            if image_path not in exists:
+                exists[image_path] = os.path.isfile(os.path.join(base_dir, *image_path.split('/')))
+            if not exists[image_path]:
+                missing += 1
+                continue
+            if current is None:
+                inserts.append((wallpaper_id, generate_token(wallpaper_id, image_path, path_type), image_path, path_type))
+            else:
+                # 与 getOrCreateToken 相同：路径变化时保留原Token，只更新路径
+                updates.append((image_path, wallpaper_id, path_type))
+    return inserts, updates, missing
+
+def sync_tokens(conn=None, ids=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    为壁纸批量生成缺失的Token
+
+    Args:
+        conn: 可选，复用已有连接
+        ids: 只处理这些壁纸ID（入库后增量运行），None表示全部壁纸
+        batch_size: 每条多行语句的行数
+        dry_run: 只统计，不写入数据库
+
+    Returns:
+        (created, updated, missing)
+    """
+    if conn is None:
+        with wallpaper_db.connection() as pooled_conn:
+            return sync_tokens(pooled_conn, ids, batch_size, dry_run)
+    if ids is not None and not ids:
+        return 0, 0, 0
+
+    existing = load_existing_tokens(conn, ids)
+    inserts, updates, missing = plan_tokens(iter_wallpapers(conn, ids), existing)
+    if not dry_run and (inserts or updates):
+        with wallpaper_db.transaction(conn) as cursor:
+            # 与 saveTokenToDatabase 相同使用 REPLACE，多行VALUES批量写入
+            wallpaper_db.executemany(
+                cursor,
+                "REPLACE INTO image_tokens (wallpaper_id, token, image_path, path_type) VALUES (%s, %s, %s, %s)",
+                inserts,
+                batch_size
+            )
+            if updates:
+                cursor.executemany(
+                    "UPDATE image_tokens SET image_path = %s WHERE wallpaper_id = %s AND path_type = %s",
+                    updates
+                )
+    return len(inserts), len(updates), missing
+
+if __name__ == '__main__':
+    # 用法: python image_tokens.py [--batch-size=2000] [--dry-run]
+    batch_size = DEFAULT_BATCH_SIZE
+    dry_run = False
+    for arg in sys.argv[1:]:
+        if arg.startswith('--batch-size='):
+            batch_size = max(1, int(arg.split('=', 1)[1]))
+        elif arg == '--dry-run':
+            dry_run = True
+        else:
+            print("用法: python image_tokens.py [--batch-size=2000] [--dry-run]")
+            sys.exit(0 if arg in ('--help', '-h') else 1)
+
+    start_time = time.time()
+    try:
+        created, updated, missing = sync_tokens(batch_size=batch_size, dry_run=dry_run)
+    except Exception as e:
+        print(f"[错误] 生成Token失败: {e}")
+        sys.exit(1)
+    action = "需要" if dry_run else "已"
+    print(f"[成功] {action}新建 {created} 个Token，{action}同步 {updated} 个路径")
+    if missing:
+        print(f"[跳过] {missing} 个图片文件不存在（预览图未生成时压缩后再运行）")
+    print(f"耗时: {time.time() - start_time:.2f}秒")
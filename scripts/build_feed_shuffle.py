@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+首页随机壁纸流预计算脚本
+文件: build_feed_shuffle.py
+功能: 为每个 流放状态 × 分类 组合预先计算壁纸ID的随机排列，写入 feed_shuffle 表（连续序号 ordinal），
+      api/wallpaper_data.php 从随机序号开始按主键区间读取一页，替代对全表 ORDER BY RAND()。
+      增量更新：删除的壁纸用最后一个元素填补空位，新增的壁纸用 inside-out Fisher–Yates 插入随机位置，
+      排列始终保持均匀随机，只写入发生变化的序号。
+
+组合键 feed_key 格式为 "流放状态:分类"，流放状态为 all/normal/exiled，分类为 all 或分类名。
+
+用法:
+    python scripts/build_feed_shuffle.py [--rebuild]
+    --rebuild  丢弃现有排列，全部重新打乱
+"""
+
+import os
+import sys
+import time
+import random
+
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import wallpaper_db
+
+CREATE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS feed_shuffle (
+        feed_key VARCHAR(150) NOT NULL,
+        ordinal INT UNSIGNED NOT NULL,
+        wallpaper_id BIGINT NOT NULL,
+        PRIMARY KEY (feed_key, ordinal)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS feed_shuffle_meta (
+        feed_key VARCHAR(150) NOT NULL PRIMARY KEY,
+        size INT UNSIGNED NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+]
+
+MEMBERS_QUERY = """
+    SELECT w.id, w.category, COALESCE(wes.status, 0)
+    FROM wallpapers w
+    LEFT JOIN wallpaper_exile_status wes ON w.id = wes.wallpaper_id
+    ORDER BY w.id
+"""
+
+def feed_keys(category, exile_status):
+    """一张壁纸所属的全部组合键（与 wallpaper_data.php 的筛选条件一致）"""
+    exile_keys = ('all', 'exiled' if exile_status == 1 else 'normal')
+    category_keys = ('all', category) if category else ('all',)
+    return [f'{exile_key}:{category_key}' for exile_key in exile_keys for category_key in category_keys]
+
+def load_members(conn):
+    """按组合键分组的壁纸ID（ID升序）"""
+    members = {}
+    for wallpaper_id, category, exile_status in wallpaper_db.stream(MEMBERS_QUERY, conn=conn):
+        for key in feed_keys(category, int(exile_status)):
+            members.setdefault(key, []).append(wallpaper_id)
+    return members
+
+def load_current(conn):
+    """读取现有排列"""
+    current = {}
+    for feed_key, _, wallpaper_id in wallpaper_db.stream(
+            "SELECT feed_key, ordinal, wallpaper_id FROM feed_shuffle ORDER BY feed_key, ordinal", conn=conn):
+        current.setdefault(feed_key, []).append(wallpaper_id)
+    return current
+
+def update_permutation(current, members, rng):
+    """
+    在现有排列上增量应用删除和新增
+
+    Args:
+        current: 现有排列
+        members: 当前应包含的壁纸ID
+        rng: random.Random 实例
+
+    Returns:
+        list: 新排列
+    """
+    member_set = set(members)
+    permutation = list(current)
+    positions = {wallpaper_id: i for i, wallpaper_id in enumerate(permutation)}
+
+    # 删除：最后一个元素移入空位，序号保持连续
+    for wallpaper_id in [wallpaper_id for wallpaper_id in current if wallpaper_id not in member_set]:
+        i = positions.pop(wallpaper_id)
+        last = permutation.pop()
+        if last != wallpaper_id:
+            permutation[i] = last
+            positions[last] = i
+
+    # 新增：inside-out Fisher–Yates，新元素放到随机位置，原位置的元素移到末尾
+    for wallpaper_id in members:
+        if wallpaper_id in positions:
+            continue
+        j = rng.randint(0, len(permutation))
+        if j == len(permutation):
+            permutation.append(wallpaper_id)
+        else:
+            displaced = permutation[j]
+            permutation.append(displaced)
+            positions[displaced] = len(permutation) - 1
+            permutation[j] = wallpaper_id
+        positions[wallpaper_id] = j
+    return permutation
+
+def write_feed(conn, feed_key, current, permutation):
+    """
+    只写入变化的序号，删除多余的序号并更新大小（单个事务，读取方不会看到中间状态）
+
+    Returns:
+        int: 写入的行数
+    """
+    changed = [
+        (feed_key, ordinal, wallpaper_id)
+        for ordinal, wallpaper_id in enumerate(permutation)
+        if ordinal >= len(current) or current[ordinal] != wallpaper_id
+    ]
+    with wallpaper_db.transaction(conn) as cursor:
+        wallpaper_db.executemany(
+            cursor,
+            """INSERT INTO feed_shuffle (feed_key, ordinal, wallpaper_id) VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE wallpaper_id = VALUES(wallpaper_id)""",
+            changed
+        )
+        if len(current) > len(permutation):
+            cursor.execute("DELETE FROM feed_shuffle WHERE feed_key = %s AND ordinal >= %s", (feed_key, len(permutation)))
+        if permutation:
+            cursor.execute(
+                """INSERT INTO feed_shuffle_meta (feed_key, size) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE size = VALUES(size)""",
+                (feed_key, len(permutation))
+            )
+        else:
+            cursor.execute("DELETE FROM feed_shuffle_meta WHERE feed_key = %s", (feed_key,))
+    return len(changed)
+
+def build_feeds(rebuild=False):
+    """
+    更新全部组合的随机排列
+
+    Returns:
+        (feed_count, written): 组合数和写入的行数
+    """
+    rng = random.Random()
+    written = 0
+    with wallpaper_db.connection() as conn:
+        with wallpaper_db.transaction(conn) as cursor:
+            for sql in CREATE_TABLES:
+                cursor.execute(sql)
+        members = load_members(conn)
+        current = load_current(conn)
+
+        for feed_key in sorted(set(members) | set(current)):
+            old = current.get(feed_key, [])
+            permutation = update_permutation([] if rebuild else old, members.get(feed_key, []), rng)
+            count = write_feed(conn, feed_key, old, permutation)
+            written += count
+            if count or len(old) != len(permutation):
+                print(f"  {feed_key}: {len(old)} -> {len(permutation)} 条，写入 {count} 行")
+    return len(members), written
+
+def main():
+    rebuild = False
+    for arg in sys.argv[1:]:
+        if arg == '--rebuild':
+            rebuild = True
+        elif arg in ('--help', '-h'):
+            print(__doc__)
+            return
+        else:
+            print(f"未知参数: {arg}")
+            print(__doc__)
+            sys.exit(1)
+
+    print("开始更新随机壁纸流..." + ("（全部重新打乱）" if rebuild else ""))
+    start_time = time.time()
+    try:
+        feed_count, written = build_feeds(rebuild)
+    except Exception as e:
+        print(f"更新失败: {e}")
+        sys.exit(1)
+    print(f"\n更新完成，共 {feed_count} 个组合，写入 {written} 行，耗时 {time.time() - start_time:.2f}秒")
+
+if __name__ == '__main__':
+    main()
@@ -6,22 +6,19 @@
 功能: 创建categories表和初始化数据
 """
 
-import mysql.connector
+import pymysql
+import os
 import sys
 
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import wallpaper_db
+
 def get_db_connection():
     """获取数据库连接"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='wallpaper_db',
-            user='root',
-            password='',
-            charset='utf8mb4',
-            collation='utf8mb4_unicode_ci'
-        )
-        return connection
-    except mysql.connector.Error as e:
+        return wallpaper_db.connect()
+    except pymysql.Error as e:
         print(f"数据库连接失败: {e}")
         return None
 
@@ -96,7 +93,7 @@ def create_categories_table():
                 """
                 cursor.execute(fk_sql)
                 print("✅ 外键约束添加成功")
-            except mysql.connector.Error as e:
+            except pymysql.Error as e:
                 print(f"⚠️ 外键约束添加失败（可能已存在）: {e}")
         else:
             print("✅ wallpapers表已有category_id字段")
@@ -104,12 +101,12 @@ def create_categories_table():
         conn.commit()
         return True
         
-    except mysql.connector.Error as e:
+    except pymysql.Error as e:
         print(f"创建表失败: {e}")
         conn.rollback()
         return False
     finally:
-        if conn.is_connected():
+        if conn.open:
             cursor.close()
             conn.close()
 
@@ -1,14 +1,12 @@
-import pymysql
+import os
+import sys
+
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import wallpaper_db
 
 def main():
-    conn = pymysql.connect(
-        host='localhost',
-        port=3306,
-        user='root',
-        password='',
-        database='wallpaper_db',
-        charset='utf8mb4'
-    )
+    conn = wallpaper_db.connect()
     cursor = conn.cursor()
     try:
         print("\n=== wallpaper_likes 表结构 ===")
@@ -1,12 +1,12 @@
-import mysql.connector
+import os
+import sys
+
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import wallpaper_db
 
 try:
-    conn = mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='',
-        database='wallpaper_db'
-    )
+    conn = wallpaper_db.connect()
     cursor = conn.cursor()
     
     # 查看wallpapers表结构
@@ -5,20 +5,21 @@
 位置: create_admin_logs_table.py
 """
 
-import mysql.connector
-from mysql.connector import Error
+from pymysql import Error
+import os
+import sys
+
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import wallpaper_db
 
 def create_admin_logs_table():
+    connection = None
     try:
         # 连接数据库
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='wallpaper_db',
-            user='root',
-            password=''
-        )
+        connection = wallpaper_db.connect()
         
-        if connection.is_connected():
+        if connection.open:
             cursor = connection.cursor()
             
             # 创建管理员日志表
@@ -56,7 +57,7 @@ def create_admin_logs_table():
         print(f"❌ 数据库错误: {e}")
     
     finally:
-        if connection.is_connected():
+        if connection and connection.open:
             cursor.close()
             connection.close()
             print("\n🔌 数据库连接已关闭")
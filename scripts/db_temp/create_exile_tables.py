@@ -1,6 +1,11 @@
 import pymysql
+import os
 import sys
 
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import wallpaper_db
+
 """
 @file create_exile_tables.py
 @brief 创建壁纸流放状态表和操作日志表
@@ -9,24 +14,10 @@ import sys
 
 print("开始执行 create_exile_tables.py：创建数据库表...")
 
-# 数据库配置，请根据您的实际情况修改
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'wallpaper_db'
-}
-
 def create_tables():
     conn = None
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            charset='utf8mb4'
-        )
+        conn = wallpaper_db.connect()
         cursor = conn.cursor()
 
         # 创建 wallpaper_exile_status 表
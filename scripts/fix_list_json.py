@@ -6,9 +6,14 @@
 """
 
 import re
+import sys
 import json
 import os
 
+# 引入仓库根目录下的公共模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import wallpaper_catalog
+
 def fix_git_conflicts_in_json(file_path):
     """
     修复JSON文件中的Git合并冲突
@@ -51,9 +56,13 @@ def fix_git_conflicts_in_json(file_path):
         f.write(content)
     print(f"原文件已备份到: {backup_path}")
     
-    # 写入修复后的内容
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(fixed_content)
+    # 原子替换为修复后的内容，读取方不会看到写了一半的文件
+    wallpaper_catalog.write_atomic(file_path, fixed_content.encode('utf-8'))
+    
+    # 合并尚未压缩的补丁日志（见 wallpaper_catalog.CatalogStore）
+    store = wallpaper_catalog.CatalogStore(file_path)
+    if os.path.exists(store.log_path) or os.path.exists(store.compacting_path):
+        print(f"合并补丁日志，共 {store.compact()} 条记录")
     
     print("文件修复完成")
     return True
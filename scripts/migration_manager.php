@@ -8,6 +8,7 @@
  */
 
 require_once __DIR__ . '/../config/database.php';
+require_once __DIR__ . '/../api/catalog_store.php';
 
 class MigrationManager {
     private $conn;
@@ -64,6 +65,7 @@ class MigrationManager {
         
         $filesToBackup = [
             'static/data/list.json',
+            'static/data/list.json.patches',
             'static/js/image-loader.js',
             'config/database.php',
             'index.php'
@@ -135,7 +137,7 @@ class MigrationManager {
             return false;
         }
         
-        $jsonData = json_decode(file_get_contents($jsonPath), true);
+        $jsonData = loadCatalogJson($jsonPath);
         if (!$jsonData) {
             $this->log('Failed to parse list.json', 'ERROR');
             return false;
@@ -207,7 +209,7 @@ class MigrationManager {
         
         // 读取list.json数据
         $jsonPath = __DIR__ . '/../static/data/list.json';
-        $jsonData = json_decode(file_get_contents($jsonPath), true);
+        $jsonData = loadCatalogJson($jsonPath) ?? [];
         
         $insertedCount = 0;
         $updatedCount = 0;
@@ -1,6 +1,11 @@
 import pymysql
+import os
 import sys
 
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import wallpaper_db
+
 """
 @file mysql_test.py
 @brief 输出 wallpaper_likes 表结构，确认列名
@@ -9,41 +14,18 @@ import sys
 
 print("开始执行 mysql_test.py")
 
-def run_sql_query(host, user, password, database, query):
-    conn = None
+def run_sql_query(query):
     try:
-        conn = pymysql.connect(host=host, user=user, password=password, database=database)
-        cursor = conn.cursor()
-        cursor.execute(query)
-        results = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        return columns, results
+        return wallpaper_db.fetch_all(query)
     except pymysql.Error as e:
         print(f"数据库查询失败: {e}")
         return None, None
-    finally:
-        if conn:
-            conn.close()
-
-# 数据库配置，请根据您的实际情况修改
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'wallpaper_db'
-}
 
 # 检查是否有命令行参数传入的自定义SQL查询
 if len(sys.argv) > 1:
     custom_query = sys.argv[1]
     print(f"执行自定义查询: {custom_query}")
-    columns, results = run_sql_query(
-        DB_CONFIG['host'],
-        DB_CONFIG['user'],
-        DB_CONFIG['password'],
-        DB_CONFIG['database'],
-        custom_query
-    )
+    columns, results = run_sql_query(custom_query)
     
     if columns and results is not None:
         print("\n--- 查询结果 ---")
@@ -58,13 +40,7 @@ if len(sys.argv) > 1:
 # 查询wallpapers表中的file_path字段
 print("正在查询 wallpapers 表中的 file_path 字段...")
 query_wallpapers = "SELECT id, file_path FROM wallpapers LIMIT 10;"
-columns_wallpapers, data_wallpapers = run_sql_query(
-    DB_CONFIG['host'],
-    DB_CONFIG['user'],
-    DB_CONFIG['password'],
-    DB_CONFIG['database'],
-    query_wallpapers
-)
+columns_wallpapers, data_wallpapers = run_sql_query(query_wallpapers)
 
 if columns_wallpapers and data_wallpapers is not None:
     print("\n--- wallpapers 表中的 file_path 字段 ---")
@@ -78,13 +54,7 @@ else:
 # 2024-07-27 新增：查询 wallpaper_favorites 表中 user_id 为 1 的所有记录
 print("\n正在查询 wallpaper_favorites 表中 user_id 为 1 的所有记录...")
 query_favorites = "SELECT * FROM wallpaper_favorites WHERE user_id = 1;"
-columns_favorites, data_favorites = run_sql_query(
-    DB_CONFIG['host'],
-    DB_CONFIG['user'],
-    DB_CONFIG['password'],
-    DB_CONFIG['database'],
-    query_favorites
-)
+columns_favorites, data_favorites = run_sql_query(query_favorites)
 
 if columns_favorites and data_favorites is not None:
     print("\n--- wallpaper_favorites 表中 user_id = 1 的记录 ---")
@@ -98,14 +68,7 @@ else:
 print("mysql_test.py 执行完毕")
 
 def main():
-    conn = pymysql.connect(
-        host='localhost',
-        port=3306,
-        user='root',
-        password='',
-        database='wallpaper_db',
-        charset='utf8mb4'
-    )
+    conn = wallpaper_db.connect()
     cursor = conn.cursor()
     try:
         print("\n=== wallpaper_favorites 表结构 ===")
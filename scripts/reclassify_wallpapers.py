@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+壁纸重新分类脚本
+文件: reclassify_wallpapers.py
+功能: 关键词表（wallpaper_classifier.py）更新后，按主键顺序分块读取 wallpapers 表重新判断分类，
+      只更新分类（或标签）确实发生变化的记录，每块按新值分组合并为少量 UPDATE 语句。
+      与入库时相同按 file_path 的文件名分类，且只处理 update_list.py 入库、标题未被修改过的记录
+      （期数目录中的文件且标题等于文件名去扩展名）；网页上传或管理员编辑过的记录分类由人工选择，不改动
+
+用法:
+    python scripts/reclassify_wallpapers.py [--dry-run] [--tags] [--chunk-size=1000]
+    --dry-run       只统计变化，不写入数据库
+    --tags          同时把标签更新为命中的关键词（默认不改动标签）
+    --chunk-size=N  每块读取的行数
+"""
+
+import os
+import sys
+import time
+
+# 引入仓库根目录下的公共数据库模块和分类器
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import wallpaper_classifier
+import wallpaper_db
+import wallpaper_scanner
+
+DEFAULT_CHUNK_SIZE = 1000
+
+def fetch_chunk(conn, after_id, chunk_size):
+    """按主键区间读取 id > after_id 的下一块记录"""
+    _, rows = wallpaper_db.fetch_all(
+        "SELECT id, title, file_path, category, tags FROM wallpapers WHERE id > %s ORDER BY id LIMIT %s",
+        (after_id, chunk_size),
+        conn
+    )
+    return rows
+
+def script_filename(title, file_path):
+    """
+    update_list.py 入库且标题未被修改过的记录返回文件名，否则返回None
+
+    入库脚本的 file_path 为 static/wallpapers/期数/文件名、标题为文件名去扩展名；
+    upload_wallpaper.php 上传的文件直接位于 static/wallpapers/ 下，标题由用户填写
+    """
+    parts = (file_path or '').replace('\\', '/').lstrip('/').split('/')
+    if len(parts) != 4 or parts[:2] != ['static', 'wallpapers'] or not wallpaper_scanner.is_period_name(parts[2]):
+        return None
+    filename = parts[3]
+    return filename if title == os.path.splitext(filename)[0] else None
+
+def diff_chunk(classifier, rows, with_tags):
+    """
+    对一块记录重新分类，返回需要更新的分组（只处理 script_filename 能确定文件名的记录）
+
+    Returns:
+        (changes, skipped): {(category, tags或None): [id, ...]}，tags 为 None 表示不更新标签；跳过的记录数
+    """
+    changes = {}
+    skipped = 0
+    for wallpaper_id, title, file_path, category, tags in rows:
+        filename = script_filename(title, file_path)
+        if filename is None:
+            skipped += 1
+            continue
+        result = classifier.classify(filename)
+        new_tags = ','.join(result.tags) if with_tags else None
+        if result.category == category and (new_tags is None or new_tags == (tags or '')):
+            continue
+        changes.setdefault((result.category, new_tags), []).append(wallpaper_id)
+    return changes, skipped
+
+def apply_changes(cursor, changes):
+    """每组新值执行一条 UPDATE ... WHERE id IN (...)，返回影响的行数"""
+    affected = 0
+    for (category, tags), ids in changes.items():
+        placeholders = ', '.join(['%s'] * len(ids))
+        if tags is None:
+            cursor.execute(
+                f"UPDATE wallpapers SET category = %s, updated_at = NOW() WHERE id IN ({placeholders})",
+                [category] + ids
+            )
+        else:
+            cursor.execute(
+                f"UPDATE wallpapers SET category = %s, tags = %s, updated_at = NOW() WHERE id IN ({placeholders})",
+                [category, tags] + ids
+            )
+        affected += cursor.rowcount
+    return affected
+
+def reclassify(chunk_size=DEFAULT_CHUNK_SIZE, with_tags=False, dry_run=False):
+    """
+    全库重新分类
+
+    Returns:
+        (scanned, changed, skipped): 扫描的记录数、需要更新（或已更新）的记录数和非脚本入库而跳过的记录数
+    """
+    classifier = wallpaper_classifier.get_classifier()
+    scanned = 0
+    changed = 0
+    skipped = 0
+    category_moves = {}
+    last_id = 0
+
+    with wallpaper_db.connection() as conn:
+        while True:
+            rows = fetch_chunk(conn, last_id, chunk_size)
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            changes, chunk_skipped = diff_chunk(classifier, rows, with_tags)
+            skipped += chunk_skipped
+            if not changes:
+                continue
+            for (category, _), ids in changes.items():
+                category_moves[category] = category_moves.get(category, 0) + len(ids)
+                changed += len(ids)
+            if not dry_run:
+                with wallpaper_db.transaction(conn) as cursor:
+                    apply_changes(cursor, changes)
+
+    for category, count in sorted(category_moves.items()):
+        print(f"  -> {category}: {count} 条")
+    return scanned, changed, skipped
+
+def main():
+    chunk_size = DEFAULT_CHUNK_SIZE
+    with_tags = False
+    dry_run = False
+    for arg in sys.argv[1:]:
+        if arg == '--dry-run':
+            dry_run = True
+        elif arg == '--tags':
+            with_tags = True
+        elif arg.startswith('--chunk-size='):
+            chunk_size = int(arg.split('=')[1])
+        elif arg in ('--help', '-h'):
+            print(__doc__)
+            return
+        else:
+            print(f"未知参数: {arg}")
+            print(__doc__)
+            sys.exit(1)
+
+    print("开始重新分类壁纸..." + ("（仅统计，不写入）" if dry_run else ""))
+    start_time = time.time()
+    try:
+        scanned, changed, skipped = reclassify(chunk_size, with_tags, dry_run)
+    except Exception as e:
+        print(f"重新分类失败: {e}")
+        sys.exit(1)
+    action = "需要更新" if dry_run else "已更新"
+    print(f"\n共扫描 {scanned} 条记录，{action} {changed} 条，耗时 {time.time() - start_time:.2f}秒")
+    if skipped:
+        print(f"跳过 {skipped} 条网页上传或标题已修改的记录（分类由人工选择）")
+
+if __name__ == '__main__':
+    main()
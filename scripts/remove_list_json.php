@@ -4,18 +4,26 @@
  * 由于数据已迁移到数据库，不再需要list.json文件
  */
 
+require_once __DIR__ . '/../api/catalog_store.php';
+
 // 定义list.json文件路径
 $listJsonPath = __DIR__ . '/../static/data/list.json';
 $backupPath = __DIR__ . '/../static/data/list.json.backup.' . date('YmdHis');
 
 // 检查文件是否存在
 if (file_exists($listJsonPath)) {
-    // 创建备份
+    // 创建备份（合并 list.json.patches 中尚未压缩的补丁）
     echo "创建备份: {$backupPath}\n";
-    if (copy($listJsonPath, $backupPath)) {
+    $items = loadCatalogJson($listJsonPath);
+    if ($items !== null && file_put_contents($backupPath, json_encode($items, JSON_UNESCAPED_UNICODE | JSON_PRETTY_PRINT)) !== false) {
         echo "✅ 备份创建成功\n";
         
-        // 删除原文件
+        // 删除原文件及补丁日志
+        foreach ([$listJsonPath . '.patches', $listJsonPath . '.patches.compacting'] as $patchPath) {
+            if (file_exists($patchPath)) {
+                unlink($patchPath);
+            }
+        }
         if (unlink($listJsonPath)) {
             echo "✅ list.json 文件已成功删除\n";
             echo "数据已完全迁移到数据库，不再需要list.json文件\n";
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+壁纸浏览日志汇总脚本
+文件: rollup_views.py
+功能: 从检查点开始按主键顺序分块读取 wallpaper_views_log，在内存中按壁纸汇总每日/每小时浏览量，
+      批量写入汇总表，并刷新 admin_statistics_cache 中的每日全站统计；管理后台查询汇总表即可，不再扫描原始日志。
+      每块的汇总写入和检查点更新在同一事务中，中断后重新运行不会重复计数。
+
+汇总表:
+    wallpaper_view_daily      (wallpaper_id, view_date) -> views, unique_ips
+    wallpaper_view_hourly     (wallpaper_id, view_date, view_hour) -> views（只统计带 view_time 的记录）
+    wallpaper_view_daily_ips  每日独立IP去重集合（IP只保存64位哈希），用于跨块累计 unique_ips
+    rollup_checkpoints        各汇总任务已处理到的日志ID
+admin_statistics_cache:
+    wallpaper_views / wallpaper_unique_views  每日全站浏览量 / 各壁纸独立IP数之和
+
+用法:
+    python scripts/rollup_views.py [--chunk-size=5000] [--prune-days=N]
+    --prune-days=N  汇总完成后删除N天之前且已汇总的原始日志（N至少为1，
+                    api/record_view.php 依赖当天的原始日志判断重复浏览）
+"""
+
+import os
+import sys
+import time
+import hashlib
+from datetime import date, timedelta
+
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import wallpaper_db
+
+JOB_NAME = 'wallpaper_views'
+DEFAULT_CHUNK_SIZE = 5000
+
+# 重新计算独立IP数时每条语句包含的(壁纸, 日期)组数
+RECOUNT_BATCH_SIZE = 500
+
+# 删除原始日志时每条语句的行数，避免长时间锁表
+PRUNE_BATCH_SIZE = 5000
+
+CREATE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS wallpaper_view_daily (
+        wallpaper_id BIGINT NOT NULL,
+        view_date DATE NOT NULL,
+        views INT UNSIGNED NOT NULL DEFAULT 0,
+        unique_ips INT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (wallpaper_id, view_date),
+        INDEX idx_view_date (view_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS wallpaper_view_hourly (
+        wallpaper_id BIGINT NOT NULL,
+        view_date DATE NOT NULL,
+        view_hour TINYINT UNSIGNED NOT NULL,
+        views INT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (wallpaper_id, view_date, view_hour),
+        INDEX idx_view_date (view_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS wallpaper_view_daily_ips (
+        wallpaper_id BIGINT NOT NULL,
+        view_date DATE NOT NULL,
+        ip_hash BIGINT UNSIGNED NOT NULL,
+        PRIMARY KEY (wallpaper_id, view_date, ip_hash)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    # 与 scripts/db_temp/create_admin_tables.php 中的定义一致
+    """CREATE TABLE IF NOT EXISTS admin_statistics_cache (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        stat_key VARCHAR(100) NOT NULL,
+        stat_value BIGINT NOT NULL,
+        stat_date DATE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY unique_stat (stat_key, stat_date),
+        INDEX idx_stat_date (stat_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci""",
+    """CREATE TABLE IF NOT EXISTS rollup_checkpoints (
+        job_name VARCHAR(64) NOT NULL PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+]
+
+def ip_hash(ip_address):
+    """IP地址的64位哈希"""
+    return int.from_bytes(hashlib.blake2b((ip_address or '').encode('utf-8'), digest_size=8).digest(), 'big')
+
+def load_checkpoint(cursor):
+    """读取已处理到的日志ID"""
+    cursor.execute("SELECT last_id FROM rollup_checkpoints WHERE job_name = %s", (JOB_NAME,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def fetch_chunk(conn, after_id, chunk_size):
+    """按主键读取 id > after_id 的下一块日志"""
+    _, rows = wallpaper_db.fetch_all(
+        """SELECT id, wallpaper_id, ip_address, COALESCE(view_date, DATE(view_time)), HOUR(view_time)
+           FROM wallpaper_views_log WHERE id > %s ORDER BY id LIMIT %s""",
+        (after_id, chunk_size),
+        conn
+    )
+    return rows
+
+def aggregate(rows):
+    """
+    在内存中汇总一块日志
+
+    Returns:
+        (daily, hourly, ips): {(壁纸, 日期): 浏览量}、{(壁纸, 日期, 小时): 浏览量}、{(壁纸, 日期, IP哈希)}
+    """
+    daily = {}
+    hourly = {}
+    ips = set()
+    for _, wallpaper_id, ip_address, view_date, view_hour in rows:
+        if view_date is None:
+            continue
+        key = (wallpaper_id, view_date)
+        daily[key] = daily.get(key, 0) + 1
+        if view_hour is not None:
+            hour_key = (wallpaper_id, view_date, view_hour)
+            hourly[hour_key] = hourly.get(hour_key, 0) + 1
+        ips.add((wallpaper_id, view_date, ip_hash(ip_address)))
+    return daily, hourly, ips
+
+def write_chunk(cursor, daily, hourly, ips, last_id):
+    """把一块汇总结果写入汇总表并推进检查点（调用方负责事务）"""
+    wallpaper_db.executemany(
+        cursor,
+        """INSERT INTO wallpaper_view_daily (wallpaper_id, view_date, views) VALUES (%s, %s, %s)
+           ON DUPLICATE KEY UPDATE views = views + VALUES(views)""",
+        [(wallpaper_id, view_date, views) for (wallpaper_id, view_date), views in daily.items()]
+    )
+    wallpaper_db.executemany(
+        cursor,
+        """INSERT INTO wallpaper_view_hourly (wallpaper_id, view_date, view_hour, views) VALUES (%s, %s, %s, %s)
+           ON DUPLICATE KEY UPDATE views = views + VALUES(views)""",
+        [key + (views,) for key, views in hourly.items()]
+    )
+    wallpaper_db.executemany(
+        cursor,
+        "INSERT IGNORE INTO wallpaper_view_daily_ips (wallpaper_id, view_date, ip_hash) VALUES (%s, %s, %s)",
+        list(ips)
+    )
+
+    # 独立IP数不能跨块相加，按去重集合重新计算本块涉及的(壁纸, 日期)
+    groups = list(daily)
+    for start in range(0, len(groups), RECOUNT_BATCH_SIZE):
+        batch = groups[start:start + RECOUNT_BATCH_SIZE]
+        cursor.execute(
+            f"""UPDATE wallpaper_view_daily d
+                JOIN (SELECT wallpaper_id, view_date, COUNT(*) AS unique_ips
+                      FROM wallpaper_view_daily_ips
+                      WHERE (wallpaper_id, view_date) IN ({', '.join(['(%s, %s)'] * len(batch))})
+                      GROUP BY wallpaper_id, view_date) u
+                  ON d.wallpaper_id = u.wallpaper_id AND d.view_date = u.view_date
+                SET d.unique_ips = u.unique_ips""",
+            [value for key in batch for value in key]
+        )
+
+    # 刷新涉及日期的全站统计
+    days = sorted({view_date for _, view_date in daily})
+    if days:
+        placeholders = ', '.join(['%s'] * len(days))
+        for stat_key, expression in (('wallpaper_views', 'SUM(views)'), ('wallpaper_unique_views', 'SUM(unique_ips)')):
+            cursor.execute(
+                f"""INSERT INTO admin_statistics_cache (stat_key, stat_value, stat_date)
+                    SELECT %s, {expression}, view_date FROM wallpaper_view_daily
+                    WHERE view_date IN ({placeholders}) GROUP BY view_date
+                    ON DUPLICATE KEY UPDATE stat_value = VALUES(stat_value)""",
+                [stat_key] + days
+            )
+
+    cursor.execute(
+        """INSERT INTO rollup_checkpoints (job_name, last_id) VALUES (%s, %s)
+           ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)""",
+        (JOB_NAME, last_id)
+    )
+
+def prune(conn, last_id, keep_days):
+    """
+    分批删除已汇总且早于 keep_days 天的原始日志及去重集合
+
+    Returns:
+        int: 删除的原始日志行数
+    """
+    cutoff = date.today() - timedelta(days=keep_days)
+    deleted = 0
+    while True:
+        with wallpaper_db.transaction(conn) as cursor:
+            cursor.execute(
+                """DELETE FROM wallpaper_views_log
+                   WHERE id <= %s AND COALESCE(view_date, DATE(view_time)) < %s LIMIT %s""",
+                (last_id, cutoff, PRUNE_BATCH_SIZE)
+            )
+            count = cursor.rowcount
+        deleted += count
+        if count < PRUNE_BATCH_SIZE:
+            break
+    # 早于保留期的日期不会再有新日志，去重集合可以一并删除
+    with wallpaper_db.transaction(conn) as cursor:
+        cursor.execute("DELETE FROM wallpaper_view_daily_ips WHERE view_date < %s", (cutoff,))
+    return deleted
+
+def rollup(chunk_size=DEFAULT_CHUNK_SIZE, prune_days=None):
+    """
+    从检查点开始汇总全部新日志
+
+    Returns:
+        (processed, last_id): 本次处理的日志行数和最终检查点
+    """
+    processed = 0
+    with wallpaper_db.connection() as conn:
+        with wallpaper_db.transaction(conn) as cursor:
+            for sql in CREATE_TABLES:
+                cursor.execute(sql)
+            last_id = load_checkpoint(cursor)
+        print(f"从日志ID {last_id} 之后开始汇总")
+
+        while True:
+            rows = fetch_chunk(conn, last_id, chunk_size)
+            if not rows:
+                break
+            daily, hourly, ips = aggregate(rows)
+            with wallpaper_db.transaction(conn) as cursor:
+                write_chunk(cursor, daily, hourly, ips, rows[-1][0])
+            last_id = rows[-1][0]
+            processed += len(rows)
+            print(f"  已汇总 {processed} 条（检查点 {last_id}）")
+
+        if prune_days is not None:
+            print(f"已删除 {prune(conn, last_id, prune_days)} 条 {prune_days} 天前的原始日志")
+    return processed, last_id
+
+def main():
+    chunk_size = DEFAULT_CHUNK_SIZE
+    prune_days = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--chunk-size='):
+            chunk_size = max(1, int(arg.split('=')[1]))
+        elif arg.startswith('--prune-days='):
+            prune_days = max(1, int(arg.split('=')[1]))
+        elif arg in ('--help', '-h'):
+            print(__doc__)
+            return
+        else:
+            print(f"未知参数: {arg}")
+            print(__doc__)
+            sys.exit(1)
+
+    print("开始汇总壁纸浏览日志...")
+    start_time = time.time()
+    try:
+        processed, last_id = rollup(chunk_size, prune_days)
+    except Exception as e:
+        print(f"汇总失败: {e}")
+        sys.exit(1)
+    print(f"\n汇总完成，共处理 {processed} 条日志，检查点 {last_id}，耗时 {time.time() - start_time:.2f}秒")
+
+if __name__ == '__main__':
+    main()
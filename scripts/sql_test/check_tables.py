@@ -6,22 +6,19 @@
 功能: 查看数据库中的所有表
 """
 
-import mysql.connector
+import pymysql
+import os
 import sys
 
+# 引入仓库根目录下的公共数据库模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import wallpaper_db
+
 def get_db_connection():
     """获取数据库连接"""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='wallpaper_db',
-            user='root',
-            password='',
-            charset='utf8mb4',
-            collation='utf8mb4_unicode_ci'
-        )
-        return connection
-    except mysql.connector.Error as e:
+        return wallpaper_db.connect()
+    except pymysql.Error as e:
         print(f"数据库连接失败: {e}")
         return None
 
@@ -51,10 +48,10 @@ def show_all_tables():
         else:
             print("\n❌ categories表不存在")
             
-    except mysql.connector.Error as e:
+    except pymysql.Error as e:
         print(f"查询失败: {e}")
     finally:
-        if conn.is_connected():
+        if conn.open:
             cursor.close()
             conn.close()
 
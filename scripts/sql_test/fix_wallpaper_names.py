@@ -6,34 +6,27 @@
 """
 
 import re
-import json
-import mysql.connector
+import sys
+import codecs
 from datetime import datetime
 import os
 
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'wallpaper_db',
-    'charset': 'utf8mb4'
-}
+# 引入仓库根目录下的公共模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import wallpaper_catalog
+import wallpaper_classifier
+import wallpaper_db
 
-# 分类和标签映射
-CATEGORY_TAGS = {
-    '风景': ['自然', '山水', '海洋', '森林', '天空', '日落', '日出', '雪景', '春天', '夏天', '秋天', '冬天'],
-    '人物': ['美女', '帅哥', '明星', '模特', '艺术人像', '街拍', '写真'],
-    '动物': ['猫', '狗', '鸟', '野生动物', '宠物', '海洋生物'],
-    '建筑': ['城市', '建筑', '桥梁', '古建筑', '现代建筑', '夜景'],
-    '艺术': ['绘画', '插画', '抽象', '艺术', '创意', '设计'],
-    '科技': ['科幻', '未来', '机器人', '太空', '数码'],
-    '游戏': ['游戏', '动漫', '二次元', '角色'],
-    '汽车': ['跑车', '摩托车', '汽车', '交通工具'],
-    '美食': ['食物', '美食', '甜品', '饮品'],
-    '运动': ['体育', '运动', '健身', '球类'],
-    '其他': ['纹理', '通用', '简约', '抽象']
-}
+DEBUG_LOG_FILE = 'f:\\XAMPP\\htdocs\\logs\\wallpaper_debug_log.txt'
+
+# 依次尝试的日志编码
+LOG_ENCODINGS = ['utf-8', 'gbk', 'gb2312']
+
+# 判断编码时读取的样本大小
+LOG_SAMPLE_SIZE = 64 * 1024
+
+# 原始名称须出现在ID行之后的行数
+LOG_PAIR_WINDOW = 9
 
 def extract_id_from_log_line(line):
     """从日志行中提取壁纸ID"""
@@ -46,187 +39,201 @@ def extract_original_name_from_log_line(line):
     return match.group(1).strip() if match else None
 
 def analyze_filename(filename):
-    """分析文件名，确定分类和标签"""
-    if not filename:
-        return '其他', ['其他']
-    
-    filename_lower = filename.lower()
-    
-    # 检查每个分类的关键词
-    for category, keywords in CATEGORY_TAGS.items():
-        for keyword in keywords:
-            if keyword in filename or keyword.lower() in filename_lower:
-                # 找到匹配的分类，返回该分类和相关标签
-                matched_tags = [keyword]
-                # 添加其他可能匹配的标签
-                for tag in keywords:
-                    if tag != keyword and (tag in filename or tag.lower() in filename_lower):
-                        matched_tags.append(tag)
-                return category, matched_tags
-    
-    # 特殊关键词检查
-    special_keywords = {
-        '雨': ('风景', ['雨天', '自然']),
-        '夜': ('风景', ['夜景', '夜晚']),
-        '撑伞': ('人物', ['雨天', '人物']),
-        '美女': ('人物', ['美女', '人物']),
-        '冷色': ('艺术', ['冷色调', '艺术']),
-        '废土': ('科技', ['科幻', '废土']),
-        '地震': ('风景', ['灾难', '自然']),
-        '巨物': ('科技', ['科幻', '巨物']),
-        '东京': ('建筑', ['城市', '日本']),
-        '魔物': ('游戏', ['魔物', '奇幻']),
-        '国王': ('人物', ['人物', '皇室'])
-    }
+    """分析文件名，确定分类和标签（关键词表见 wallpaper_classifier.py，与 update_list.py 一致）"""
+    category, tags = wallpaper_classifier.classify(filename)
+    return category, tags or ['其他']
+
+def detect_encoding(log_file, sample_size=LOG_SAMPLE_SIZE):
+    """读取文件开头的样本判断编码，依次尝试 LOG_ENCODINGS，latin-1 兜底"""
+    with open(log_file, 'rb') as f:
+        sample = f.read(sample_size)
+    for encoding in LOG_ENCODINGS:
+        try:
+            # 样本末尾可能截断多字节字符，使用增量解码器且不结束
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+def iter_log_lines(log_file, encoding, start_offset=0):
+    """
+    从字节偏移处逐行读取日志，内存占用与文件大小无关
+    按字节切分行（UTF-8/GBK的多字节字符都不包含换行字节），每行单独解码
     
-    for keyword, (category, tags) in special_keywords.items():
-        if keyword in filename:
-            return category, tags
+    Yields:
+        (line, end_offset): 解码后的行和该行结束处的字节偏移
+    """
+    with open(log_file, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for raw_line in f:
+            offset += len(raw_line)
+            yield raw_line.decode(encoding, errors='replace'), offset
+
+def iter_log_records(lines):
+    """
+    用状态机从日志行中配对 "- ID:" 和 "- 原始名称:"
+    原始名称须在ID行之后 LOG_PAIR_WINDOW 行内；同时按"ID之后第一个原始名称"宽松配对，
+    严格配对没有任何结果时使用宽松结果（与原先整文件正则匹配的行为一致）
     
-    return '其他', ['其他']
+    Yields:
+        (strict, wallpaper_id, original_name, resume_offset): resume_offset 之前的记录已全部处理完
+    """
+    strict_id = None  # 严格配对中等待原始名称的ID
+    lines_left = 0
+    loose_id = None  # 宽松配对中等待原始名称的ID（保留第一个）
+    for line, end_offset in lines:
+        if '- ID:' in line:
+            wallpaper_id = extract_id_from_log_line(line)
+            strict_id, lines_left = wallpaper_id, LOG_PAIR_WINDOW
+            if loose_id is None:
+                loose_id = wallpaper_id
+        elif '- 原始名称:' in line:
+            original_name = extract_original_name_from_log_line(line)
+            if original_name:
+                if strict_id and lines_left > 0:
+                    yield True, strict_id, original_name, end_offset
+                if loose_id:
+                    yield False, loose_id, original_name, end_offset
+            strict_id = loose_id = None
+            continue
+        else:
+            lines_left -= 1
+            if lines_left <= 0:
+                strict_id = None
 
-def parse_debug_log():
-    """解析调试日志，提取ID和原始文件名的映射"""
-    log_file = 'f:\\XAMPP\\htdocs\\logs\\wallpaper_debug_log.txt'
+def parse_debug_log(log_file=DEBUG_LOG_FILE, start_offset=0):
+    """
+    解析调试日志，提取ID和原始文件名的映射（单次流式扫描）
+    
+    Returns:
+        (id_name_mapping, resume_offset): 下次可从 resume_offset 继续解析新增的日志
+    """
     id_name_mapping = {}
+    loose_mapping = {}
+    resume_offset = start_offset
     
     try:
-        # 尝试不同的编码格式
-        encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
-        content = None
+        encoding = detect_encoding(log_file)
+        print(f"使用 {encoding} 编码读取日志文件（起始偏移 {start_offset}）")
         
-        for encoding in encodings:
-            try:
-                with open(log_file, 'r', encoding=encoding) as f:
-                    content = f.read()
-                print(f"成功使用 {encoding} 编码读取日志文件")
-                break
-            except UnicodeDecodeError:
-                continue
+        for strict, wallpaper_id, original_name, resume_offset in iter_log_records(
+                iter_log_lines(log_file, encoding, start_offset)):
+            if strict:
+                id_name_mapping[wallpaper_id] = original_name
+                print(f"找到映射: {wallpaper_id} -> {original_name}")
+            else:
+                loose_mapping[wallpaper_id] = original_name
         
-        if content is None:
-            print("无法读取日志文件，尝试所有编码都失败")
-            return id_name_mapping
-            
-        # 直接按行解析，寻找ID和原始名称的配对
-        lines = content.split('\n')
-        
-        current_id = None
-        
-        for i, line in enumerate(lines):
-            # 查找ID行
-            if '- ID:' in line:
-                current_id = extract_id_from_log_line(line)
-                
-                # 在接下来的几行中查找原始名称
-                for j in range(i+1, min(i+10, len(lines))):
-                    if '- 原始名称:' in lines[j]:
-                        current_name = extract_original_name_from_log_line(lines[j])
-                        if current_id and current_name:
-                            id_name_mapping[current_id] = current_name
-                            print(f"找到映射: {current_id} -> {current_name}")
-                        break
-        
-        # 如果还是没找到，尝试更简单的正则匹配
+        # 如果严格配对没有结果，使用宽松配对的结果
         if not id_name_mapping:
-            print("尝试使用正则表达式直接匹配...")
-            # 匹配包含ID和原始名称的模式
-            pattern = r'- ID: (\d+).*?- 原始名称: ([^\n]+)'
-            matches = re.findall(pattern, content, re.DOTALL)
-            
-            for match in matches:
-                wallpaper_id, original_name = match
-                id_name_mapping[wallpaper_id] = original_name.strip()
-                print(f"正则匹配: {wallpaper_id} -> {original_name.strip()}")
+            for wallpaper_id, original_name in loose_mapping.items():
+                id_name_mapping[wallpaper_id] = original_name
+                print(f"宽松匹配: {wallpaper_id} -> {original_name}")
                     
     except Exception as e:
         print(f"解析日志文件时出错: {e}")
         
-    return id_name_mapping
+    return id_name_mapping, resume_offset
+
+def load_resume_offset(log_file=DEBUG_LOG_FILE):
+    """读取上次解析结束的偏移，日志被截断或轮转后从头开始"""
+    try:
+        with open(log_file + '.offset', 'r', encoding='utf-8') as f:
+            offset = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+    try:
+        return offset if offset <= os.path.getsize(log_file) else 0
+    except OSError:
+        return 0
+
+def save_resume_offset(offset, log_file=DEBUG_LOG_FILE):
+    """保存解析结束的偏移"""
+    with open(log_file + '.offset', 'w', encoding='utf-8') as f:
+        f.write(str(offset))
 
 def update_database(id_name_mapping):
-    """更新数据库中的标题和分类信息"""
+    """更新数据库中的标题和分类信息，返回是否成功"""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        updated_count = 0
-        
-        for wallpaper_id, original_name in id_name_mapping.items():
-            # 分析文件名获取分类和标签
-            category, tags = analyze_filename(original_name)
-            tags_str = ','.join(tags)
-            
-            # 去掉文件扩展名作为标题
-            title = os.path.splitext(original_name)[0]
-            
-            # 更新数据库
-            update_sql = """
-                UPDATE wallpapers 
-                SET title = %s, category = %s, tags = %s, updated_at = %s 
-                WHERE id = %s
-            """
-            
-            cursor.execute(update_sql, (title, category, tags_str, datetime.now(), wallpaper_id))
+        with wallpaper_db.transaction() as cursor:
+            updated_count = 0
             
-            if cursor.rowcount > 0:
-                updated_count += 1
-                print(f"更新 ID {wallpaper_id}: {title} -> {category}")
+            for wallpaper_id, original_name in id_name_mapping.items():
+                # 分析文件名获取分类和标签
+                category, tags = analyze_filename(original_name)
+                tags_str = ','.join(tags)
+                
+                # 去掉文件扩展名作为标题
+                title = os.path.splitext(original_name)[0]
+                
+                # 更新数据库（标题、分类、标签都未变化时不写入，也不改动updated_at）
+                update_sql = """
+                    UPDATE wallpapers 
+                    SET title = %s, category = %s, tags = %s, updated_at = %s 
+                    WHERE id = %s AND NOT (title <=> %s AND category <=> %s AND tags <=> %s)
+                """
+                
+                cursor.execute(update_sql, (title, category, tags_str, datetime.now(), wallpaper_id,
+                                            title, category, tags_str))
+                
+                if cursor.rowcount > 0:
+                    updated_count += 1
+                    print(f"更新 ID {wallpaper_id}: {title} -> {category}")
         
-        conn.commit()
         print(f"\n数据库更新完成，共更新 {updated_count} 条记录")
+        return True
         
     except Exception as e:
         print(f"更新数据库时出错: {e}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        return False
 
 def update_list_json(id_name_mapping):
-    """更新list.json文件"""
+    """更新list.json文件（以补丁追加到 list.json.patches），返回是否成功
+
+    读取方（api/catalog_store.php 的 loadCatalogJson）会合并补丁日志，
+    日志超过 list.json 大小的一定比例时 CatalogStore 才自动压缩合并，不必每次重写整个文件。
+    """
     list_file = 'f:\\XAMPP\\htdocs\\static\\data\\list.json'
     
     try:
-        # 读取现有的list.json
-        with open(list_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        updated_count = 0
-        
-        for item in data:
-            item_id = str(item.get('id', ''))
-            if item_id in id_name_mapping:
-                original_name = id_name_mapping[item_id]
-                category, tags = analyze_filename(original_name)
-                
-                # 更新名称和分类
-                item['name'] = os.path.splitext(original_name)[0]
-                item['category'] = category
-                item['tags'] = tags
-                
-                updated_count += 1
-                print(f"更新 JSON ID {item_id}: {item['name']} -> {category}")
+        patches = []
+        for item_id, original_name in id_name_mapping.items():
+            category, tags = analyze_filename(original_name)
+            
+            # 更新名称和分类（list.json中不存在的ID会被忽略）
+            name = os.path.splitext(original_name)[0]
+            patches.append({'id': int(item_id), 'set': {'name': name, 'category': category, 'tags': tags}})
+            print(f"更新 JSON ID {item_id}: {name} -> {category}")
         
-        # 写回文件
-        with open(list_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        store = wallpaper_catalog.CatalogStore(list_file)
+        updated_count = store.append(patches)
         
-        print(f"\nlist.json更新完成，共更新 {updated_count} 条记录")
+        print(f"\nlist.json更新完成，共写入 {updated_count} 条补丁")
+        return True
         
     except Exception as e:
         print(f"更新list.json时出错: {e}")
+        return False
 
 def main():
     """主函数"""
     print("开始修复壁纸名称和分类...")
     
+    # --resume: 只解析上次运行之后新增的日志
+    resume = '--resume' in sys.argv[1:]
+    start_offset = load_resume_offset() if resume else 0
+    
     # 1. 解析调试日志
     print("\n1. 解析调试日志...")
-    id_name_mapping = parse_debug_log()
+    id_name_mapping, resume_offset = parse_debug_log(DEBUG_LOG_FILE, start_offset)
     print(f"找到 {len(id_name_mapping)} 个ID和原始文件名的映射")
     
     if not id_name_mapping:
         print("未找到任何映射关系，退出")
+        if resume:
+            save_resume_offset(resume_offset)
         return
     
     # 显示前几个映射示例
@@ -236,11 +243,18 @@ def main():
     
     # 2. 更新数据库
     print("\n2. 更新数据库...")
-    update_database(id_name_mapping)
+    database_ok = update_database(id_name_mapping)
     
     # 3. 更新list.json
     print("\n3. 更新list.json...")
-    update_list_json(id_name_mapping)
+    list_ok = update_list_json(id_name_mapping)
+    
+    # 任一步失败时不推进偏移，下次 --resume 重新处理这些日志记录
+    if resume:
+        if database_ok and list_ok:
+            save_resume_offset(resume_offset)
+        else:
+            print("更新未全部成功，保留上次的解析偏移")
     
     print("\n修复完成！")
     print("\n分类统计:")
@@ -1,18 +1,19 @@
 import os
 import json
-import time
+import bisect
+import hashlib
+import tempfile
+from array import array
+from collections import namedtuple
 from datetime import datetime
-from PIL import Image
-import pymysql
 import json.decoder # 2024-07-15 新增：导入JSON解码器，用于捕获特定错误
-
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'wallpaper_db'
-}
+import image_tokens
+import wallpaper_classifier
+import wallpaper_db
+import wallpaper_dedup
+import wallpaper_ids
+import wallpaper_scanner
+from wallpaper_db import DB_CONFIG
 
 # 预定义的分类和标签映射
 CATEGORY_TAGS = {
@@ -28,57 +29,84 @@ CATEGORY_TAGS = {
     '其他': ['抽象', '简约', '纹理', '通用']
 }
 
+# 增量检测索引文件名（保存在每个期数目录中），记录 文件名 -> [大小, 修改时间ns, 壁纸ID]
+INGEST_INDEX_FILENAME = '.ingest_index.json'
+
+# 批量上传时每批的行数
+DEFAULT_BATCH_SIZE = 1000
+
 # 支持的图片格式
 SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
 
-def get_image_dimensions(image_path):
-    """获取图片尺寸"""
-    try:
-        with Image.open(image_path) as img:
-            return img.size  # 返回 (width, height)
-    except Exception as e:
-        print(f"Warning: Cannot get dimensions for {image_path}: {e}")
-        return (0, 0)
+# wallpapers表的插入列，与 build_wallpaper_row 返回的元组一一对应
+WALLPAPER_COLUMNS = ('id', 'user_id', 'title', 'description', 'file_path', 'file_size', 'width', 'height',
+                     'category', 'tags', 'format', 'views', 'likes', 'created_at', 'updated_at')
+
+# 单个壁纸文件的元数据（只读记录，SQL文件生成和数据库上传共用）
+WallpaperMeta = namedtuple('WallpaperMeta', [
+    'filename', 'title', 'file_path', 'size_bytes', 'size_str',
+    'width', 'height', 'format', 'category', 'tags'
+])
+
+def format_file_size(size_bytes):
+    """将字节数格式化为 KB/MB 字符串"""
+    if size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / (1024 * 1024):.2f} MB"
+
+def extract_wallpaper_meta(info):
+    """
+    由扫描结果生成壁纸的全部元数据
+    @param {wallpaper_scanner.ImageFileInfo} info - 已读取文件头的扫描结果
+    @returns {WallpaperMeta}
+    """
+    analyzed_info = analyze_filename(info.name)
+    return WallpaperMeta(
+        filename=info.name,
+        title=os.path.splitext(info.name)[0],
+        file_path=f'static/wallpapers/{info.period}/{info.name}',
+        size_bytes=info.size,
+        size_str=format_file_size(info.size),
+        width=info.width,
+        height=info.height,
+        format=info.format,
+        category=analyzed_info['category'],
+        tags=','.join(analyzed_info['tags'])
+    )
+
+def build_wallpaper_row(wallpaper_id, meta, timestamp):
+    """
+    根据元数据生成wallpapers表的一行，列顺序见 WALLPAPER_COLUMNS
+    @param {int} wallpaper_id - 壁纸ID
+    @param {WallpaperMeta} meta - 壁纸元数据
+    @param {str} timestamp - created_at/updated_at时间
+    @returns {tuple}
+    """
+    # 2024-07-15 用户要求标签为空，tags列写入空字符串
+    return (
+        wallpaper_id, 1, meta.title, '', meta.file_path, meta.size_str,
+        meta.width, meta.height, meta.category, '', meta.format,
+        0, 0, timestamp, timestamp
+    )
+
+def format_sql_row(row):
+    """将 build_wallpaper_row 生成的行格式化为SQL VALUES片段"""
+    values = []
+    for value in row:
+        if isinstance(value, int):
+            values.append(str(value))
+        else:
+            values.append(f"'{escape_sql_string(value)}'")
+    return f"  ({', '.join(values)})"
 
 def analyze_filename(filename):
     """
     根据文件名智能判断分类，但标签始终为空
+    分类关键词及优先级见 wallpaper_classifier.CATEGORY_KEYWORDS
     @param {str} filename - 图片文件名
     @returns {Object} - 包含分类和空标签的字典
     """
-    filename_lower = filename.lower()
-    category = '其他'
-    
-    # 2024-07-15 用户要求标签为空，因此注释掉所有标签生成逻辑
-    # tags = set() # 使用set避免重复
-
-    # 分类关键词映射 - 按优先级排序，优化分类判断逻辑
-    category_keywords = {
-        '幻想': ['fantasy', 'mythical', 'monster', 'demon', 'angel', 'dragon', '幻想', '神话', 
-                '魔幻', '怪兽', '恶魔', '天使', '龙', '巨兽', '巨眼', '废土', '鲛人', '魔物', '折翼天使',
-                '末日', '异世界', '魔法', '神秘', '超现实'],
-        '人物': ['portrait', 'people', 'person', '人物', '美女', '少年', '公主', '御姐', 
-                '克杰逊', '杰克逊', '神秘人', '赛博人机女', '雨夜撑伞女', '少女', '女孩', '男性',
-                '女性', '肖像', '人像', 'cos', 'cosplay', '明星', '合影'],
-        '动物': ['animal', 'pet', 'bird', 'wildlife', '动物', '犬', '猪', '鹿', '狐狸', '猫', '狼人',
-                '小猫', '小鹿', '八戒', '竹编', '萌兽', '丘比特'],
-        '科技': ['tech', 'future', 'sci-fi', '科技', '太空航行', '赛博', 'cyber', '机械', '数字人',
-                '全息', '投影', '电子', '集市'],
-        '风景': ['landscape', 'nature', 'mountain', 'sea', 'sky', '风景', '自然', '山水', '破晓',
-                '星芒', '祥云', '青月'],
-        '建筑': ['building', 'city', 'architecture', 'street', '建筑', '城市', '工厂'],
-        '艺术': ['art', 'abstract', 'design', '艺术', '时光之翼', '星芒破晓', '炭笔', 
-                '血色残阳', '详云字体', '睡梦公式', '光绘', '故障', '克莱因蓝', '4k标志',
-                '手机壳', '花环', '曼陀沙华'],
-        '美食': ['food', 'drink', 'dessert', '美食'],
-        '运动': ['sport', 'fitness', 'exercise', '运动']
-    }
-
-    # 判断分类
-    for cat, keywords in category_keywords.items():
-        if any(keyword in filename_lower for keyword in keywords):
-            category = cat
-            break
+    category = wallpaper_classifier.classify(filename).category
 
     # 2024-07-15 用户要求标签为空，因此不生成任何标签
     final_tags = []
@@ -102,45 +130,161 @@ def generate_unique_id(base_time, index, used_ids):
     used_ids.add(unique_id)
     return unique_id
 
-def get_existing_wallpapers_from_db():
+class PathIndex:
+    """
+    文件路径 -> 壁纸ID 的紧凑只读查找表
+    路径以64位哈希保存在排序数组中，ID保存在平行数组中，
+    每条记录固定16字节，不保留路径字符串；按二分查找，
+    10万条记录时哈希冲突概率约为 1e-9
+    """
+
+    def __init__(self, hashes, ids):
+        self._hashes = hashes
+        self._ids = ids
+
+    @staticmethod
+    def hash_key(key):
+        """计算路径的64位哈希"""
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+    @classmethod
+    def build(cls, pairs):
+        """
+        由 (path, id) 序列构建索引
+        @param {iterable} pairs - (path, id) 序列
+        @returns {PathIndex}
+        """
+        hashes = array('Q')
+        ids = array('q')
+        for key, wallpaper_id in pairs:
+            hashes.append(cls.hash_key(key))
+            ids.append(wallpaper_id)
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        return cls(array('Q', (hashes[i] for i in order)), array('q', (ids[i] for i in order)))
+
+    def get(self, key, default=None):
+        """查找路径对应的壁纸ID"""
+        key_hash = self.hash_key(key)
+        pos = bisect.bisect_left(self._hashes, key_hash)
+        if pos < len(self._hashes) and self._hashes[pos] == key_hash:
+            return self._ids[pos]
+        return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._hashes)
+
+def normalize_wallpaper_path(file_path):
+    """
+    统一数据库中file_path的写法，作为跨期数去重的键
+    迁移前的 static/wallpapers/xxx.jpg 视为 static/wallpapers/001/xxx.jpg（见 scripts/sql_test/update_wallpaper_paths.php）
+    @param {str} file_path - 数据库中的路径
+    @returns {str} - 形如 static/wallpapers/NNN/xxx.jpg
+    """
+    path = file_path.replace('\\', '/').lstrip('/')
+    parts = path.split('/')
+    if len(parts) == 3 and parts[0] == 'static' and parts[1] == 'wallpapers':
+        path = f'static/wallpapers/001/{parts[2]}'
+    return path
+
+def get_existing_wallpapers_from_db(conn=None):
     """
-    查询数据库，获取所有已存在的壁纸文件名和ID
-    @returns {dict} - {filename: id}
+    流式查询数据库，获取所有已存在的壁纸路径和ID
+    使用服务端游标分批读取，不在内存中保留完整结果集
+    @param {pymysql.Connection} conn - 可选，复用已有连接
+    @returns {PathIndex} - 路径（含期数目录）-> ID 查找表
     """
-    conn = None
-    result = {}
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            charset='utf8mb4'
-        )
-        cursor = conn.cursor()
-        cursor.execute("SELECT file_path, id FROM wallpapers")
-        for row in cursor.fetchall():
-            file_path = row[0]
-            filename = os.path.basename(file_path)
-            result[filename] = row[1]
+        rows = wallpaper_db.stream("SELECT file_path, id FROM wallpapers", conn=conn)
+        return PathIndex.build((normalize_wallpaper_path(file_path), wallpaper_id) for file_path, wallpaper_id in rows)
     except Exception as e:
         print(f"❌ 数据库查询失败: {e}")
         return None
+
+def load_ingest_index(wallpapers_dir):
+    """
+    读取期数目录的增量检测索引
+    @param {str} wallpapers_dir - 期数目录
+    @returns {dict} - {filename: [size, mtime_ns, id]}（疑似重复而未入库的文件id为None），不存在或损坏时返回空字典
+    """
+    index_path = os.path.join(wallpapers_dir, INGEST_INDEX_FILENAME)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('files', {}) if data.get('version') == 1 else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: 增量检测索引读取失败，将全量比对: {e}")
+        return {}
+
+def save_ingest_index(wallpapers_dir, files):
+    """
+    原子写入期数目录的增量检测索引
+    @param {str} wallpapers_dir - 期数目录
+    @param {dict} files - {filename: [size, mtime_ns, id]}
+    """
+    index_path = os.path.join(wallpapers_dir, INGEST_INDEX_FILENAME)
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'files': files}, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, index_path)
+
+def escape_tsv_value(value):
+    """按 LOAD DATA 默认规则（ESCAPED BY '\\'）转义TSV字段"""
+    text = str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def insert_rows_executemany(cursor, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    使用 executemany 分批插入，pymysql会把每批改写为一条多行VALUES语句
+    @param {pymysql.cursors.Cursor} cursor - 数据库游标
+    @param {list} rows - build_wallpaper_row 生成的行
+    @param {int} batch_size - 每批行数
+    """
+    column_list = ', '.join(f'`{column}`' for column in WALLPAPER_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(WALLPAPER_COLUMNS))
+    insert_sql = f"INSERT INTO `wallpapers` ({column_list}) VALUES ({placeholders})"
+    wallpaper_db.executemany(cursor, insert_sql, rows, batch_size)
+    print(f"📤 已分批写入 {len(rows)} 条（每批 {batch_size} 条）")
+
+def insert_rows_load_data(cursor, rows):
+    """
+    生成临时TSV文件并使用 LOAD DATA LOCAL INFILE 一次性导入
+    （需要MySQL服务端开启 local_infile）
+    @param {pymysql.cursors.Cursor} cursor - 数据库游标（连接需以 local_infile=True 创建）
+    @param {list} rows - build_wallpaper_row 生成的行
+    """
+    column_list = ', '.join(f'`{column}`' for column in WALLPAPER_COLUMNS)
+    fd, tsv_path = tempfile.mkstemp(prefix='wallpapers_import_', suffix='.tsv')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+            for row in rows:
+                f.write('\t'.join(escape_tsv_value(value) for value in row) + '\n')
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE %s INTO TABLE `wallpapers` CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+            f"({column_list})",
+            (tsv_path.replace('\\', '/'),)
+        )
+        print(f"📤 LOAD DATA 导入 {cursor.rowcount} 条")
     finally:
-        if conn:
-            conn.close()
-    return result
+        os.remove(tsv_path)
 
 # 已移除get_all_wallpapers_from_db函数，因为不再需要生成list.json
 
 def generate_short_id(date_str, seq):
     """
     生成短ID，格式为YYYYMMDD+递增号（如202507151、20250715100），递增号不做位数限制
+    新ID应通过 wallpaper_ids.reserve_ids 预留，避免并发入库时重复
     @param {str} date_str - 日期字符串YYYYMMDD
     @param {int} seq - 当天递增序号
     @returns {int}
     """
-    return int(f"{date_str}{seq}")
+    return wallpaper_ids.make_id(date_str, seq)
 
 
 
@@ -156,40 +300,28 @@ def find_latest_period():
         print(f"❌ 壁纸基础目录不存在: {wallpapers_base}")
         return '001'
     
-    # 扫描所有期数目录
-    period_dirs = []
-    for item in os.listdir(wallpapers_base):
-        item_path = os.path.join(wallpapers_base, item)
-        if os.path.isdir(item_path) and item.isdigit() and len(item) == 3:
-            period_dirs.append(item)
-    
-    if not period_dirs:
+    if not wallpaper_scanner.list_period_dirs(wallpapers_base):
         print("📁 未找到期数目录，使用默认期数001")
         return '001'
     
-    # 倒序排列期数
-    period_dirs.sort(reverse=True)
-    
     # 从最新期数开始检查，找到第一个非空目录
-    for period in period_dirs:
-        period_path = os.path.join(wallpapers_base, period)
-        image_files = [
-            f for f in os.listdir(period_path)
-            if os.path.isfile(os.path.join(period_path, f))
-            and f.lower().endswith(SUPPORTED_FORMATS)
-        ]
-        if image_files:
-            print(f"🎯 找到最新期数: {period} (包含 {len(image_files)} 个图片文件)")
-            return period
+    period, count = wallpaper_scanner.find_latest_period(wallpapers_base, SUPPORTED_FORMATS)
+    if period:
+        print(f"🎯 找到最新期数: {period} (包含 {count} 个图片文件)")
+        return period
     
     print("📁 所有期数目录都为空，使用默认期数001")
     return '001'
 
-def update_wallpaper_list(period=None, auto_upload=False):
+def update_wallpaper_list(period=None, auto_upload=False, batch_size=DEFAULT_BATCH_SIZE, use_load_data=False,
+                          check_duplicates=True):
     """
     增量更新壁纸列表，只为新图片分配新ID并导入，老图片ID不变
     @param {str} period - 指定期数，如'002'，如果为None则自动检测最新期数
     @param {bool} auto_upload - 是否自动上传到数据库
+    @param {int} batch_size - 批量上传时每批的行数
+    @param {bool} use_load_data - 是否使用 LOAD DATA LOCAL INFILE 导入
+    @param {bool} check_duplicates - 是否跳过与已有壁纸感知哈希相近的新图片
     """
     # 自动检测最新期数
     if period is None:
@@ -207,8 +339,54 @@ def update_wallpaper_list(period=None, auto_upload=False):
     print(f"📂 处理期数: {period}")
     print(f"📂 壁纸目录: {wallpapers_dir}")
 
+    # 获取所有图片文件（只列目录，不读取文件头）
+    image_files = wallpaper_scanner.scan_period_files(wallpapers_dir, period, SUPPORTED_FORMATS)
+    print(f"🖼️ 当前壁纸目录图片: {len(image_files)} 个")
+
+    # 增量检测：按 (期数, 文件名, 大小, 修改时间) 与上次运行结果比对
+    ingest_index = load_ingest_index(wallpapers_dir)
+    current_names = {info.name for info in image_files}
+    # 不做重复检测时，之前判定为疑似重复（id为None）的文件同样需要入库
+    changed_files = [
+        info for info in image_files
+        if ingest_index.get(info.name, [None, None])[:2] != [info.size, info.mtime_ns]
+        or (not check_duplicates and ingest_index[info.name][2] is None)
+    ]
+    removed_names = [name for name in ingest_index if name not in current_names]
+    if not changed_files:
+        if removed_names:
+            for name in removed_names:
+                del ingest_index[name]
+            save_ingest_index(wallpapers_dir, ingest_index)
+        print("ℹ️ 期数目录无变化，跳过数据库比对。")
+        return True
+    print(f"🔍 新增或变化的文件: {len(changed_files)} 个")
+
+    # 整个流程共用一个数据库连接（LOAD DATA 需要单独开启 local_infile 的连接）
+    try:
+        with wallpaper_db.connection(**({'local_infile': True} if use_load_data else {})) as conn:
+            dedup_base_dir = os.path.dirname(wallpapers_dir) if check_duplicates else None
+            success = _update_wallpaper_list(conn, period, sql_path, auto_upload, batch_size, use_load_data,
+                                             changed_files, ingest_index, dedup_base_dir)
+    except Exception as e:
+        print(f"❌ 数据库操作失败: {e}")
+        return False
+
+    if success:
+        for name in removed_names:
+            ingest_index.pop(name, None)
+        save_ingest_index(wallpapers_dir, ingest_index)
+    return success
+
+def _update_wallpaper_list(conn, period, sql_path, auto_upload, batch_size, use_load_data, changed_files, ingest_index,
+                           dedup_base_dir=None):
+    """
+    update_wallpaper_list 的主体，在同一个连接上完成查询、上传和统计
+    已确认入库和疑似重复的文件会写入 ingest_index（由调用方保存）；
+    dedup_base_dir 不为None时先对新图片做感知哈希重复检测，疑似重复的不入库
+    """
     # 读取数据库已存在壁纸
-    db_wallpapers = get_existing_wallpapers_from_db()  # {filename: id}
+    db_wallpapers = get_existing_wallpapers_from_db(conn)  # static/wallpapers/NNN/filename -> id
     if db_wallpapers is None:
         print("🔴 数据库查询失败，终止数据生成任务。")
         return False
@@ -216,160 +394,101 @@ def update_wallpaper_list(period=None, auto_upload=False):
 
     # 数据已迁移到数据库，不再需要处理list.json
 
-    # 获取所有图片文件
-    image_files = [
-        f for f in os.listdir(wallpapers_dir)
-        if os.path.isfile(os.path.join(wallpapers_dir, f))
-        and f.lower().endswith(SUPPORTED_FORMATS)
-    ]
-    print(f"🖼️ 当前壁纸目录图片: {len(image_files)} 个")
+    # 按含期数的路径去重，不同期数中的同名文件互不影响
+    new_files = []
+    for info in changed_files:
+        existing_id = db_wallpapers.get(f'static/wallpapers/{period}/{info.name}')
+        if existing_id is None:
+            new_files.append(info)
+        else:
+            ingest_index[info.name] = [info.size, info.mtime_ns, existing_id]
+
+    # 重复检测：跳过与已有壁纸（或本批中靠前的图片）感知哈希相近的新图片；
+    # 疑似重复的文件以ID为None记入 ingest_index，文件未变化时不再触发比对（修改或替换后重新检测）
+    if dedup_base_dir and new_files:
+        duplicates = wallpaper_dedup.flag_duplicates(dedup_base_dir, new_files)
+        unique_files = []
+        for info in new_files:
+            match = duplicates.get(wallpaper_dedup.PerceptualIndex.key_for(info))
+            if match is None:
+                unique_files.append(info)
+                continue
+            source_key, distance = match
+            print(f"⚠️ 疑似重复，跳过: {info.name} 与 {source_key}（感知哈希距离 {distance}）")
+            ingest_index[info.name] = [info.size, info.mtime_ns, None]
+        new_files = unique_files
 
-    # 找出新图片
-    new_files = [f for f in image_files if f not in db_wallpapers]
+    # 并行读取新图片的文件头
+    new_files = wallpaper_scanner.read_headers(new_files)
     print(f"✨ 新增图片: {len(new_files)} 个")
 
-    sql_values = []
+    cursor = conn.cursor()
 
     if new_files:
         print("✅ 处理新增图片...")
 
-        # 获取今日已有ID的最大序号
-        today_str = datetime.now().strftime('%Y%m%d')
-        seq = 1
+        # 自动上传时一次性原子预留整批ID，与并发入库和网页上传互不冲突；
+        # 只生成SQL文件时不预留（这些记录可能不会导入），只查看接下来可用的ID，不消耗序号
         try:
-            conn = pymysql.connect(**DB_CONFIG)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM wallpapers WHERE id LIKE %s ORDER BY id DESC LIMIT 1", (f"{today_str}%",))
-            result = cursor.fetchone()
-            if result:
-                last_id = str(result[0])
-                if len(last_id) > 8:
-                    seq = int(last_id[8:]) + 1
-            conn.close()
-        except Exception as e:
-            print(f"Warning: 获取今日ID序号失败: {e}")
-
-        for filename in new_files:
-            file_path = os.path.join(wallpapers_dir, filename)
-            name_without_ext = os.path.splitext(filename)[0]
-            width, height = get_image_dimensions(file_path)
-            size_bytes = os.path.getsize(file_path)
-            if size_bytes < 1024 * 1024:
-                size_str = f"{size_bytes / 1024:.1f} KB"
+            if auto_upload:
+                new_ids = wallpaper_ids.reserve_ids(len(new_files), conn=conn)
             else:
-                size_str = f"{size_bytes / (1024 * 1024):.2f} MB"
-            try:
-                with Image.open(file_path) as img:
-                    img_format = img.format
-            except Exception as e:
-                img_format = ''
-            
-            analyzed_info = analyze_filename(filename)
-            category = analyzed_info['category']
-            tags_list = analyzed_info['tags']
-            
-            new_id = generate_short_id(today_str, seq)
-            seq += 1
-            # 不再生成file_info，直接处理SQL
-            tags_string = ','.join(tags_list)
-            sql_value = (
-                f"  ({new_id}, 1, '{escape_sql_string(name_without_ext)}', '', '{escape_sql_string(f'static/wallpapers/{period}/{filename}')}', '{escape_sql_string(size_str)}', "
-                f"{width}, {height}, '{escape_sql_string(category)}', '', '{escape_sql_string(img_format)}', "
-                f"0, 0, '{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}', '{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}')"
-            )
-            sql_values.append(sql_value)
-            print(f"✅ 新增: {filename} -> ID: {new_id}")
+                new_ids = wallpaper_ids.peek_ids(len(new_files), conn=conn)
+        except Exception as e:
+            print(f"❌ 获取壁纸ID失败: {e}")
+            return False
+
+        # 每个文件只提取一次元数据并分配一次ID，SQL文件和数据库上传使用同一批记录
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for info, new_id in zip(new_files, new_ids):
+            meta = extract_wallpaper_meta(info)
+            rows.append(build_wallpaper_row(new_id, meta, timestamp))
+            print(f"✅ 新增: {info.name} -> ID: {new_id}")
 
         # 不再生成list.json文件
 
-        if sql_values:
+        if rows:
             # 生成SQL文件
+            column_list = ', '.join(f'`{column}`' for column in WALLPAPER_COLUMNS)
             sql_content = [
                 f"-- 新增壁纸数据导入SQL文件 (期数: {period})\n",
                 f"-- 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
                 f"-- 数据库: {DB_CONFIG['database']}\n",
-                f"-- 新增 {len(sql_values)} 条记录\n\n",
+                f"-- 新增 {len(rows)} 条记录\n\n",
                 f"USE `{DB_CONFIG['database']}`;\n\n",
-                "INSERT INTO `wallpapers` (`id`, `user_id`, `title`, `description`, `file_path`, `file_size`, `width`, `height`, `category`, `tags`, `format`, `views`, `likes`, `created_at`, `updated_at`) VALUES\n"
+                f"INSERT INTO `wallpapers` ({column_list}) VALUES\n"
             ]
-            for i, sql_value in enumerate(sql_values):
-                sql_content.append(sql_value)
-                if i < len(sql_values) - 1:
-                    sql_content.append(",\n")
-                else:
-                    sql_content.append(";\n")
+            sql_content.append(",\n".join(format_sql_row(row) for row in rows))
+            sql_content.append(";\n")
             with open(sql_path, 'w', encoding='utf-8') as f:
                 f.writelines(sql_content)
             print(f"\n🎉 新增图片SQL已生成: {os.path.abspath(sql_path)}")
             
-            # 如果启用自动上传，直接插入数据库
+            # 如果启用自动上传，在一个事务中批量插入数据库
             if auto_upload:
                 try:
-                    conn = pymysql.connect(**DB_CONFIG)
-                    cursor = conn.cursor()
-                    
-                    insert_sql = "INSERT INTO `wallpapers` (`id`, `user_id`, `title`, `description`, `file_path`, `file_size`, `width`, `height`, `category`, `tags`, `format`, `views`, `likes`, `created_at`, `updated_at`) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
-                    
-                    # 2025-01-15 彻底修复ID冲突：重置seq到初始值，确保与SQL文件完全一致
-                    # 重新获取初始seq值，因为前面的循环已经修改了seq
-                    upload_seq = 1
-                    try:
-                        temp_conn = pymysql.connect(**DB_CONFIG)
-                        temp_cursor = temp_conn.cursor()
-                        temp_cursor.execute("SELECT id FROM wallpapers WHERE id LIKE %s ORDER BY id DESC LIMIT 1", (f"{today_str}%",))
-                        temp_result = temp_cursor.fetchone()
-                        if temp_result:
-                            temp_last_id = str(temp_result[0])
-                            if len(temp_last_id) > 8:
-                                upload_seq = int(temp_last_id[8:]) + 1
-                        temp_conn.close()
-                    except Exception as e:
-                        print(f"Warning: 重新获取ID序号失败: {e}")
-                    
-                    upload_count = 0
-                    for filename in new_files:
-                        file_path = os.path.join(wallpapers_dir, filename)
-                        name_without_ext = os.path.splitext(filename)[0]
-                        
-                        width, height = get_image_dimensions(file_path)
-                        size_bytes = os.path.getsize(file_path)
-                        if size_bytes < 1024 * 1024:
-                            size_str = f"{size_bytes / 1024:.1f} KB"
+                    with wallpaper_db.transaction(conn) as upload_cursor:
+                        # 直接使用生成SQL文件时的同一批记录，ID与SQL文件完全一致
+                        if use_load_data:
+                            insert_rows_load_data(upload_cursor, rows)
                         else:
-                            size_str = f"{size_bytes / (1024 * 1024):.2f} MB"
-                        
-                        try:
-                            with Image.open(file_path) as img:
-                                img_format = img.format
-                        except Exception as e:
-                            img_format = ''
-                        
-                        analyzed_info = analyze_filename(filename)
-                        category = analyzed_info['category']
-                        tags_list = analyzed_info['tags']
-                        
-                        # 使用与SQL生成时完全相同的ID计算方式
-                        new_id = generate_short_id(today_str, upload_seq + upload_count)
-                        tags_string = ','.join(tags_list)
-                        
-                        cursor.execute(insert_sql, (
-                            new_id, 1, name_without_ext, '', f'static/wallpapers/{period}/{filename}',
-                            size_str, width, height, category, '', img_format,
-                            0, 0, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        ))
-                        upload_count += 1
-                    
-                    conn.commit()
-                    conn.close()
-                    print(f"✅ 成功上传 {upload_count} 条记录到数据库")
-                    print(f"📋 使用的ID范围: {generate_short_id(today_str, upload_seq)} - {generate_short_id(today_str, upload_seq + upload_count - 1)}")
+                            insert_rows_executemany(upload_cursor, rows, batch_size)
+                    print(f"✅ 成功上传 {len(rows)} 条记录到数据库")
+                    print(f"📋 使用的ID范围: {rows[0][0]} - {rows[-1][0]}")
+                    for info, row in zip(new_files, rows):
+                        ingest_index[info.name] = [info.size, info.mtime_ns, row[0]]
                     
                 except Exception as e:
                     print(f"❌ 数据库上传失败: {e}")
-                    if 'conn' in locals():
-                        conn.rollback()
-                        conn.close()
                     return False
+
+                # 为新壁纸预生成访问Token，失败不影响入库（可单独运行 image_tokens.py 补齐）
+                try:
+                    created, _, missing = image_tokens.sync_tokens(conn, [row[0] for row in rows])
+                    print(f"🔑 预生成图片Token: {created} 个" + (f"（{missing} 个预览图尚未生成）" if missing else ""))
+                except Exception as e:
+                    print(f"Warning: 预生成图片Token失败: {e}")
         else:
             print("无新增图片，无需生成SQL文件")
     else:
@@ -377,11 +496,8 @@ def update_wallpaper_list(period=None, auto_upload=False):
 
     # 获取数据库中的总数
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM wallpapers")
         total_count = cursor.fetchone()[0]
-        conn.close()
         print(f"\n📊 数据库中壁纸总数: {total_count}")
     except Exception as e:
         print(f"Warning: 获取总数失败: {e}")
@@ -394,6 +510,9 @@ if __name__ == '__main__':
     # 解析命令行参数
     period = None
     auto_upload = False
+    batch_size = DEFAULT_BATCH_SIZE
+    use_load_data = False
+    check_duplicates = True
     
     if len(sys.argv) > 1:
         for arg in sys.argv[1:]:
@@ -401,12 +520,21 @@ if __name__ == '__main__':
                 period = arg.split('=')[1]
             elif arg == '--upload':
                 auto_upload = True
+            elif arg.startswith('--batch-size='):
+                batch_size = max(1, int(arg.split('=')[1]))
+            elif arg == '--load-data':
+                use_load_data = True
+            elif arg == '--allow-duplicates':
+                check_duplicates = False
             elif arg == '--help':
                 print("使用方法:")
                 print("  python update_list.py                    # 自动检测最新期数，仅生成SQL")
                 print("  python update_list.py --period=002       # 指定期数002")
                 print("  python update_list.py --upload           # 自动上传到数据库")
                 print("  python update_list.py --period=003 --upload  # 指定期数并上传")
+                print("  python update_list.py --upload --batch-size=2000  # 每批2000行批量上传")
+                print("  python update_list.py --upload --load-data        # 使用LOAD DATA LOCAL INFILE导入")
+                print("  python update_list.py --allow-duplicates  # 不做感知哈希重复检测")
                 sys.exit(0)
     
     print("🚀 开始更新壁纸列表...")
@@ -415,7 +543,9 @@ if __name__ == '__main__':
     if auto_upload:
         print("📤 启用自动上传到数据库")
     
-    success = update_wallpaper_list(period=period, auto_upload=auto_upload)
+    success = update_wallpaper_list(period=period, auto_upload=auto_upload,
+                                    batch_size=batch_size, use_load_data=use_load_data,
+                                    check_duplicates=check_duplicates)
     if success:
         print("\n✨ 所有操作完成！")
         if not auto_upload:
@@ -7,17 +7,9 @@
 维护: 修改用户ID更新逻辑请编辑此文件
 """
 
-import pymysql
 import sys
 from datetime import datetime
-
-# 数据库配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'database': 'wallpaper_db'
-}
+import wallpaper_db
 
 def test_database_connection():
     """
@@ -25,14 +17,7 @@ def test_database_connection():
     @returns {bool} - 连接是否成功
     """
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            charset='utf8mb4'
-        )
-        conn.close()
+        wallpaper_db.fetch_one("SELECT 1")
         print("✅ 数据库连接测试成功")
         return True
     except Exception as e:
@@ -41,39 +26,32 @@ def test_database_connection():
 
 def get_current_user_id_stats():
     """
-    获取当前数据库中user_id的统计信息
+    获取当前数据库中user_id的统计信息（各项统计复用同一个连接）
     @returns {dict} - 统计信息字典
     """
-    conn = None
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            charset='utf8mb4'
-        )
-        cursor = conn.cursor()
-        
-        # 统计总记录数
-        cursor.execute("SELECT COUNT(*) FROM wallpapers")
-        total_count = cursor.fetchone()[0]
-        
-        # 统计NULL的记录数
-        cursor.execute("SELECT COUNT(*) FROM wallpapers WHERE user_id IS NULL")
-        null_count = cursor.fetchone()[0]
-        
-        # 统计已经是'Jelisgo'的记录数
-        cursor.execute("SELECT COUNT(*) FROM wallpapers WHERE user_id = 'Jelisgo'")
-        jelisgo_count = cursor.fetchone()[0]
-        
-        # 统计其他user_id的记录数
-        cursor.execute("SELECT COUNT(*) FROM wallpapers WHERE user_id IS NOT NULL AND user_id != 'Jelisgo'")
-        other_count = cursor.fetchone()[0]
-        
-        # 获取所有不同的user_id值
-        cursor.execute("SELECT DISTINCT user_id FROM wallpapers WHERE user_id IS NOT NULL")
-        distinct_user_ids = [row[0] for row in cursor.fetchall()]
+        with wallpaper_db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # 统计总记录数
+            cursor.execute("SELECT COUNT(*) FROM wallpapers")
+            total_count = cursor.fetchone()[0]
+            
+            # 统计NULL的记录数
+            cursor.execute("SELECT COUNT(*) FROM wallpapers WHERE user_id IS NULL")
+            null_count = cursor.fetchone()[0]
+            
+            # 统计已经是'Jelisgo'的记录数
+            cursor.execute("SELECT COUNT(*) FROM wallpapers WHERE user_id = 'Jelisgo'")
+            jelisgo_count = cursor.fetchone()[0]
+            
+            # 统计其他user_id的记录数
+            cursor.execute("SELECT COUNT(*) FROM wallpapers WHERE user_id IS NOT NULL AND user_id != 'Jelisgo'")
+            other_count = cursor.fetchone()[0]
+            
+            # 获取所有不同的user_id值
+            cursor.execute("SELECT DISTINCT user_id FROM wallpapers WHERE user_id IS NOT NULL")
+            distinct_user_ids = [row[0] for row in cursor.fetchall()]
         
         return {
             'total': total_count,
@@ -85,99 +63,64 @@ def get_current_user_id_stats():
     except Exception as e:
         print(f"❌ 获取统计信息失败: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def ensure_jelisgo_user_exists():
     """
     确保'Jelisgo'用户在users表中存在，如果不存在则创建
     @returns {bool} - 操作是否成功
     """
-    conn = None
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            charset='utf8mb4'
-        )
-        cursor = conn.cursor()
-        
-        # 检查'Jelisgo'用户是否存在
-        cursor.execute("SELECT id FROM users WHERE username = 'Jelisgo'")
-        result = cursor.fetchone()
-        
-        if result:
-            print(f"✅ 用户'Jelisgo'已存在，ID: {result[0]}")
-            return True
-        else:
-            # 创建'Jelisgo'用户
+        with wallpaper_db.transaction() as cursor:
+            # 检查'Jelisgo'用户是否存在
+            cursor.execute("SELECT id FROM users WHERE username = 'Jelisgo'")
+            result = cursor.fetchone()
+            
+            if result:
+                print(f"✅ 用户'Jelisgo'已存在，ID: {result[0]}")
+                return True
+            
+            # 创建'Jelisgo'用户（退出事务上下文时提交）
             print("🔄 用户'Jelisgo'不存在，正在创建...")
             cursor.execute("""
                 INSERT INTO users (username, email, password, created_at) 
                 VALUES ('Jelisgo', 'jelisgo@example.com', 'placeholder_password', NOW())
             """)
-            conn.commit()
-            print("✅ 用户'Jelisgo'创建成功")
-            return True
+        print("✅ 用户'Jelisgo'创建成功")
+        return True
             
     except Exception as e:
         print(f"❌ 处理用户'Jelisgo'失败: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def update_user_ids_to_jelisgo():
     """
     更新数据库中所有壁纸记录的user_id为'Jelisgo'
     @returns {bool} - 更新是否成功
     """
-    conn = None
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            database=DB_CONFIG['database'],
-            charset='utf8mb4'
-        )
-        cursor = conn.cursor()
-        
-        # 获取'Jelisgo'用户的ID
-        cursor.execute("SELECT id FROM users WHERE username = 'Jelisgo'")
-        result = cursor.fetchone()
-        
-        if not result:
-            print("❌ 找不到用户'Jelisgo'")
-            return False
+        with wallpaper_db.transaction() as cursor:
+            # 获取'Jelisgo'用户的ID
+            cursor.execute("SELECT id FROM users WHERE username = 'Jelisgo'")
+            result = cursor.fetchone()
             
-        jelisgo_user_id = result[0]
-        print(f"📋 将使用用户ID: {jelisgo_user_id} (Jelisgo)")
-        
-        # 更新所有记录的user_id为Jelisgo的用户ID
-        cursor.execute("UPDATE wallpapers SET user_id = %s WHERE user_id IS NULL OR user_id != %s", 
-                      (jelisgo_user_id, jelisgo_user_id))
-        affected_rows = cursor.rowcount
-        
-        # 提交事务
-        conn.commit()
+            if not result:
+                print("❌ 找不到用户'Jelisgo'")
+                return False
+                
+            jelisgo_user_id = result[0]
+            print(f"📋 将使用用户ID: {jelisgo_user_id} (Jelisgo)")
+            
+            # 更新所有记录的user_id为Jelisgo的用户ID（退出事务上下文时提交）
+            cursor.execute("UPDATE wallpapers SET user_id = %s WHERE user_id IS NULL OR user_id != %s", 
+                          (jelisgo_user_id, jelisgo_user_id))
+            affected_rows = cursor.rowcount
         
         print(f"✅ 成功更新 {affected_rows} 条记录的user_id为{jelisgo_user_id} (Jelisgo)")
         return True
         
     except Exception as e:
         print(f"❌ 更新user_id失败: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def main():
     """
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: wallpaper_catalog.py
+描述: 壁纸目录快照导出工具，替代整体重写的 static/data/list.json
+依赖: PyMySQL (pip install pymysql)；可选 brotli (pip install brotli) 用于生成 .br 预压缩文件
+维护: 从 wallpapers 表按主键顺序导出到 static/data/catalog/：
+      catalog.json      全部壁纸（紧凑JSON数组，字段与list.json一致）
+      category/*.json   按分类分片
+      period/*.json     按期数分片
+      index.json        分片列表及 id -> 字节偏移索引，可用HTTP Range只读取单条记录
+      每个文件同时生成 .gz（及 .br）预压缩版本；所有文件先写临时文件再原子替换，index.json 最后写入
+      CatalogStore 为 list.json 这类整体JSON数组提供追加式补丁日志，小改动只追加日志，定期压缩合并
+'''
+
+import os
+import sys
+import gzip
+import json
+import time
+from datetime import datetime
+import wallpaper_db
+
+# 可选依赖：brotli不可用时只生成gzip版本
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'data', 'catalog')
+CATALOG_FILENAME = 'catalog.json'
+INDEX_FILENAME = 'index.json'
+INDEX_VERSION = 1
+
+# 分片类型 -> 子目录
+SHARD_TYPES = ('category', 'period')
+
+# 文件名中不允许出现的字符（分类名直接作为分片文件名）
+UNSAFE_FILENAME_CHARS = '/\\:*?"<>|'
+
+CATALOG_QUERY = """
+    SELECT w.id, w.title, w.file_path, w.category, w.tags, w.width, w.height,
+           w.file_size, w.format, w.description, w.created_at, COALESCE(wes.status, 0)
+    FROM wallpapers w
+    LEFT JOIN wallpaper_exile_status wes ON w.id = wes.wallpaper_id
+    ORDER BY w.id
+"""
+
+def period_of(file_path):
+    """从 static/wallpapers/NNN/xxx.jpg 中取出期数，迁移前的路径视为'001'"""
+    parts = (file_path or '').replace('\\', '/').lstrip('/').split('/')
+    if len(parts) == 4 and parts[0] == 'static' and parts[1] == 'wallpapers':
+        return parts[2]
+    return '001'
+
+def row_to_item(row):
+    """把 CATALOG_QUERY 的一行转换为与list.json相同结构的条目"""
+    (wallpaper_id, title, file_path, category, tags, width, height,
+     file_size, image_format, description, created_at, exile_status) = row
+    filename = os.path.basename(file_path or '')
+    return {
+        'id': int(wallpaper_id),
+        'filename': filename,
+        'path': file_path,
+        'name': title or os.path.splitext(filename)[0],
+        'category': category or '其他',
+        'tags': [tag for tag in (tags or '').split(',') if tag],
+        'width': int(width or 0),
+        'height': int(height or 0),
+        'size': file_size,
+        'format': image_format,
+        'description': description or '',
+        'created_at': created_at.strftime('%Y-%m-%d') if hasattr(created_at, 'strftime') else str(created_at or ''),
+        'exile_status': int(exile_status)
+    }
+
+def encode_item(item):
+    """紧凑编码单个条目"""
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def build_body(encoded_items):
+    """
+    拼接JSON数组并记录每个条目的起始偏移
+
+    Returns:
+        (body, offsets): offsets 比条目数多一项，第 i 个条目为 body[offsets[i]:offsets[i+1]-1]
+    """
+    parts = [b'[']
+    offsets = []
+    position = 1
+    for i, encoded in enumerate(encoded_items):
+        if i:
+            parts.append(b',')
+            position += 1
+        offsets.append(position)
+        parts.append(encoded)
+        position += len(encoded)
+    parts.append(b']')
+    offsets.append(position + 1)
+    return b''.join(parts), offsets
+
+def write_atomic(path, data):
+    """先写临时文件再原子替换，读取方不会看到写了一半的文件"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def write_with_variants(path, data):
+    """
+    写入文件及其预压缩版本
+
+    Returns:
+        dict: {'bytes', 'gzip', 'br'(可选)} 各版本的字节数
+    """
+    # mtime=0 使相同内容生成相同的gzip文件，便于缓存和比对
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    write_atomic(path, data)
+    write_atomic(path + '.gz', compressed)
+    sizes = {'bytes': len(data), 'gzip': len(compressed)}
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        write_atomic(path + '.br', compressed)
+        sizes['br'] = len(compressed)
+    return sizes
+
+def shard_filename(name):
+    """分片名转换为文件名"""
+    safe = ''.join('_' if char in UNSAFE_FILENAME_CHARS else char for char in name).strip() or '_'
+    return f'{safe}.json'
+
+def remove_stale_shards(output_dir, shard_type, keep):
+    """删除本次导出中已不存在的分片文件（含预压缩版本）"""
+    shard_dir = os.path.join(output_dir, shard_type)
+    try:
+        with os.scandir(shard_dir) as it:
+            names = [entry.name for entry in it if entry.is_file()]
+    except OSError:
+        return
+    for name in names:
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if base not in keep:
+            try:
+                os.remove(os.path.join(shard_dir, name))
+            except OSError:
+                pass
+
+def write_snapshot(items, output_dir=CATALOG_DIR):
+    """
+    把条目写成完整快照
+
+    Args:
+        items: 按id升序的条目列表（row_to_item 的结果）
+        output_dir: 输出目录
+
+    Returns:
+        dict: index.json 的内容
+    """
+    encoded = [encode_item(item) for item in items]
+    body, offsets = build_body(encoded)
+    catalog_sizes = write_with_variants(os.path.join(output_dir, CATALOG_FILENAME), body)
+
+    groups = {shard_type: {} for shard_type in SHARD_TYPES}
+    for i, item in enumerate(items):
+        groups['category'].setdefault(item['category'], []).append(i)
+        groups['period'].setdefault(period_of(item['path']), []).append(i)
+
+    shards = {}
+    for shard_type, members in groups.items():
+        shards[shard_type] = {}
+        for name, positions in sorted(members.items()):
+            filename = shard_filename(name)
+            shard_body, _ = build_body(encoded[i] for i in positions)
+            sizes = write_with_variants(os.path.join(output_dir, shard_type, filename), shard_body)
+            shards[shard_type][name] = dict(path=f'{shard_type}/{filename}', count=len(positions), **sizes)
+        remove_stale_shards(output_dir, shard_type, {info['path'].split('/', 1)[1] for info in shards[shard_type].values()})
+
+    index = {
+        'version': INDEX_VERSION,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'count': len(items),
+        'catalog': dict(path=CATALOG_FILENAME, **catalog_sizes),
+        'shards': shards,
+        'ids': [item['id'] for item in items],
+        'offsets': offsets
+    }
+    write_with_variants(os.path.join(output_dir, INDEX_FILENAME),
+                        json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return index
+
+class CatalogStore:
+    """基于补丁日志的JSON数组目录存储（如 static/data/list.json）
+
+    修改以JSON Lines追加到 <文件>.patches，开销与修改条数成正比，不重写整个文件；
+    日志超过基础文件大小的 compact_ratio 倍时自动压缩：先把日志改名为 <文件>.patches.compacting
+    （之后的修改写入新日志），合并后原子替换基础文件，再删除旧日志。
+    读取方通过 load()（PHP中为 api/catalog_store.php 的 loadCatalogJson）得到
+    基础文件 + 压缩中日志 + 当前日志 的合并结果；补丁都是幂等的，
+    压缩过程中任何时刻读取结果都一致，也不会读到写了一半的文件。
+
+    补丁格式（每行一个）:
+        {"id": 1, "set": {"name": "..."}}   更新已有条目的字段，条目不存在时忽略
+        {"id": 1, "insert": {...}}           新增或整体替换条目
+        {"id": 1, "delete": true}            删除条目
+    """
+
+    def __init__(self, path, compact_ratio=0.25, indent=2):
+        self.path = path
+        self.log_path = path + '.patches'
+        self.compacting_path = self.log_path + '.compacting'
+        self.compact_ratio = compact_ratio
+        self.indent = indent
+
+    @staticmethod
+    def _read_patches(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        patches = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                patches.append(json.loads(line))
+            except ValueError:
+                # 最后一行可能是中断时写了一半的补丁
+                print(f"[警告] 忽略无法解析的补丁: {line[:80]}")
+        return patches
+
+    @staticmethod
+    def _apply(items, patches):
+        """按顺序把补丁应用到条目列表（原地修改），返回结果列表"""
+        positions = {item.get('id'): i for i, item in enumerate(items)}
+        deleted = False
+        for patch in patches:
+            item_id = patch.get('id')
+            position = positions.get(item_id)
+            if 'insert' in patch:
+                if position is None:
+                    positions[item_id] = len(items)
+                    items.append(patch['insert'])
+                else:
+                    items[position] = patch['insert']
+            elif patch.get('delete'):
+                if position is not None:
+                    items[position] = None
+                    del positions[item_id]
+                    deleted = True
+            elif position is not None:
+                items[position].update(patch.get('set', {}))
+        return [item for item in items if item is not None] if deleted else items
+
+    def load(self):
+        """读取合并补丁后的全部条目"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            items = []
+        patches = self._read_patches(self.compacting_path) + self._read_patches(self.log_path)
+        return self._apply(items, patches)
+
+    def append(self, patches):
+        """
+        追加补丁，必要时自动压缩
+
+        Returns:
+            int: 追加的补丁数
+        """
+        patches = list(patches)
+        if not patches:
+            return 0
+        data = ''.join(json.dumps(patch, ensure_ascii=False, separators=(',', ':')) + '\n' for patch in patches)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if self.needs_compaction():
+            self.compact()
+        return len(patches)
+
+    def update(self, item_id, **fields):
+        """更新单个条目的字段"""
+        return self.append([{'id': item_id, 'set': fields}])
+
+    def needs_compaction(self):
+        """日志是否已超过基础文件大小的 compact_ratio 倍"""
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except OSError:
+            return False
+        try:
+            base_size = os.path.getsize(self.path)
+        except OSError:
+            base_size = 0
+        return log_size > base_size * self.compact_ratio
+
+    def compact(self):
+        """
+        把补丁合并进基础文件并原子替换
+
+        Returns:
+            int: 合并后的条目数
+        """
+        # 上次压缩中断时遗留的日志先合并，不能被新日志覆盖
+        if os.path.exists(self.log_path) and not os.path.exists(self.compacting_path):
+            os.replace(self.log_path, self.compacting_path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            items = []
+        items = self._apply(items, self._read_patches(self.compacting_path))
+        data = json.dumps(items, ensure_ascii=False, indent=self.indent).encode('utf-8')
+        write_atomic(self.path, data)
+        try:
+            os.remove(self.compacting_path)
+        except FileNotFoundError:
+            pass
+        return len(items)
+
+def export_catalog(output_dir=CATALOG_DIR, include_exiled=False, conn=None):
+    """
+    从数据库导出目录快照
+
+    Args:
+        output_dir: 输出目录
+        include_exiled: 是否包含已流放的壁纸
+        conn: 可选，使用已有连接
+
+    Returns:
+        dict: index.json 的内容
+    """
+    items = []
+    for row in wallpaper_db.stream(CATALOG_QUERY, conn=conn):
+        item = row_to_item(row)
+        if include_exiled or not item['exile_status']:
+            items.append(item)
+    return write_snapshot(items, output_dir)
+
+def format_sizes(info):
+    """格式化一个文件的各版本大小"""
+    text = f"{info['bytes'] / 1024:.1f}KB, gzip {info['gzip'] / 1024:.1f}KB"
+    if 'br' in info:
+        text += f", br {info['br'] / 1024:.1f}KB"
+    return text
+
+if __name__ == '__main__':
+    # 用法: python wallpaper_catalog.py [--include-exiled] [--output=目录]
+    #       python wallpaper_catalog.py --compact=static/data/list.json
+    output_dir = CATALOG_DIR
+    include_exiled = False
+    for arg in sys.argv[1:]:
+        if arg == '--include-exiled':
+            include_exiled = True
+        elif arg.startswith('--output='):
+            output_dir = arg.split('=', 1)[1]
+        elif arg.startswith('--compact='):
+            list_path = arg.split('=', 1)[1]
+            print(f"[成功] {list_path} 压缩完成，共 {CatalogStore(list_path).compact()} 条")
+            sys.exit(0)
+        else:
+            print("用法: python wallpaper_catalog.py [--include-exiled] [--output=目录] | --compact=文件")
+            sys.exit(0 if arg in ('--help', '-h') else 1)
+
+    start_time = time.time()
+    try:
+        index = export_catalog(output_dir, include_exiled)
+    except Exception as e:
+        print(f"[错误] 导出目录快照失败: {e}")
+        sys.exit(1)
+    print(f"[成功] 导出 {index['count']} 条壁纸到 {output_dir}")
+    print(f"  {CATALOG_FILENAME}: {format_sizes(index['catalog'])}")
+    for shard_type in SHARD_TYPES:
+        print(f"  {shard_type}: {len(index['shards'][shard_type])} 个分片")
+    if brotli is None:
+        print("  [提示] 未安装brotli，只生成了gzip版本")
+    print(f"耗时: {time.time() - start_time:.2f}秒")
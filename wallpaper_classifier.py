@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: wallpaper_classifier.py
+描述: 按文件名关键词判断壁纸分类（update_list.py 与 scripts/sql_test/fix_wallpaper_names.py 共用）
+依赖: 无
+维护: 分类关键词统一在 CATEGORY_KEYWORDS / SPECIAL_KEYWORDS 中修改。
+      所有关键词编译为一个 Aho–Corasick 自动机，每个文件名只做一次线性扫描；
+      分类优先级 = 表中顺序，靠前的分类优先，特殊关键词只在没有任何分类命中时生效
+'''
+
+import os
+import sys
+from collections import namedtuple, deque
+
+# 分类关键词 - 按优先级排序（不区分大小写）
+CATEGORY_KEYWORDS = {
+    '幻想': ['fantasy', 'mythical', 'monster', 'demon', 'angel', 'dragon', '幻想', '神话',
+            '魔幻', '怪兽', '恶魔', '天使', '龙', '巨兽', '巨眼', '废土', '鲛人', '魔物', '折翼天使',
+            '末日', '异世界', '魔法', '神秘', '超现实'],
+    '人物': ['portrait', 'people', 'person', '人物', '美女', '少年', '公主', '御姐',
+            '克杰逊', '杰克逊', '神秘人', '赛博人机女', '雨夜撑伞女', '少女', '女孩', '男性',
+            '女性', '肖像', '人像', 'cos', 'cosplay', '明星', '合影',
+            '帅哥', '模特', '艺术人像', '街拍', '写真'],
+    '动物': ['animal', 'pet', 'bird', 'wildlife', '动物', '犬', '猪', '鹿', '狐狸', '猫', '狼人',
+            '小猫', '小鹿', '八戒', '竹编', '萌兽', '丘比特',
+            '狗', '鸟', '野生动物', '宠物', '海洋生物'],
+    '科技': ['tech', 'future', 'sci-fi', '科技', '太空航行', '赛博', 'cyber', '机械', '数字人',
+            '全息', '投影', '电子', '集市',
+            '科幻', '未来', '机器人', '太空', '数码'],
+    '风景': ['landscape', 'nature', 'mountain', 'sea', 'sky', '风景', '自然', '山水', '破晓',
+            '星芒', '祥云', '青月',
+            '海洋', '森林', '天空', '日落', '日出', '雪景', '春天', '夏天', '秋天', '冬天'],
+    '建筑': ['building', 'city', 'architecture', 'street', '建筑', '城市', '工厂',
+            '桥梁', '古建筑', '现代建筑', '夜景'],
+    '艺术': ['art', 'abstract', 'design', '艺术', '时光之翼', '星芒破晓', '炭笔',
+            '血色残阳', '详云字体', '睡梦公式', '光绘', '故障', '克莱因蓝', '4k标志',
+            '手机壳', '花环', '曼陀沙华',
+            '绘画', '插画', '抽象', '创意', '设计'],
+    '美食': ['food', 'drink', 'dessert', '美食', '食物', '甜品', '饮品'],
+    '运动': ['sport', 'fitness', 'exercise', '运动', '体育', '健身', '球类'],
+    '游戏': ['游戏', '动漫', '二次元', '角色'],
+    '汽车': ['跑车', '摩托车', '汽车', '交通工具'],
+    '其他': ['纹理', '通用', '简约']
+}
+
+# 特殊关键词 -> (分类, 标签)，按顺序匹配，仅在 CATEGORY_KEYWORDS 全部未命中时使用
+SPECIAL_KEYWORDS = {
+    '雨': ('风景', ['雨天', '自然']),
+    '夜': ('风景', ['夜景', '夜晚']),
+    '撑伞': ('人物', ['雨天', '人物']),
+    '冷色': ('艺术', ['冷色调', '艺术']),
+    '地震': ('风景', ['灾难', '自然']),
+    '巨物': ('科技', ['科幻', '巨物']),
+    '东京': ('建筑', ['城市', '日本']),
+    '国王': ('人物', ['人物', '皇室'])
+}
+
+DEFAULT_CATEGORY = '其他'
+
+# 分类结果：tags 为命中分类中出现在文件名里的关键词（按表中顺序），或特殊关键词对应的标签
+Classification = namedtuple('Classification', ['category', 'tags'])
+
+class KeywordAutomaton:
+    """Aho–Corasick 多模式匹配自动机
+
+    每个关键词关联一个或多个 payload；scan 对文本做一次线性扫描，
+    返回所有命中关键词的 payload，与关键词数量无关。
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+    def add(self, keyword, payload):
+        """添加关键词，必须在 build 之前调用"""
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(payload)
+
+    def build(self):
+        """按广度优先计算失败指针，并把后缀关键词的输出合并到当前节点"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+        return self
+
+    def scan(self, text):
+        """扫描文本，依次产出命中关键词的 payload（同一关键词多次出现时重复产出）"""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                yield from output[node]
+
+class KeywordClassifier:
+    """基于关键词表的文件名分类器"""
+
+    def __init__(self, category_keywords=CATEGORY_KEYWORDS, special_keywords=SPECIAL_KEYWORDS,
+                 default_category=DEFAULT_CATEGORY):
+        """
+        Args:
+            category_keywords: {分类: [关键词]}，字典顺序即优先级
+            special_keywords: {关键词: (分类, 标签)}，优先级低于所有分类关键词
+            default_category: 都未命中时的分类
+        """
+        self.default_category = default_category
+        # 规则编号越小优先级越高；payload 为 (规则编号, 关键词在分类中的序号)
+        self._rules = []
+        self._keywords = []
+        self._automaton = KeywordAutomaton()
+        for category, keywords in category_keywords.items():
+            rule = len(self._rules)
+            self._rules.append((category, None))
+            self._keywords.append(keywords)
+            for position, keyword in enumerate(keywords):
+                self._automaton.add(keyword.lower(), (rule, position))
+        for keyword, (category, tags) in special_keywords.items():
+            rule = len(self._rules)
+            self._rules.append((category, list(tags)))
+            self._keywords.append([keyword])
+            self._automaton.add(keyword.lower(), (rule, 0))
+        self._automaton.build()
+
+    def classify(self, filename):
+        """
+        判断单个文件名的分类
+
+        Returns:
+            Classification: 未命中任何关键词时为 (default_category, [])
+        """
+        if not filename:
+            return Classification(self.default_category, [])
+
+        best_rule = None
+        positions = set()
+        for rule, position in self._automaton.scan(filename.lower()):
+            if best_rule is None or rule < best_rule:
+                best_rule = rule
+                positions = {position}
+            elif rule == best_rule:
+                positions.add(position)
+
+        if best_rule is None:
+            return Classification(self.default_category, [])
+        category, tags = self._rules[best_rule]
+        if tags is None:
+            keywords = self._keywords[best_rule]
+            tags = [keywords[position] for position in sorted(positions)]
+        return Classification(category, list(tags))
+
+    def classify_many(self, filenames):
+        """批量分类，返回与输入顺序一致的 Classification 列表"""
+        return [self.classify(filename) for filename in filenames]
+
+    def classify_directory(self, directory, extensions):
+        """
+        对目录中所有图片文件分类（不读取文件内容）
+
+        Args:
+            directory: 目录路径
+            extensions: 支持的扩展名元组（小写）
+
+        Returns:
+            dict: {文件名: Classification}
+        """
+        results = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.lower().endswith(extensions) and entry.is_file():
+                        results[entry.name] = self.classify(entry.name)
+        except OSError as e:
+            print(f"[警告] 无法扫描目录 {directory}: {e}")
+        return results
+
+_default_classifier = None
+
+def get_classifier():
+    """获取按默认关键词表编译的共享分类器（首次调用时编译）"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = KeywordClassifier()
+    return _default_classifier
+
+def classify(filename):
+    """使用默认关键词表判断文件名分类"""
+    return get_classifier().classify(filename)
+
+if __name__ == '__main__':
+    # 用法: python wallpaper_classifier.py <目录或文件名>...
+    extensions = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            summary = {}
+            for result in get_classifier().classify_directory(arg, extensions).values():
+                summary[result.category] = summary.get(result.category, 0) + 1
+            print(f"{arg}: " + ', '.join(f"{category} {count} 张" for category, count in sorted(summary.items())))
+        else:
+            result = classify(arg)
+            print(f"{arg} -> {result.category} {result.tags}")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: wallpaper_db.py
+描述: Python维护脚本共用的数据库访问层
+依赖: PyMySQL (pip install pymysql)
+维护: 数据库配置统一在此修改；提供小型连接池、事务上下文和服务端流式游标，
+      避免每个函数各自建立连接。scripts/ 下的脚本通过把仓库根目录加入sys.path引用本模块
+'''
+
+import queue
+import threading
+from contextlib import contextmanager
+import pymysql
+import pymysql.cursors
+
+# 数据库配置
+DB_CONFIG = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'root',
+    'password': '',
+    'database': 'wallpaper_db',
+    'charset': 'utf8mb4'
+}
+
+# 连接池最大连接数（维护脚本并发度低，少量连接即可）
+POOL_SIZE = 4
+
+# 流式查询每次从服务端读取的行数
+STREAM_BATCH_SIZE = 1000
+
+def connect(**overrides):
+    """创建一个不经过连接池的新连接
+
+    Args:
+        **overrides: 覆盖 DB_CONFIG 或传给 pymysql.connect 的参数，如 local_infile=True
+
+    Returns:
+        pymysql.Connection
+    """
+    params = dict(DB_CONFIG)
+    params.update(overrides)
+    return pymysql.connect(**params)
+
+class ConnectionPool:
+    """线程安全的小型连接池
+
+    连接按需创建，最多 max_size 个；归还时回滚未提交的操作，
+    取出时用 ping(reconnect=True) 处理服务端超时断开的连接。
+    """
+
+    def __init__(self, max_size=POOL_SIZE, **overrides):
+        self.max_size = max_size
+        self.overrides = overrides
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """取出一个连接，池满时最多等待 timeout 秒"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.max_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return connect(**self.overrides)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            conn = self._idle.get(timeout=timeout)
+
+        try:
+            conn.ping(reconnect=True)
+        except Exception:
+            self._discard(conn)
+            raise
+        return conn
+
+    def release(self, conn):
+        """归还连接"""
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """关闭池中所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """获取进程内共享的默认连接池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+@contextmanager
+def connection(**overrides):
+    """取得一个数据库连接，退出时归还连接池
+
+    传入 overrides（如 local_infile=True）时使用独立连接，退出时关闭。
+
+    用法:
+        with wallpaper_db.connection() as conn:
+            cursor = conn.cursor()
+    """
+    if overrides:
+        conn = connect(**overrides)
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+@contextmanager
+def transaction(conn=None):
+    """事务上下文：正常退出时提交，出现异常时回滚并继续抛出
+
+    Args:
+        conn: 可选，在已有连接上开启事务；不传则从连接池取出
+
+    用法:
+        with wallpaper_db.transaction() as cursor:
+            cursor.execute(...)
+    """
+    if conn is None:
+        with connection() as pooled_conn:
+            with transaction(pooled_conn) as cursor:
+                yield cursor
+        return
+
+    conn.begin()
+    cursor = conn.cursor()
+    try:
+        yield cursor
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def stream(sql, params=None, batch_size=STREAM_BATCH_SIZE, conn=None):
+    """使用服务端游标（SSCursor）流式读取查询结果，内存占用与结果集大小无关
+
+    迭代结束前该连接不能执行其他语句。
+
+    Args:
+        sql: 查询语句
+        params: 查询参数
+        batch_size: 每次从服务端读取的行数
+        conn: 可选，使用已有连接；不传则从连接池取出
+
+    Yields:
+        tuple: 每一行
+    """
+    if conn is None:
+        with connection() as pooled_conn:
+            yield from stream(sql, params, batch_size, pooled_conn)
+        return
+
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        # SSCursor关闭时会读完剩余结果，连接随后可继续使用
+        cursor.close()
+
+def fetch_all(sql, params=None, conn=None):
+    """执行查询并返回 (列名列表, 全部行)"""
+    if conn is None:
+        with connection() as pooled_conn:
+            return fetch_all(sql, params, pooled_conn)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        return columns, cursor.fetchall()
+    finally:
+        cursor.close()
+
+def fetch_one(sql, params=None, conn=None):
+    """执行查询并返回第一行，没有结果时返回None"""
+    if conn is None:
+        with connection() as pooled_conn:
+            return fetch_one(sql, params, pooled_conn)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+def executemany(cursor, sql, rows, batch_size=STREAM_BATCH_SIZE):
+    """按批执行同一条语句
+
+    PyMySQL不支持服务端预处理语句；INSERT ... VALUES 语句会被改写为多行VALUES，
+    同一模板在所有批次间复用，每批只有一次网络往返。
+
+    Returns:
+        int: 影响的总行数
+    """
+    affected = 0
+    for start in range(0, len(rows), batch_size):
+        affected += cursor.executemany(sql, rows[start:start + batch_size]) or 0
+    return affected
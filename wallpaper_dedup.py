@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: wallpaper_dedup.py
+描述: 基于感知哈希（dHash）的重复壁纸检测（update_list.py 与 compress_wallpapers.py 共用）
+依赖: Pillow库 (pip install Pillow)
+维护: 全库图片的哈希缓存在 static/wallpapers/.phash_index.json 中，只为新增或修改过的文件重新计算；
+      新图片在压缩和入库前通过BK树查询汉明距离不超过阈值的已有图片，
+      用于拦截以不同文件名重复上传的同一张图（如"xxx (1).jpeg"）
+'''
+
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import wallpaper_scanner
+
+# 哈希缓存文件名（保存在壁纸基础目录中）
+PHASH_INDEX_FILENAME = '.phash_index.json'
+PHASH_INDEX_VERSION = 1
+
+# dHash 边长，8 对应64位哈希
+HASH_SIZE = 8
+
+# 汉明距离不超过该值视为重复（64位中约10%的差异，可容忍重新压缩和缩放）
+DEFAULT_MAX_DISTANCE = 6
+
+# 置位数少于该值（或多于 64-该值）的哈希来自纯色、渐变等几乎没有细节的图片，
+# 彼此之间距离都很小，不参与重复判断，避免误判
+MIN_HASH_DETAIL = 8
+
+DEFAULT_WORKERS = 8
+
+SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+def dhash(path, hash_size=HASH_SIZE):
+    """计算图片的差值哈希（dHash）
+
+    缩小为 (hash_size+1) x hash_size 的灰度图后比较每行相邻像素，
+    JPEG 通过 draft 在解码阶段直接缩小，不解码完整像素。
+
+    Returns:
+        int: hash_size*hash_size 位的哈希值
+    """
+    with Image.open(path) as img:
+        img.draft('L', ((hash_size + 1) * 8, hash_size * 8))
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming(a, b):
+    """两个哈希的汉明距离"""
+    return bin(a ^ b).count('1')
+
+def has_detail(hash_value, hash_size=HASH_SIZE):
+    """哈希是否包含足够的细节用于重复判断"""
+    bits = bin(hash_value).count('1')
+    return MIN_HASH_DETAIL <= bits <= hash_size * hash_size - MIN_HASH_DETAIL
+
+class BKTree:
+    """按汉明距离组织的BK树，支持查询距离阈值内的全部哈希"""
+
+    def __init__(self):
+        self._root = None
+
+    def add(self, hash_value, item):
+        """插入哈希及其关联对象"""
+        node = [hash_value, item, {}]
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(hash_value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, hash_value, max_distance):
+        """
+        查询距离不超过 max_distance 的全部条目
+
+        Returns:
+            list: [(distance, item)]，按距离升序
+        """
+        if self._root is None:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            node_hash, item, children = stack.pop()
+            distance = hamming(hash_value, node_hash)
+            if distance <= max_distance:
+                results.append((distance, item))
+            # 三角不等式：只有与当前节点距离在 [d-max, d+max] 内的子树可能命中
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        results.sort(key=lambda result: result[0])
+        return results
+
+def hash_file(path):
+    """计算哈希，无法读取的图片返回None"""
+    try:
+        return dhash(path)
+    except Exception as e:
+        print(f"Warning: 无法计算感知哈希 {path}: {e}")
+        return None
+
+class PerceptualIndex:
+    """全库感知哈希缓存
+
+    条目键为 "期数/文件名"，值为 [大小, 修改时间ns, 哈希(16进制), 重复来源键或None]。
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, PHASH_INDEX_FILENAME)
+        self.entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == PHASH_INDEX_VERSION:
+                self.entries = data.get('files', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: 感知哈希缓存读取失败，将重新计算: {e}")
+
+    @staticmethod
+    def key_for(info):
+        """ImageFileInfo 对应的条目键"""
+        return f'{info.period}/{info.name}'
+
+    def refresh(self, workers=DEFAULT_WORKERS):
+        """扫描全库，为新增或修改过的文件计算哈希并移除已删除的文件
+
+        Returns:
+            int: 重新计算哈希的文件数
+        """
+        infos = wallpaper_scanner.scan_wallpapers(self.base_dir, SUPPORTED_FORMATS, with_headers=False)
+        seen = set()
+        stale = []
+        for info in infos:
+            key = self.key_for(info)
+            seen.add(key)
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != info.size or entry[1] != info.mtime_ns:
+                stale.append(info)
+
+        for key in list(self.entries):
+            if key not in seen:
+                del self.entries[key]
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(stale)))) as executor:
+                hashes = list(executor.map(hash_file, [info.path for info in stale]))
+            for info, hash_value in zip(stale, hashes):
+                key = self.key_for(info)
+                if hash_value is None:
+                    self.entries.pop(key, None)
+                    continue
+                self.entries[key] = [info.size, info.mtime_ns, f'{hash_value:016x}', None]
+        return len(stale)
+
+    def find_duplicates(self, candidate_keys, max_distance=DEFAULT_MAX_DISTANCE):
+        """检查候选文件是否与已有图片重复
+
+        已有图片 = 不在候选中且自身未被标记为重复的条目；候选按修改时间顺序依次检查，
+        未判定为重复的候选也加入比较集合，同一批内的重复同样能被发现。
+        缺少细节的哈希（见 has_detail）不参与比较。
+        结果写入条目的重复来源字段，调用方负责 save()。
+
+        Args:
+            candidate_keys: 候选条目键（须已通过 refresh 计算哈希）
+            max_distance: 汉明距离阈值
+
+        Returns:
+            dict: {候选键: (重复来源键, 距离)}
+        """
+        candidates = set(candidate_keys)
+        tree = BKTree()
+        for key, entry in self.entries.items():
+            hash_value = int(entry[2], 16)
+            if key not in candidates and entry[3] is None and has_detail(hash_value):
+                tree.add(hash_value, key)
+
+        duplicates = {}
+        # 先写入的文件视为原图：按修改时间、再按键名顺序检查
+        ordered = sorted((key for key in candidates if key in self.entries),
+                         key=lambda key: (self.entries[key][1], key))
+        for key in ordered:
+            entry = self.entries[key]
+            hash_value = int(entry[2], 16)
+            if not has_detail(hash_value):
+                entry[3] = None
+                continue
+            matches = tree.search(hash_value, max_distance)
+            if matches:
+                distance, source_key = matches[0]
+                entry[3] = source_key
+                duplicates[key] = (source_key, distance)
+            else:
+                entry[3] = None
+                tree.add(hash_value, key)
+        return duplicates
+
+    def save(self):
+        """原子写入缓存文件"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PHASH_INDEX_VERSION, 'files': self.entries}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+def flag_duplicates(base_dir, candidates, max_distance=DEFAULT_MAX_DISTANCE, workers=DEFAULT_WORKERS):
+    """刷新全库哈希缓存并检查一批新图片
+
+    Args:
+        base_dir: 壁纸基础目录（static/wallpapers）
+        candidates: 新图片的 ImageFileInfo 列表
+        max_distance: 汉明距离阈值
+        workers: 计算哈希的线程数
+
+    Returns:
+        dict: {候选键 "期数/文件名": (重复来源键 "期数/文件名", 距离)}，只包含被判定为重复的候选；
+        调用方用 PerceptualIndex.key_for(info) 查询，不同期数中的同名文件互不影响
+    """
+    if not candidates:
+        return {}
+    index = PerceptualIndex(base_dir)
+    index.refresh(workers)
+    duplicates = index.find_duplicates([PerceptualIndex.key_for(info) for info in candidates], max_distance)
+    index.save()
+    return duplicates
+
+if __name__ == '__main__':
+    # 用法: python wallpaper_dedup.py [壁纸基础目录]  列出全库中的重复图片
+    base = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'wallpapers')
+    index = PerceptualIndex(base)
+    print(f"重新计算 {index.refresh()} 个文件的感知哈希")
+    duplicates = index.find_duplicates(index.entries.keys())
+    index.save()
+    for key, (source_key, distance) in sorted(duplicates.items()):
+        print(f"{key} 与 {source_key} 重复（距离 {distance}）")
+    print(f"共 {len(index.entries)} 个文件，{len(duplicates)} 个重复")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: wallpaper_ids.py
+描述: 壁纸ID分配器（update_list.py 等入库脚本共用）
+依赖: PyMySQL (pip install pymysql)
+维护: 壁纸ID格式为 YYYYMMDD+当天序号（如202507151、20250715100）。
+      序号通过 wallpaper_id_sequence 表按块原子预留，api/upload_wallpaper.php 使用同一张表，
+      并发入库不会产生重复ID；已有ID的最大序号按主键区间查找，不使用 LIKE 全表扫描
+'''
+
+import threading
+from datetime import datetime
+import wallpaper_db
+
+# 序号表，每天一行，next_seq 为下一个可用序号
+SEQUENCE_TABLE = 'wallpaper_id_sequence'
+
+# 按主键区间查找已有序号时考虑的最大序号位数（每天最多 999999 张）
+MAX_SEQ_DIGITS = 6
+
+# IdAllocator 每次向数据库预留的序号数量
+DEFAULT_BLOCK_SIZE = 100
+
+def make_id(date_str, seq):
+    """由日期和序号拼出壁纸ID，序号不补零"""
+    return int(f"{date_str}{seq}")
+
+def ensure_sequence_table(cursor):
+    """创建序号表（已存在时无操作）"""
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS `{SEQUENCE_TABLE}` ("
+        " `date_key` CHAR(8) NOT NULL PRIMARY KEY,"
+        " `next_seq` BIGINT UNSIGNED NOT NULL"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+    )
+
+def seq_ranges(date_str):
+    """当天各位数序号对应的ID区间 [(最小ID, 最大ID)]，按位数升序"""
+    return [
+        (make_id(date_str, 10 ** (digits - 1)), make_id(date_str, 10 ** digits - 1))
+        for digits in range(1, MAX_SEQ_DIGITS + 1)
+    ]
+
+def find_max_seq(cursor, date_str):
+    """查找 wallpapers 表中当天已使用的最大序号
+
+    序号位数不固定，当天的ID分布在 MAX_SEQ_DIGITS 个互不重叠的主键区间内，
+    位数越多的ID数值越大，因此只需对这些区间取一次 MAX(id)。
+
+    Returns:
+        int: 最大序号，当天没有记录时返回0
+    """
+    ranges = seq_ranges(date_str)
+    where = ' OR '.join(['id BETWEEN %s AND %s'] * len(ranges))
+    cursor.execute(f"SELECT MAX(id) FROM wallpapers WHERE {where}", [bound for pair in ranges for bound in pair])
+    row = cursor.fetchone()
+    if not row or row[0] is None:
+        return 0
+    return int(str(row[0])[len(date_str):])
+
+def reserve_seq_block(count, date_str=None, conn=None):
+    """原子预留当天 count 个连续序号
+
+    在独立事务中锁定当天的序号行，起点取序号表记录与 wallpapers 表实际最大序号+1 中的较大者，
+    同时兼容未经过序号表写入的历史数据。
+
+    Args:
+        count: 预留数量
+        date_str: 日期 YYYYMMDD，默认今天
+        conn: 可选，使用已有连接（不能处于未提交的事务中）
+
+    Returns:
+        (date_str, first_seq): 预留的序号为 first_seq ~ first_seq+count-1
+    """
+    if date_str is None:
+        date_str = datetime.now().strftime('%Y%m%d')
+    if conn is None:
+        with wallpaper_db.connection() as pooled_conn:
+            return reserve_seq_block(count, date_str, pooled_conn)
+
+    with wallpaper_db.transaction(conn) as cursor:
+        ensure_sequence_table(cursor)
+        cursor.execute(f"INSERT IGNORE INTO `{SEQUENCE_TABLE}` (date_key, next_seq) VALUES (%s, 1)", (date_str,))
+
+    with wallpaper_db.transaction(conn) as cursor:
+        cursor.execute(f"SELECT next_seq FROM `{SEQUENCE_TABLE}` WHERE date_key = %s FOR UPDATE", (date_str,))
+        next_seq = cursor.fetchone()[0]
+        first_seq = max(next_seq, find_max_seq(cursor, date_str) + 1)
+        cursor.execute(
+            f"UPDATE `{SEQUENCE_TABLE}` SET next_seq = %s WHERE date_key = %s",
+            (first_seq + count, date_str)
+        )
+    return date_str, first_seq
+
+def peek_ids(count, date_str=None, conn=None):
+    """查看接下来 count 个可用的壁纸ID，不写入序号表
+
+    用于只生成SQL文件、不立即入库的情况，不消耗序号；
+    SQL文件导入前如有其他入库或网页上传，这些ID可能已被占用。
+
+    Returns:
+        list: 壁纸ID列表，count 为0时返回空列表
+    """
+    if count <= 0:
+        return []
+    if date_str is None:
+        date_str = datetime.now().strftime('%Y%m%d')
+    if conn is None:
+        with wallpaper_db.connection() as pooled_conn:
+            return peek_ids(count, date_str, pooled_conn)
+
+    with wallpaper_db.transaction(conn) as cursor:
+        ensure_sequence_table(cursor)
+        cursor.execute(f"SELECT next_seq FROM `{SEQUENCE_TABLE}` WHERE date_key = %s", (date_str,))
+        row = cursor.fetchone()
+        first_seq = max(row[0] if row else 1, find_max_seq(cursor, date_str) + 1)
+    return [make_id(date_str, first_seq + i) for i in range(count)]
+
+def reserve_ids(count, date_str=None, conn=None):
+    """预留 count 个壁纸ID
+
+    Returns:
+        list: 壁纸ID列表，count 为0时返回空列表
+    """
+    if count <= 0:
+        return []
+    date_str, first_seq = reserve_seq_block(count, date_str, conn)
+    return [make_id(date_str, first_seq + i) for i in range(count)]
+
+class IdAllocator:
+    """线程安全的壁纸ID分配器
+
+    每次向数据库预留 block_size 个序号，之后在内存中逐个分发，
+    多个工作线程共用一个分配器时只在块用完时访问一次数据库。
+    跨天后自动按新日期预留；未用完的序号会成为ID空洞，不会被重复使用。
+    """
+
+    def __init__(self, block_size=DEFAULT_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._date_str = None
+        self._next_seq = 0
+        self._end_seq = 0
+
+    def next_id(self):
+        """分配一个壁纸ID"""
+        with self._lock:
+            today = datetime.now().strftime('%Y%m%d')
+            if today != self._date_str or self._next_seq >= self._end_seq:
+                self._date_str, self._next_seq = reserve_seq_block(self.block_size, today)
+                self._end_seq = self._next_seq + self.block_size
+            seq = self._next_seq
+            self._next_seq += 1
+            return make_id(self._date_str, seq)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+文件: wallpaper_scanner.py
+描述: 壁纸目录元数据扫描工具（update_list.py 与 compress_wallpapers.py 共用）
+依赖: Pillow库 (pip install Pillow)
+维护: 基于os.scandir列目录，多线程并行只读取图片文件头（不解码像素），
+      适用于网络挂载存储上的全库重扫
+'''
+
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# 默认线程数：网络存储上每次stat/open都是一次往返，线程数可以远大于CPU核心数
+DEFAULT_WORKERS = 16
+
+# 单个图片文件的扫描结果；未读取文件头时 width/height 为0、format 为空字符串
+ImageFileInfo = namedtuple('ImageFileInfo', [
+    'period', 'name', 'path', 'size', 'mtime_ns', 'width', 'height', 'format'
+])
+
+def is_period_name(name):
+    """期数目录名为3位数字，如'001'"""
+    return name.isdigit() and len(name) == 3
+
+def list_period_dirs(base_dir):
+    """列出所有期数目录
+
+    Args:
+        base_dir: 壁纸基础目录
+
+    Returns:
+        list: [(period, path)]，按期数升序；目录不存在时返回空列表
+    """
+    try:
+        with os.scandir(base_dir) as it:
+            periods = [
+                (entry.name, entry.path) for entry in it
+                if is_period_name(entry.name) and entry.is_dir()
+            ]
+    except OSError:
+        return []
+    periods.sort()
+    return periods
+
+def scan_period_files(period_dir, period, extensions):
+    """列出期数目录中的图片文件（不读取文件头）
+
+    os.scandir 在大多数平台上随目录项一并返回类型信息，
+    Windows上还包含大小和修改时间，无需逐个文件额外stat。
+
+    Args:
+        period_dir: 期数目录路径
+        period: 期数，如'001'
+        extensions: 支持的扩展名元组（小写）
+
+    Returns:
+        list: ImageFileInfo 列表，按目录顺序
+    """
+    results = []
+    try:
+        with os.scandir(period_dir) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(extensions):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                results.append(ImageFileInfo(period, entry.name, entry.path, st.st_size, st.st_mtime_ns, 0, 0, ''))
+    except OSError as e:
+        print(f"[警告] 无法扫描目录 {period_dir}: {e}")
+    return results
+
+def read_image_header(path):
+    """只读取文件头获取图片尺寸和格式
+
+    Returns:
+        (width, height, format): 无法识别时返回 (0, 0, '')
+    """
+    try:
+        # Image.open 延迟解码，只解析到尺寸信息为止
+        with Image.open(path) as img:
+            return img.width, img.height, img.format or ''
+    except Exception as e:
+        print(f"Warning: Cannot get dimensions for {path}: {e}")
+        return 0, 0, ''
+
+def read_headers(infos, workers=DEFAULT_WORKERS):
+    """并行读取一组文件的图片头
+
+    Args:
+        infos: ImageFileInfo 列表
+        workers: 线程数
+
+    Returns:
+        list: 填充了 width/height/format 的 ImageFileInfo 列表，顺序与输入一致
+    """
+    infos = list(infos)
+    if not infos:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(infos)))) as executor:
+        headers = list(executor.map(read_image_header, [info.path for info in infos]))
+    return [
+        info._replace(width=width, height=height, format=img_format)
+        for info, (width, height, img_format) in zip(infos, headers)
+    ]
+
+def scan_wallpapers(base_dir, extensions, periods=None, with_headers=True, workers=DEFAULT_WORKERS):
+    """扫描整个壁纸库（或指定期数）
+
+    Args:
+        base_dir: 壁纸基础目录
+        extensions: 支持的扩展名元组（小写）
+        periods: 要扫描的期数列表，None表示全部期数
+        with_headers: 是否读取图片文件头
+        workers: 线程数
+
+    Returns:
+        list: ImageFileInfo 列表，按期数升序
+    """
+    period_dirs = list_period_dirs(base_dir)
+    if periods is not None:
+        wanted = set(periods)
+        period_dirs = [(period, path) for period, path in period_dirs if period in wanted]
+    if not period_dirs:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(period_dirs)))) as executor:
+        listings = executor.map(lambda item: scan_period_files(item[1], item[0], extensions), period_dirs)
+        infos = [info for listing in listings for info in listing]
+
+    return read_headers(infos, workers) if with_headers else infos
+
+def has_image_files(period_dir, extensions):
+    """目录中是否存在至少一个图片文件（找到第一个即返回）"""
+    try:
+        with os.scandir(period_dir) as it:
+            for entry in it:
+                if entry.name.lower().endswith(extensions) and entry.is_file():
+                    return True
+    except OSError:
+        pass
+    return False
+
+def find_latest_period(base_dir, extensions):
+    """倒序查找最新的非空期数
+
+    Returns:
+        (period, count): 最新期数及其图片数量，没有找到时返回 (None, 0)
+    """
+    for period, path in reversed(list_period_dirs(base_dir)):
+        if has_image_files(path, extensions):
+            return period, len(scan_period_files(path, period, extensions))
+    return None, 0
+
+if __name__ == '__main__':
+    # 用法: python wallpaper_scanner.py [壁纸基础目录]
+    base = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'wallpapers')
+    start_time = time.time()
+    files = scan_wallpapers(base, ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'))
+    summary = {}
+    for info in files:
+        summary.setdefault(info.period, [0, 0])
+        summary[info.period][0] += 1
+        summary[info.period][1] += info.size
+    for period, (count, total_size) in sorted(summary.items()):
+        print(f"期数 {period}: {count} 个文件, {total_size/1024/1024:.2f}MB")
+    print(f"共 {len(files)} 个文件，耗时 {time.time() - start_time:.2f}秒")